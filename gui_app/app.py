@@ -29,6 +29,8 @@ from utils.data_fetcher import DataFetcher
 from utils.data_processor import DataProcessor
 from utils.prediction_model import PredictionModel
 from utils.visualizer import Visualizer
+from utils.mock_data import generate_mock_ohlcv_batch, ohlcv_to_frame
+from utils.intraday import IntradayFeed
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['WenQuanYi Zen Hei']
@@ -57,6 +59,18 @@ class AIInvestmentAdvisorApp:
         self.prediction_model = PredictionModel(self.config)
         self.visualizer = Visualizer(self.config)
         
+        # 盘中模式：配置了intraday_interval时，每只股票的盘中K线保存在环形缓冲区中增量刷新
+        self.intraday_feed = None
+        self.intraday_data = {}
+        # 盘中刷新线程和股票分析页都会写intraday_data
+        self.intraday_lock = threading.Lock()
+        self._intraday_polling = False
+        data_settings = self.config.get('data_settings', {})
+        if data_settings.get('intraday_interval'):
+            self.intraday_feed = IntradayFeed(
+                self.data_fetcher, data_settings['intraday_interval'],
+                capacity=data_settings.get('intraday_capacity', 2000))
+        
         # 创建主界面
         self.create_main_ui()
         
@@ -244,21 +258,8 @@ class AIInvestmentAdvisorApp:
     def _gen_mock_stock(self, symbol: str, periods: int = 200) -> pd.DataFrame:
         """生成占位股票数据，防止界面下拉/图表为空。"""
         rng = pd.date_range(end=datetime.now(), periods=periods, freq='B')
-        np.random.seed(abs(hash(symbol)) % (2**32))
-        steps = np.random.normal(loc=0.0005, scale=0.02, size=periods).cumsum()
-        base = 100 * (1 + steps)
-        close = pd.Series(base, index=rng).clip(lower=1)
-        open_ = close.shift(1).fillna(close.iloc[0] * 0.995)
-        high = pd.concat([open_, close], axis=1).max(axis=1) * (1 + np.random.uniform(0.0, 0.01, size=periods))
-        low = pd.concat([open_, close], axis=1).min(axis=1) * (1 - np.random.uniform(0.0, 0.01, size=periods))
-        volume = (np.random.randint(1e5, 5e5, size=periods)).astype(int)
-        df = pd.DataFrame({
-            'Open': open_.values,
-            'High': high.values,
-            'Low': low.values,
-            'Close': close.values,
-            'Volume': volume
-        }, index=rng)
+        df = ohlcv_to_frame(generate_mock_ohlcv_batch([symbol], rng), rng)
+        df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
         df.index.name = 'Date'
         return df
     def show_home(self):
@@ -329,26 +330,36 @@ class AIInvestmentAdvisorApp:
             self.update_progress(30)
             
             # 获取新闻数据
-            news_query = self.config.get('news_query', 'artificial intelligence')
-            self.news_data = self.data_fetcher.fetch_news_data(news_query)
+            self.news_data = self._fetch_news(stock_symbols)
             # 若未取到新闻，放入占位新闻，避免列表为空
             if not self.news_data:
                 self.news_data = [self._mock_article()]
             self.update_progress(60)
             
-            # 获取股票数据
+            # 并发获取股票数据，按完成顺序更新进度
             self.stock_data = {}
-            for i, symbol in enumerate(stock_symbols):
-                df = self.data_fetcher.fetch_stock_data(symbol)
+            for i, (symbol, df) in enumerate(self.data_fetcher.iter_fetch_stocks(stock_symbols)):
                 if df is None or getattr(df, 'empty', False):
                     df = self._gen_mock_stock(symbol)
                 self.stock_data[symbol] = df
+                self.update_status(f"已获取 {symbol} 的数据 ({i + 1}/{len(stock_symbols)})")
                 self.update_progress(60 + (30 / len(stock_symbols)) * (i + 1))
+            # 保持与配置中的股票顺序一致
+            self.stock_data = {symbol: self.stock_data[symbol] for symbol in stock_symbols}
+            
+            # 后台预热基本面缓存，股票分析页切换股票时无需等待
+            self.data_fetcher.warm_fundamentals(stock_symbols)
             
-            # 处理数据
-            self.processed_data = {}
-            for symbol, data in self.stock_data.items():
-                self.processed_data[symbol] = self.data_processor.process_stock_data(data)
+            # 处理数据：所有股票一次计算指标
+            self.processed_data = self.data_processor.process_stock_panel(self.stock_data)
+
+            # 把本地存储的K线导出为内存映射的数组存储并计算预测特征，预测页以零拷贝视图读取
+            if not self.data_fetcher.use_mock_data and \
+                    self.config.get('data_settings', {}).get('array_store', True):
+                period = self.data_fetcher._default_period()
+                if self.data_fetcher.build_array_store(stock_symbols, period):
+                    self.data_processor.build_feature_store(
+                        self.data_fetcher.array_store, self.data_fetcher.feature_store)
             
             self.update_progress(90)
             
@@ -364,7 +375,8 @@ class AIInvestmentAdvisorApp:
                 self.views['prediction'].update_stock_list(list(self.stock_data.keys()))
             
             if 'news' in self.views:
-                self.views['news'].update_news(self.news_data)
+                # 与逐页显示的回调同样排入主线程队列，保证最终结果最后显示
+                self.root.after(0, self.views['news'].update_news, self.news_data)
             
             self.update_progress(100)
             self.update_status("数据初始化完成")
@@ -374,6 +386,34 @@ class AIInvestmentAdvisorApp:
             self.update_status("数据初始化失败")
             self.show_error("初始化错误", f"初始化数据时出错: {str(e)}")
     
+    def _fetch_news(self, stock_symbols):
+        """获取新闻数据；开启watchlist_news时同时获取每只自选股的新闻，每页返回后立即显示在新闻页"""
+        news_query = self.config.get('news_query', 'artificial intelligence')
+        if self.config.get('data_settings', {}).get('watchlist_news', False):
+            return self.data_fetcher.fetch_watchlist_news(
+                stock_symbols, news_query, on_page=self._news_page_handler())
+        return self.data_fetcher.fetch_news_data(news_query)
+
+    def _news_page_handler(self):
+        """返回新闻页面的回调：累积已到达的文章，按发布时间排序后刷新新闻页
+
+        后台线程中通过root.after交给主线程刷新；在主线程中（自动刷新）直接刷新并重绘。
+        """
+        if 'news' not in self.views:
+            return None
+        received = []
+
+        def on_page(articles):
+            received.extend(articles)
+            snapshot = sorted(received, key=lambda x: x.get('publishedAt') or '', reverse=True)
+            if threading.current_thread() is threading.main_thread():
+                self.views['news'].update_news(snapshot)
+                self.root.update_idletasks()
+            else:
+                self.root.after(0, self.views['news'].update_news, snapshot)
+
+        return on_page
+    
     def setup_auto_refresh(self):
         """设置自动刷新"""
         # 更新系统时间
@@ -382,6 +422,10 @@ class AIInvestmentAdvisorApp:
         # 设置定时刷新
         refresh_interval = self.config.get('refresh_interval', 300)  # 默认5分钟
         self.root.after(refresh_interval * 1000, self.auto_refresh)
+        
+        # 盘中模式按更短的间隔增量刷新
+        if self.intraday_feed is not None:
+            self.root.after(1000, self.intraday_refresh)
     
     def update_system_time(self):
         """更新系统时间"""
@@ -396,21 +440,23 @@ class AIInvestmentAdvisorApp:
             self.update_progress(0)
             
             # 获取新闻数据
-            news_query = self.config.get('news_query', 'artificial intelligence')
-            self.news_data = self.data_fetcher.fetch_news_data(news_query)
+            stock_symbols = self.config.get('stock_symbols') or list(self.stock_data.keys()) or ['AAPL']
+            self.news_data = self._fetch_news(stock_symbols)
             if not self.news_data:
                 self.news_data = [self._mock_article()]
             self.update_progress(30)
             
             # 获取股票数据
-            stock_symbols = self.config.get('stock_symbols') or list(self.stock_data.keys()) or ['AAPL']
-            for i, symbol in enumerate(stock_symbols):
-                df = self.data_fetcher.fetch_stock_data(symbol)
+            for i, (symbol, df) in enumerate(self.data_fetcher.iter_fetch_stocks(stock_symbols)):
                 if df is None or getattr(df, 'empty', False):
                     df = self._gen_mock_stock(symbol)
                 self.stock_data[symbol] = df
-                self.processed_data[symbol] = self.data_processor.process_stock_data(df)
-                self.update_progress(30 + (60 / len(stock_symbols)) * (i + 1))
+                self.update_progress(30 + (50 / len(stock_symbols)) * (i + 1))
+            
+            # 处理数据：所有股票一次计算指标
+            self.processed_data.update(self.data_processor.process_stock_panel(
+                {symbol: self.stock_data[symbol] for symbol in stock_symbols if symbol in self.stock_data}))
+            self.update_progress(90)
             
             # 更新视图
             if 'home' in self.views:
@@ -420,6 +466,8 @@ class AIInvestmentAdvisorApp:
                 self.views['news'].update_news(self.news_data)
             
             if 'stock' in self.views and hasattr(self.views['stock'], 'current_symbol'):
+                # 预取的结果基于刷新前的数据
+                self.views['stock'].clear_prefetched()
                 current_symbol = self.views['stock'].current_symbol
                 if current_symbol in self.stock_data:
                     self.views['stock'].update_stock_data(current_symbol)
@@ -439,10 +487,52 @@ class AIInvestmentAdvisorApp:
         refresh_interval = self.config.get('refresh_interval', 300)  # 默认5分钟
         self.root.after(refresh_interval * 1000, self.auto_refresh)
     
+    def intraday_refresh(self):
+        """盘中增量刷新：后台获取新K线，只把增量交给各视图"""
+        # 上一次刷新尚未完成时跳过本次
+        if not self._intraday_polling:
+            self._intraday_polling = True
+            threading.Thread(target=self._intraday_refresh_thread, daemon=True).start()
+        
+        refresh_interval = self.config.get('data_settings', {}).get('intraday_refresh_interval', 60)
+        self.root.after(refresh_interval * 1000, self.intraday_refresh)
+    
+    def _intraday_refresh_thread(self):
+        """盘中刷新线程：获取新K线并增量计算指标（首次刷新时建立指标状态），不占用界面线程"""
+        try:
+            stock_symbols = self.config.get('stock_symbols') or list(getattr(self, 'stock_data', {}).keys())
+            deltas = self.intraday_feed.poll(stock_symbols)
+            if deltas:
+                updates = {}
+                for symbol, delta in deltas.items():
+                    bars = self.intraday_feed.frame(symbol)
+                    # 读取、增量计算和保存在同一把锁内完成，股票分析页不会在中间替换结果
+                    with self.intraday_lock:
+                        processed = self.data_processor.update_stock_data_incremental(
+                            symbol, self.intraday_data.get(symbol), bars, len(delta))
+                        # 指标引擎的状态已经前进，结果要在下一次刷新开始前保存
+                        self.intraday_data[symbol] = processed
+                    updates[symbol] = (delta, bars, processed)
+                # 回到主线程更新视图
+                self.root.after(0, self._apply_intraday_deltas, updates)
+        except Exception as e:
+            self.logger.error(f"盘中刷新时出错: {str(e)}")
+        finally:
+            self._intraday_polling = False
+    
+    def _apply_intraday_deltas(self, updates):
+        """把后台线程计算好的指标和增量交给股票分析页"""
+        for symbol, (delta, bars, processed) in updates.items():
+            if 'stock' in self.views:
+                self.views['stock'].apply_intraday_delta(symbol, bars, processed, delta)
+        self.update_status(f"盘中数据已更新 ({len(updates)} 只股票)")
+    
     def on_closing(self):
         """窗口关闭事件处理"""
         if messagebox.askokcancel("退出", "确定要退出AI投资顾问吗？"):
             self.logger.info("AI投资顾问应用已关闭")
+            # 关闭指标计算进程池
+            self.data_processor.indicator_pool.shutdown()
             self.root.destroy()
 
 def main():
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+技术指标计算校验与性能测试脚本
+用模拟行情比较向量化指标内核与ta库逐个计算的结果，并测量两者的耗时
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from utils.indicator_engine import INDICATOR_COLUMNS
+from utils.indicator_kernel import compute_indicators
+from utils.mock_data import generate_mock_ohlcv_batch, ohlcv_to_frame
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='校验向量化指标内核与ta库的结果一致性，并比较耗时')
+    parser.add_argument('--days', type=int, nargs='+', default=[60, 250, 1250, 5000], help='K线数量')
+    parser.add_argument('--symbols', type=int, default=50, help='多股票测试的股票数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试重复次数，取最短耗时')
+    parser.add_argument('--tolerance', type=float, default=1e-8, help='允许的最大相对误差')
+    return parser.parse_args()
+
+
+def ta_indicators(data):
+    """用ta库逐个计算指标（向量化内核之前process_stock_data的实现），作为对照"""
+    import ta
+
+    close, high, low = data['Close'], data['High'], data['Low']
+    result = pd.DataFrame(index=data.index)
+    result['MA5'] = ta.trend.sma_indicator(close, window=5)
+    result['MA10'] = ta.trend.sma_indicator(close, window=10)
+    result['MA20'] = ta.trend.sma_indicator(close, window=20)
+    result['MA50'] = ta.trend.sma_indicator(close, window=50)
+    result['EMA12'] = ta.trend.ema_indicator(close, window=12)
+    result['EMA26'] = ta.trend.ema_indicator(close, window=26)
+    macd = ta.trend.MACD(close)
+    result['MACD'] = macd.macd()
+    result['MACD_signal'] = macd.macd_signal()
+    result['MACD_hist'] = macd.macd_diff()
+    result['RSI'] = ta.momentum.rsi(close, window=14)
+    bollinger = ta.volatility.BollingerBands(close)
+    result['BB_upper'] = bollinger.bollinger_hband()
+    result['BB_middle'] = bollinger.bollinger_mavg()
+    result['BB_lower'] = bollinger.bollinger_lband()
+    stoch = ta.momentum.StochasticOscillator(high, low, close)
+    result['STOCH_K'] = stoch.stoch()
+    result['STOCH_D'] = stoch.stoch_signal()
+    result['WILLIAMS_R'] = ta.momentum.williams_r(high, low, close)
+    result['CCI'] = ta.trend.cci(high, low, close)
+    result['ADX'] = ta.trend.ADXIndicator(high, low, close).adx()
+    result['Momentum'] = ta.momentum.roc(close, window=10)
+    result['Volatility'] = ta.volatility.average_true_range(high, low, close)
+    result['Daily_Return'] = close.pct_change()
+    result['Volatility_Std'] = result['Daily_Return'].rolling(window=20).std()
+    return result
+
+
+def kernel_indicators(data):
+    """用向量化内核计算指标"""
+    return compute_indicators(data['High'].to_numpy(dtype=float),
+                              data['Low'].to_numpy(dtype=float),
+                              data['Close'].to_numpy(dtype=float))
+
+
+def compare(expected, actual):
+    """返回{列名: 最大相对误差}，NaN位置不一致的列误差记为inf"""
+    errors = {}
+    for column in INDICATOR_COLUMNS:
+        a = np.asarray(expected[column], dtype=float)
+        b = np.asarray(actual[column], dtype=float)
+        if (np.isnan(a) != np.isnan(b)).any():
+            errors[column] = np.inf
+            continue
+        mask = ~np.isnan(a)
+        errors[column] = float(np.max(np.abs(a[mask] - b[mask]) / np.maximum(1.0, np.abs(a[mask])))) \
+            if mask.any() else 0.0
+    return errors
+
+
+def best_time(func, repeat):
+    """重复运行func，返回最短耗时（秒）"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    warnings.filterwarnings('ignore')
+    failed = False
+
+    print("单只股票：结果校验与耗时")
+    print(f"{'K线数':>8} {'最大误差':>12} {'ta (ms)':>10} {'内核 (ms)':>10} {'加速比':>8}")
+    for days in args.days:
+        dates = pd.bdate_range('2000-01-03', periods=days)
+        data = ohlcv_to_frame(generate_mock_ohlcv_batch(['BENCH'], dates), dates)
+        errors = compare(ta_indicators(data), kernel_indicators(data))
+        worst = max(errors.values())
+        for column, error in errors.items():
+            if error > args.tolerance:
+                failed = True
+                print(f"  {column} 与ta不一致: 最大相对误差 {error:.3g}")
+        ta_time = best_time(lambda: ta_indicators(data), args.repeat)
+        kernel_time = best_time(lambda: kernel_indicators(data), args.repeat)
+        print(f"{days:>8} {worst:>12.3g} {ta_time * 1000:>10.2f} {kernel_time * 1000:>10.2f} "
+              f"{ta_time / kernel_time:>7.1f}x")
+
+    # 多只股票：内核一次处理(T, N)数组，ta只能逐只计算
+    days = args.days[-1]
+    dates = pd.bdate_range('2000-01-03', periods=days)
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    batch = generate_mock_ohlcv_batch(symbols, dates)
+    frames = [ohlcv_to_frame(batch, dates, i) for i in range(len(symbols))]
+    high, low, close = (np.ascontiguousarray(batch[:, :, column].T) for column in (1, 2, 3))
+
+    panel = compute_indicators(high, low, close)
+    errors = compare(ta_indicators(frames[-1]), {column: values[:, -1] for column, values in panel.items()})
+    worst = max(errors.values())
+    failed = failed or worst > args.tolerance
+
+    ta_time = best_time(lambda: [ta_indicators(frame) for frame in frames], 1)
+    loop_time = best_time(lambda: [kernel_indicators(frame) for frame in frames], args.repeat)
+    panel_time = best_time(lambda: compute_indicators(high, low, close), args.repeat)
+    print(f"\n{len(symbols)} 只股票 × {days} 根K线（最大误差 {worst:.3g}）")
+    print(f"  ta逐只计算:   {ta_time * 1000:10.1f} ms")
+    print(f"  内核逐只计算: {loop_time * 1000:10.1f} ms（{ta_time / loop_time:.1f}x）")
+    print(f"  内核一次计算: {panel_time * 1000:10.1f} ms（{ta_time / panel_time:.1f}x）")
+
+    if failed:
+        print("\n校验失败：内核结果与ta不一致")
+        sys.exit(1)
+    print("\n校验通过：内核结果与ta一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+历史行情批量导入脚本
+将数据商提供的多股票CSV或Parquet历史数据流式导入本地行情存储，用于回填大量股票的历史K线
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from utils.config_manager import ConfigManager
+from utils.history_store import HistoryStore
+from utils.bulk_import import HistoryImporter
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='将多股票历史行情文件（CSV、CSV.GZ或Parquet）导入本地行情存储')
+    parser.add_argument('files', nargs='+', help='要导入的文件')
+    parser.add_argument('--cache-dir', help='本地行情存储目录，默认使用配置中的cache_dir')
+    parser.add_argument('--workers', type=int, default=None, help='并行解析和写入的线程数')
+    parser.add_argument('--block-mb', type=int, default=16, help='每块读取的大小（MB）')
+    parser.add_argument('--flush-rows', type=int, default=5000000, help='缓冲超过该行数时写入存储')
+    parser.add_argument('--timezone', default=None, help='给不带时区的日期加上的时区，如America/New_York')
+    parser.add_argument('--no-adjust', action='store_true', help='不按Adj Close调整开高低收')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = ConfigManager().config
+    cache_dir = args.cache_dir or config.get('data_settings', {}).get('cache_dir') or os.path.join(
+        current_dir, 'data', 'cache', 'history')
+    history_store = HistoryStore(cache_dir)
+    importer = HistoryImporter(
+        history_store, max_workers=args.workers, block_size=args.block_mb * 1024 * 1024,
+        flush_rows=args.flush_rows, adjust=not args.no_adjust, timezone=args.timezone)
+
+    for path in args.files:
+        print(f"正在导入 {path} ...")
+        stats = importer.import_file(path)
+        print(f"  读取 {stats['rows']} 行，导入 {stats['imported']} 行（{stats['symbols']} 只股票），"
+              f"拒绝 {stats['rejected']} 行")
+        print(f"  耗时 {stats['seconds']:.1f} 秒，{stats['rows_per_second']:.0f} 行/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地替身服务器启动脚本
+模拟Yahoo Finance K线接口和NewsAPI，可配置延迟、错误率、限流和数据量，
+用于在离线环境中测试和压测真实API的获取路径
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from utils.stand_in_server import StandInServer
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='启动模拟Yahoo Finance和NewsAPI的本地替身服务器')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口，0表示随机端口')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.05, help='在固定延迟上增加的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500错误的概率')
+    parser.add_argument('--rate-limit', type=float, default=0, help='每秒允许的请求数，超出时返回429，0表示不限流')
+    parser.add_argument('--news-total', type=int, default=500, help='每个新闻查询的结果总数')
+    parser.add_argument('--article-bytes', type=int, default=0, help='每篇新闻content字段的字节数')
+    parser.add_argument('--seed', type=int, default=0, help='延迟和错误注入的随机数种子')
+    parser.add_argument('--benchmark', action='store_true', help='启动后用DataFetcher的真实API路径压测一次并退出')
+    parser.add_argument('--symbols', type=int, default=50, help='压测使用的股票数量')
+    return parser.parse_args()
+
+
+def run_benchmark(base_url, n_symbols):
+    """用DataFetcher的真实API路径请求替身服务器，输出各阶段耗时和网络统计"""
+    from utils.data_fetcher import DataFetcher
+
+    cache_root = tempfile.mkdtemp(prefix='stand_in_')
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    config = {
+        'api_keys': {'news_api': 'stand-in'},
+        'stock_symbols': symbols,
+        'data_settings': {
+            'use_mock_data': False,
+            'yahoo_base_url': base_url,
+            'news_api_base_url': base_url,
+            'market_data_providers': ['yahoo'],
+            'cache_dir': os.path.join(cache_root, 'history'),
+            'requests_per_second': 1000,
+            'historical_data_years': 1
+        },
+        'network': {'http_cache': False}
+    }
+
+    try:
+        data_fetcher = DataFetcher(config)
+
+        start = time.perf_counter()
+        results = data_fetcher.fetch_stocks_bulk(symbols, period='1y')
+        elapsed = time.perf_counter() - start
+        fetched = sum(1 for data in results.values() if data is not None and not data.empty)
+        print(f"批量获取 {fetched}/{len(symbols)} 只股票: {elapsed:.2f} 秒")
+
+        start = time.perf_counter()
+        for symbol in symbols[:10]:
+            data_fetcher.fetch_stock_data(symbol, period='1mo')
+        print(f"逐只获取 10 只股票（增量）: {time.perf_counter() - start:.2f} 秒")
+
+        start = time.perf_counter()
+        articles = data_fetcher.fetch_news_data('artificial intelligence', max_articles=100)
+        print(f"获取新闻 {len(articles)} 篇: {time.perf_counter() - start:.2f} 秒")
+
+        start = time.perf_counter()
+        articles = data_fetcher.fetch_watchlist_news(symbols[:10], max_articles=500)
+        print(f"并发获取自选股新闻 {len(articles)} 篇: {time.perf_counter() - start:.2f} 秒")
+
+        print("客户端网络统计:")
+        for host, stats in data_fetcher.get_network_stats().items():
+            print(f"  {host}: {stats}")
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    server = StandInServer(
+        host=args.host, port=args.port, latency=args.latency, latency_jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit or None,
+        news_total=args.news_total, article_bytes=args.article_bytes, seed=args.seed)
+    base_url = server.start()
+
+    print(f"替身服务器运行于 {base_url}")
+    print("在config.json的data_settings中加入以下配置即可使用真实API路径:")
+    print(f'  "use_mock_data": false,')
+    print(f'  "yahoo_base_url": "{base_url}",')
+    print(f'  "news_api_base_url": "{base_url}"')
+    print("（NewsAPI需要在api_keys.news_api中填写任意非空密钥）")
+
+    try:
+        if args.benchmark:
+            run_benchmark(base_url, args.symbols)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"服务器统计: {server.get_stats()}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
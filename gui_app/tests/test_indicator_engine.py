@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+增量指标引擎的一致性测试
+逐根输入K线（包括盘中修订最后一根K线），与ta库对完整K线计算的结果比较，
+运行方式：python -m pytest gui_app/tests 或 python gui_app/tests/test_indicator_engine.py
+"""
+
+import os
+import sys
+import unittest
+import warnings
+
+import pandas as pd
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+from benchmark_indicators import ta_indicators, compare
+from utils.indicator_engine import IndicatorEngine
+from utils.mock_data import generate_mock_ohlcv_batch, ohlcv_to_frame
+
+# 允许的最大相对误差
+TOLERANCE = 1e-8
+
+
+def mock_frame(days, symbol='TEST'):
+    """生成一只股票的模拟日K线"""
+    dates = pd.bdate_range('2000-01-03', periods=days)
+    return ohlcv_to_frame(generate_mock_ohlcv_batch([symbol], dates), dates)
+
+
+def provisional_bar(data, i):
+    """第i根K线形成中的版本：收盘价和最高、最低价与最终值不同"""
+    bar = data.iloc[:i + 1].copy()
+    bar.iloc[-1, bar.columns.get_loc('Close')] *= 1.03
+    bar.iloc[-1, bar.columns.get_loc('High')] = bar['Close'].iloc[-1] * 1.01
+    bar.iloc[-1, bar.columns.get_loc('Low')] *= 0.98
+    return bar
+
+
+class IndicatorEngineTest(unittest.TestCase):
+    def setUp(self):
+        warnings.filterwarnings('ignore')
+
+    def assertMatchesTa(self, expected, actual):
+        """断言每个指标与ta的结果一致（NaN位置相同，数值误差在TOLERANCE以内）"""
+        for column, error in compare(expected, actual).items():
+            self.assertLessEqual(error, TOLERANCE, f"{column} 与ta不一致: 最大相对误差 {error:.3g}")
+
+    def test_one_bar_at_a_time(self):
+        """逐根输入K线，每隔几根先输入形成中的版本再修订为最终值，结果与ta一致"""
+        data = mock_frame(300)
+        engine = IndicatorEngine()
+        rows = []
+        for i in range(len(data)):
+            if i % 7 == 3:
+                engine.update('TEST', provisional_bar(data, i), 1)
+            rows.append(engine.update('TEST', data.iloc[:i + 1], 1))
+        self.assertMatchesTa(ta_indicators(data), pd.concat(rows))
+
+    def test_revise_last_bar(self):
+        """全部输入后修订最后一根K线，修订后的结果与ta对修订后K线的计算一致"""
+        data = mock_frame(120)
+        engine = IndicatorEngine()
+        history = engine.update('TEST', data.iloc[:-1], len(data) - 1)
+        engine.update('TEST', data, 1)
+
+        revised = provisional_bar(data, len(data) - 1)
+        last = engine.update('TEST', revised, 1)
+        self.assertMatchesTa(ta_indicators(revised), pd.concat([history, last]))
+
+    def test_several_new_bars(self):
+        """一次输入多根新K线与逐根输入的结果一致"""
+        data = mock_frame(100)
+        engine = IndicatorEngine()
+        rows = [engine.update('TEST', data.iloc[:60], 60)]
+        for end in range(65, len(data) + 1, 5):
+            rows.append(engine.update('TEST', data.iloc[:end], 5))
+        self.assertMatchesTa(ta_indicators(data), pd.concat(rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+向量化指标内核的一致性测试
+与ta库逐个计算的结果（向量化内核之前process_stock_data的实现）比较，
+运行方式：python -m pytest gui_app/tests 或 python gui_app/tests/test_indicator_kernel.py
+"""
+
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+from benchmark_indicators import ta_indicators, compare
+from utils.indicator_engine import INDICATOR_COLUMNS
+from utils.indicator_kernel import compute_indicators
+from utils.mock_data import generate_mock_ohlcv_batch, ohlcv_to_frame
+
+# 允许的最大相对误差
+TOLERANCE = 1e-8
+
+
+def mock_frame(days, symbol='TEST'):
+    """生成一只股票的模拟日K线"""
+    dates = pd.bdate_range('2000-01-03', periods=days)
+    return ohlcv_to_frame(generate_mock_ohlcv_batch([symbol], dates), dates)
+
+
+def kernel_frame(data):
+    """用向量化内核计算一只股票的指标"""
+    return compute_indicators(data['High'].to_numpy(dtype=float),
+                              data['Low'].to_numpy(dtype=float),
+                              data['Close'].to_numpy(dtype=float))
+
+
+class IndicatorKernelTest(unittest.TestCase):
+    def setUp(self):
+        warnings.filterwarnings('ignore')
+
+    def assertMatchesTa(self, expected, actual):
+        """断言每个指标与ta的结果一致（NaN位置相同，数值误差在TOLERANCE以内）"""
+        for column, error in compare(expected, actual).items():
+            self.assertLessEqual(error, TOLERANCE, f"{column} 与ta不一致: 最大相对误差 {error:.3g}")
+
+    def test_matches_ta(self):
+        """不同长度（包括短于最长窗口）的K线与ta一致（ta的ADX至少需要28根K线）"""
+        for days in (30, 40, 60, 250, 1250):
+            with self.subTest(days=days):
+                data = mock_frame(days)
+                self.assertMatchesTa(ta_indicators(data), kernel_frame(data))
+
+    def test_panel_matches_single_symbol(self):
+        """(T, N)面板中上市较晚（开头为NaN）的股票与单独计算的结果一致"""
+        dates = pd.bdate_range('2000-01-03', periods=300)
+        batch = generate_mock_ohlcv_batch(['AAA', 'BBB'], dates)
+        high, low, close = (np.ascontiguousarray(batch[:, :, column].T) for column in (1, 2, 3))
+        for prices in (high, low, close):
+            prices[:40, 1] = np.nan
+
+        panel = compute_indicators(high, low, close)
+        late = ohlcv_to_frame(batch, dates, 1).iloc[40:]
+        expected = ta_indicators(late)
+        self.assertMatchesTa(expected, {column: values[40:, 1] for column, values in panel.items()})
+        for column in INDICATOR_COLUMNS:
+            self.assertTrue(np.isnan(panel[column][:40, 1]).all(), column)
+
+    def test_missing_close_matches_pct_change(self):
+        """中间缺失收盘价时，日收益率和收益率标准差与pct_change（fill_method='pad'）一致"""
+        data = mock_frame(120)
+        data.iloc[[50, 51, 80], data.columns.get_loc('Close')] = np.nan
+        indicators = kernel_frame(data)
+        daily_return = data['Close'].pct_change()
+        np.testing.assert_allclose(indicators['Daily_Return'], daily_return, rtol=TOLERANCE)
+        np.testing.assert_allclose(indicators['Volatility_Std'], daily_return.rolling(window=20).std(),
+                                   rtol=TOLERANCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+内存映射OHLCV数组存储的测试
+检查共享日期索引、股票偏移表和零拷贝视图与写入的原始K线一致，
+运行方式：python -m pytest gui_app/tests 或 python gui_app/tests/test_ohlcv_store.py
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+from utils.mock_data import OHLCV_COLUMNS, generate_mock_ohlcv_batch, ohlcv_to_frame
+from utils.ohlcv_store import OHLCVArrayStore
+
+
+def mock_frames():
+    """生成三只股票的日K线：AAA完整，BBB上市较晚，CCC中间停牌数天"""
+    dates = pd.bdate_range('2020-01-01', periods=200, tz='America/New_York')
+    batch = generate_mock_ohlcv_batch(['AAA', 'BBB', 'CCC'], dates)
+    frames = {symbol: ohlcv_to_frame(batch, dates, i) for i, symbol in enumerate(['AAA', 'BBB', 'CCC'])}
+    frames['BBB'] = frames['BBB'].iloc[50:]
+    frames['CCC'] = frames['CCC'].drop(frames['CCC'].index[100:105])
+    return dates, frames
+
+
+def build_store(root_dir, frames, dates):
+    """把frames写入新的数组存储并以只读方式打开"""
+    store = OHLCVArrayStore(root_dir)
+    store.create(list(frames), dates.tz_localize(None))
+    for symbol, frame in frames.items():
+        store.write(symbol, frame)
+    store.finish()
+    store.open()
+    return store
+
+
+class OHLCVArrayStoreTest(unittest.TestCase):
+    def setUp(self):
+        warnings.filterwarnings('ignore')
+        self.root_dir = tempfile.mkdtemp()
+        self.dates, self.frames = mock_frames()
+        self.store = build_store(os.path.join(self.root_dir, 'ohlcv'), self.frames, self.dates)
+
+    def tearDown(self):
+        self.store.array = None
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_views_match_source_frames(self):
+        """每只股票的视图在其有K线的日期上与原始K线一致，其他日期为NaN"""
+        naive_dates = self.dates.tz_localize(None)
+        self.assertTrue(self.store.dates.equals(naive_dates))
+        for symbol, frame in self.frames.items():
+            view = self.store.get(symbol)
+            self.assertEqual(view.shape, (len(naive_dates), len(OHLCV_COLUMNS)))
+            self.assertTrue(np.shares_memory(view, self.store.array), symbol)
+
+            present = naive_dates.isin(frame.index.tz_localize(None))
+            np.testing.assert_array_equal(view[present], frame[OHLCV_COLUMNS].to_numpy())
+            self.assertTrue(np.isnan(view[~present]).all(), symbol)
+
+    def test_frames_match_source_frames(self):
+        """get_frame去掉空行后与原始K线一致，没有空行的股票直接引用映射的数组"""
+        for symbol, frame in self.frames.items():
+            data = self.store.get_frame(symbol)
+            np.testing.assert_array_equal(data.to_numpy(), frame[OHLCV_COLUMNS].to_numpy())
+            self.assertTrue(data.index.equals(frame.index.tz_localize(None)), symbol)
+        self.assertTrue(np.shares_memory(self.store.get_frame('AAA').to_numpy(), self.store.array))
+
+    def test_date_range_and_panel(self):
+        """按日期范围读取和全部股票的面板视图"""
+        start, end = self.dates[20].tz_localize(None), self.dates[59].tz_localize(None)
+        view = self.store.get('AAA', start, end)
+        np.testing.assert_array_equal(view, self.frames['AAA'][OHLCV_COLUMNS].to_numpy()[20:60])
+
+        closes = self.store.panel(start, end, column='Close')
+        self.assertEqual(closes.shape, (3, 40))
+        self.assertTrue(np.shares_memory(closes, self.store.array))
+        np.testing.assert_array_equal(closes[0], self.frames['AAA']['Close'].to_numpy()[20:60])
+
+    def test_reopen_reads_offsets_and_columns(self):
+        """新实例打开已有的存储时读取偏移表和列名，列名可以不是开高低收"""
+        columns = ['Close', 'MA5']
+        features = OHLCVArrayStore(os.path.join(self.root_dir, 'features'))
+        features.create(['AAA', 'BBB'], self.store.dates, columns)
+        for symbol in ('AAA', 'BBB'):
+            frame = self.frames[symbol]
+            features.write(symbol, pd.DataFrame(
+                {'Close': frame['Close'], 'MA5': frame['Close'].rolling(5).mean()}))
+        features.finish()
+
+        reopened = OHLCVArrayStore(os.path.join(self.root_dir, 'features'))
+        self.assertTrue(reopened.open())
+        self.assertEqual(reopened.columns, columns)
+        self.assertEqual(reopened.offsets, {'AAA': 0, 'BBB': 1})
+        data = reopened.get_frame('BBB')
+        np.testing.assert_array_equal(data['Close'].to_numpy(), self.frames['BBB']['Close'].to_numpy())
+        reopened.array = None
+
+    def test_feature_sequences_match_prepare_data(self):
+        """特征存储生成的序列与prepare_data_for_prediction由处理后的数据生成的序列一致"""
+        try:
+            import nltk
+            nltk.data.find('sentiment/vader_lexicon.zip')
+            from utils.data_processor import DataProcessor
+            from utils.prediction_model import PredictionModel
+        except (ImportError, LookupError) as e:
+            self.skipTest(f"缺少依赖: {str(e)}")
+
+        config = {'model_parameters': {'prediction_days': 30}, 'data_settings': {'parallel_processing': False}}
+        processor = DataProcessor(config)
+        model = PredictionModel(config)
+        features = OHLCVArrayStore(os.path.join(self.root_dir, 'features'))
+        self.assertEqual(processor.build_feature_store(self.store, features), 3)
+
+        for symbol in self.frames:
+            expected = processor.prepare_data_for_prediction(
+                processor.process_stock_data(self.store.get_frame(symbol)))
+            actual = model.sequences_from_store(features, symbol)
+            for a, b in zip(expected[:4], actual[:4]):
+                np.testing.assert_allclose(a, b)
+            self.assertEqual(expected[4].n_features_in_, actual[4].n_features_in_)
+        features.array = None
+
+
+if __name__ == "__main__":
+    unittest.main()
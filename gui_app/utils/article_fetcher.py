@@ -0,0 +1,147 @@
+import os
+import gzip
+import hashlib
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bs4 import BeautifulSoup
+
+from utils.concurrency import SingleFlight
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# 正文提取时丢弃的标签
+NOISE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe']
+
+
+class ArticleFetcher:
+    def __init__(self, http_client, cache_dir, max_workers=8, max_bytes=2 * 1024 * 1024,
+                 max_chars=20000, chunk_size=64 * 1024):
+        """初始化新闻正文抓取器：有界线程池并发下载，限制下载大小，按URL缓存正文"""
+        self.http = http_client
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.chunk_size = chunk_size
+
+        # 同一URL的并发请求只下载一次；下载失败的URL本次运行不再重试
+        self._inflight = SingleFlight()
+        self._failed = set()
+        self._lock = threading.Lock()
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, url):
+        """获取URL对应的正文缓存文件"""
+        return os.path.join(self.cache_dir, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.txt.gz")
+
+    def fetch(self, url):
+        """获取文章正文，优先读取缓存；无法获取时返回None"""
+        if not url:
+            return None
+        text = self._load_cached(url)
+        if text is not None:
+            return text
+        return self._inflight.do(url, self._download, url)
+
+    def _load_cached(self, url):
+        """读取缓存的正文，没有缓存时返回None"""
+        path = self._cache_path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return f.read()
+        except Exception as e:
+            self.logger.error(f"读取正文缓存时出错: {str(e)}")
+            return None
+
+    def _download(self, url):
+        """下载并提取正文，超过max_bytes的部分不下载"""
+        # 其他线程可能刚刚完成同一URL的下载
+        text = self._load_cached(url)
+        if text is not None:
+            return text
+        with self._lock:
+            if url in self._failed:
+                return None
+
+        try:
+            response = self.http.get(url, stream=True)
+            try:
+                if response.status_code != 200:
+                    raise RuntimeError(f"状态码: {response.status_code}")
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type:
+                    raise RuntimeError(f"不支持的内容类型: {content_type}")
+
+                chunks = []
+                size = 0
+                for chunk in response.iter_content(self.chunk_size):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.max_bytes:
+                        self.logger.info(f"文章 {url} 超过 {self.max_bytes} 字节，只解析前面部分")
+                        break
+                html = b''.join(chunks)[:self.max_bytes]
+            finally:
+                response.close()
+
+            text = self.extract_text(html)
+        except Exception as e:
+            self.logger.warning(f"获取文章 {url} 的正文失败: {str(e)}")
+            with self._lock:
+                self._failed.add(url)
+            return None
+
+        path = self._cache_path(url)
+        try:
+            with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            self.logger.error(f"写入正文缓存时出错: {str(e)}")
+        return text
+
+    def extract_text(self, html):
+        """从HTML中提取正文：优先使用<article>，否则拼接所有段落，结果截断到max_chars"""
+        soup = BeautifulSoup(html, HTML_PARSER)
+        for tag in soup(NOISE_TAGS):
+            tag.decompose()
+
+        root = soup.find('article') or soup.body or soup
+        paragraphs = [p.get_text(' ', strip=True) for p in root.find_all('p')]
+        text = '\n'.join(p for p in paragraphs if p)
+        if not text:
+            text = root.get_text(' ', strip=True)
+        return text[:self.max_chars]
+
+    def iter_bodies(self, articles):
+        """并发获取一组文章的正文，按完成顺序产出(序号, 文章, 正文)，正文获取失败时为None"""
+        if not articles:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(articles)))
+        futures = {executor.submit(self.fetch, article.get('url')): i for i, article in enumerate(articles)}
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    body = future.result()
+                except Exception as e:
+                    self.logger.error(f"获取文章正文时出错: {str(e)}")
+                    body = None
+                yield i, articles[i], body
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的下载
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
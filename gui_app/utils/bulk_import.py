@@ -0,0 +1,255 @@
+import io
+import os
+import gzip
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.history_store import naive_index
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# 常见的列名写法（小写）到存储中列名的映射
+COLUMN_ALIASES = {
+    'symbol': 'Symbol', 'ticker': 'Symbol', 'code': 'Symbol',
+    'date': 'Date', 'datetime': 'Date', 'timestamp': 'Date', 'time': 'Date',
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close',
+    'adj close': 'Adj Close', 'adj_close': 'Adj Close', 'adjclose': 'Adj Close',
+    'volume': 'Volume', 'vol': 'Volume'
+}
+REQUIRED_COLUMNS = ['Symbol', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def map_columns(names):
+    """将文件中的列名映射为存储中的列名，返回{原列名: 存储列名}；缺少必需列时抛出ValueError"""
+    mapping = {}
+    for name in names:
+        target = COLUMN_ALIASES.get(str(name).strip().lower())
+        if target is not None and target not in mapping.values():
+            mapping[name] = target
+    missing = [column for column in REQUIRED_COLUMNS if column not in mapping.values()]
+    if missing:
+        raise ValueError(f"文件缺少必需的列: {', '.join(missing)}")
+    return mapping
+
+
+class HistoryImporter:
+    def __init__(self, history_store, max_workers=None, block_size=16 * 1024 * 1024,
+                 flush_rows=5000000, adjust=True, timezone=None):
+        """初始化历史行情批量导入器：流式读取多股票的CSV或Parquet文件，写入HistoryStore
+
+        文件按块读取，每块在线程池中并行解析和校验，不会一次载入整个文件。解析后的行按股票缓冲，
+        文件中不再出现的股票（按股票排序的文件）或缓冲超过flush_rows行时合并进存储。
+        adjust为True且文件有Adj Close列时，按复权因子调整开高低收（与yfinance的auto_adjust一致）；
+        timezone用于给不带时区的日期加上时区。
+        """
+        if not PARQUET_AVAILABLE or not history_store.enabled:
+            raise RuntimeError("批量导入需要pyarrow和已启用的本地行情存储")
+        self.history_store = history_store
+        self.max_workers = max_workers or min(32, os.cpu_count() or 4)
+        self.block_size = block_size
+        self.flush_rows = flush_rows
+        self.adjust = adjust
+        self.timezone = timezone
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def import_file(self, path, progress=None):
+        """导入一个文件，返回统计：读取行数、导入行数、拒绝行数、股票数、耗时和每秒行数
+
+        progress(stats)在每块处理完后调用，可用于显示进度。
+        """
+        lower = path.lower()
+        if lower.endswith(('.parquet', '.pq')):
+            blocks = self._parquet_blocks(path)
+        elif lower.endswith(('.csv', '.csv.gz', '.txt')):
+            blocks = self._csv_blocks(path)
+        else:
+            raise ValueError(f"不支持的文件格式: {path}")
+
+        stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'symbols': 0,
+                 'seconds': 0.0, 'rows_per_second': 0.0}
+        started = time.perf_counter()
+        last_report = started
+        buffers = {}
+        buffered_rows = 0
+        imported_symbols = set()
+        self._last_seen = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # 最多同时有2倍线程数的块在解析，限制内存占用；结果按文件顺序处理
+            inflight = deque()
+            for parse, block in blocks:
+                inflight.append(executor.submit(parse, block))
+                if len(inflight) < self.max_workers * 2:
+                    continue
+                buffered_rows = self._consume(inflight.popleft().result(), buffers, buffered_rows, stats)
+                buffered_rows = self._maybe_flush(executor, buffers, buffered_rows, imported_symbols)
+                last_report = self._report(stats, started, last_report, progress)
+            while inflight:
+                buffered_rows = self._consume(inflight.popleft().result(), buffers, buffered_rows, stats)
+                buffered_rows = self._maybe_flush(executor, buffers, buffered_rows, imported_symbols)
+                last_report = self._report(stats, started, last_report, progress)
+
+            self._flush(executor, buffers, list(buffers), imported_symbols)
+
+        stats['symbols'] = len(imported_symbols)
+        stats['seconds'] = time.perf_counter() - started
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        self.logger.info(
+            f"导入完成: {stats['imported']} 行 / {stats['symbols']} 只股票，拒绝 {stats['rejected']} 行，"
+            f"耗时 {stats['seconds']:.1f} 秒（{stats['rows_per_second']:.0f} 行/秒）")
+        return stats
+
+    def _csv_blocks(self, path):
+        """按块读取CSV（支持gzip），每块在行边界处截断，产出(解析函数, 数据块)
+
+        按字节切分要求字段中不含换行符，行情文件通常满足。
+        """
+        opener = gzip.open if path.lower().endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            header = f.readline()
+            names = [name.strip().strip('"') for name in header.decode('utf-8-sig').strip().split(',')]
+            mapping = map_columns(names)
+            symbol_column = next(name for name, target in mapping.items() if target == 'Symbol')
+            read_options = pacsv.ReadOptions(column_names=names, use_threads=False)
+            convert_options = pacsv.ConvertOptions(
+                include_columns=list(mapping), column_types={symbol_column: pa.string()})
+
+            def parse(block):
+                table = pacsv.read_csv(io.BytesIO(block), read_options=read_options,
+                                       convert_options=convert_options)
+                return self._validate(table, mapping)
+
+            remainder = b''
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                data = remainder + data
+                cut = data.rfind(b'\n') + 1
+                if cut == 0:
+                    remainder = data
+                    continue
+                remainder = data[cut:]
+                yield parse, data[:cut]
+            if remainder.strip():
+                yield parse, remainder
+
+    def _parquet_blocks(self, path):
+        """按行组批次读取Parquet，只读取需要的列，产出(解析函数, Arrow批次)"""
+        parquet_file = pq.ParquetFile(path)
+        mapping = map_columns(parquet_file.schema_arrow.names)
+        batch_size = max(1024, self.block_size // 64)
+
+        def parse(batch):
+            return self._validate(pa.Table.from_batches([batch]), mapping)
+
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=list(mapping)):
+            yield parse, batch
+
+    def _validate(self, table, mapping):
+        """将一块数据转换为标准列并校验，返回(有效行的DataFrame, 读取行数)
+
+        代码或日期缺失、价格非正或缺失、最高价低于最低价的行被拒绝，缺失的成交量按0处理。
+        """
+        # 代码的规范化在Arrow上完成，避免逐个处理Python字符串
+        symbol_column = next(name for name, target in mapping.items() if target == 'Symbol')
+        symbols = pc.utf8_upper(pc.utf8_trim_whitespace(table.column(symbol_column).cast(pa.string())))
+        table = table.set_column(table.schema.get_field_index(symbol_column), symbol_column, symbols)
+        data = table.to_pandas(date_as_object=False).rename(columns=mapping)
+        n_rows = len(data)
+
+        if not pd.api.types.is_datetime64_any_dtype(data['Date']):
+            data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
+        for column in PRICE_COLUMNS + ['Volume'] + (['Adj Close'] if 'Adj Close' in data else []):
+            if not pd.api.types.is_numeric_dtype(data[column]):
+                data[column] = pd.to_numeric(data[column], errors='coerce')
+
+        prices = data[PRICE_COLUMNS].to_numpy(dtype=float)
+        valid = (data['Symbol'].notna() & data['Symbol'].ne('') & data['Date'].notna()).to_numpy()
+        valid &= np.isfinite(prices).all(axis=1) & (prices > 0).all(axis=1)
+        valid &= prices[:, 1] >= prices[:, 2]
+        if not valid.all():
+            data = data[valid]
+
+        if self.adjust and 'Adj Close' in data:
+            ratio = (data['Adj Close'] / data['Close']).where(lambda r: np.isfinite(r) & (r > 0), 1.0)
+            data[PRICE_COLUMNS] = data[PRICE_COLUMNS].mul(ratio, axis=0)
+        data['Volume'] = data['Volume'].fillna(0)
+        return data[REQUIRED_COLUMNS], n_rows
+
+    def _consume(self, result, buffers, buffered_rows, stats):
+        """把一块解析结果按股票放入缓冲区，返回缓冲的总行数"""
+        data, n_rows = result
+        stats['rows'] += n_rows
+        stats['imported'] += len(data)
+        stats['rejected'] += n_rows - len(data)
+        seen = set()
+        for symbol, group in data.groupby('Symbol', sort=False):
+            buffers.setdefault(symbol, []).append(group.drop(columns='Symbol'))
+            seen.add(symbol)
+        # 记录最近一块出现的股票，用于判断哪些股票已经读完
+        self._last_seen = seen
+        return buffered_rows + len(data)
+
+    def _maybe_flush(self, executor, buffers, buffered_rows, imported_symbols):
+        """合并已经读完的股票；缓冲超过flush_rows时合并全部股票"""
+        if buffered_rows > self.flush_rows:
+            symbols = list(buffers)
+        else:
+            symbols = [symbol for symbol in buffers if symbol not in self._last_seen]
+        if not symbols:
+            return buffered_rows
+        flushed = self._flush(executor, buffers, symbols, imported_symbols)
+        return buffered_rows - flushed
+
+    def _flush(self, executor, buffers, symbols, imported_symbols):
+        """并行地把股票的缓冲数据合并进存储，返回合并的行数"""
+        frames = {symbol: buffers.pop(symbol) for symbol in symbols}
+        futures = [executor.submit(self._merge_symbol, symbol, parts) for symbol, parts in frames.items()]
+        flushed = 0
+        for symbol, future in zip(frames, futures):
+            try:
+                flushed += future.result()
+                imported_symbols.add(symbol)
+            except Exception as e:
+                self.logger.error(f"写入股票 {symbol} 的历史数据时出错: {str(e)}")
+        return flushed
+
+    def _merge_symbol(self, symbol, parts):
+        """合并一只股票的缓冲数据，重复日期以后出现的行为准，返回行数"""
+        data = pd.concat(parts) if len(parts) > 1 else parts[0]
+        data = data.set_index('Date')
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        if self.timezone is not None and data.index.tz is None:
+            data = data.tz_localize(self.timezone)
+        data['Volume'] = data['Volume'].astype(np.int64)
+        # 与yfinance返回的列保持一致
+        data['Dividends'] = 0.0
+        data['Stock Splits'] = 0.0
+        self.history_store.merge(symbol, data, covered_from=naive_index(data.index).min())
+        return sum(len(part) for part in parts)
+
+    def _report(self, stats, started, last_report, progress):
+        """每秒最多输出一次进度"""
+        now = time.perf_counter()
+        if progress is not None:
+            progress(dict(stats, seconds=now - started))
+        if now - last_report < 1:
+            return last_report
+        rate = stats['rows'] / (now - started)
+        self.logger.info(f"已读取 {stats['rows']} 行，导入 {stats['imported']} 行（{rate:.0f} 行/秒）")
+        return now
@@ -0,0 +1,116 @@
+import time
+import threading
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """初始化令牌桶限流器，rate为每秒允许的请求数"""
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            wait = self._take()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """尝试获取一个令牌，不等待；成功返回True"""
+        if self.rate <= 0:
+            return True
+        return self._take() == 0
+
+    def _take(self):
+        """补充令牌后尝试取走一个，成功返回0，否则返回需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class HostRateLimiter:
+    def __init__(self, default_rate=5, host_rates=None):
+        """初始化按主机划分的限流器，每个主机独立一个令牌桶"""
+        self.default_rate = default_rate
+        self.host_rates = host_rates or {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, host):
+        """为指定主机获取一个请求令牌"""
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(
+                    self.host_rates.get(host, self.default_rate))
+                self.limiters[host] = limiter
+        limiter.acquire()
+
+
+class _Call:
+    def __init__(self):
+        """一次进行中的调用，等待者共享它的结果"""
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """初始化请求合并器：相同key的并发调用只执行一次，其余调用者共享结果"""
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """执行fn；若相同key的调用正在进行，则等待并返回同一个结果（或抛出同一个异常）"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self.calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        """返回实际执行次数、被合并的调用次数和当前进行中的调用数"""
+        with self.lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self.calls)
+            }
@@ -94,7 +94,45 @@ class ConfigManager:
             "data_settings": {
                 "use_mock_data": True,
                 "historical_data_years": 5,
-                "max_news_articles": 100
+                "max_news_articles": 100,
+                "cache_enabled": True,
+                "cache_max_age": 300,
+                "max_workers": 8,
+                "requests_per_second": 5,
+                "rate_limits": {},
+                "market_data_providers": ["yahoo", "alpha_vantage", "quandl"],
+                "hedge_requests": True,
+                "bulk_chunk_size": 100,
+                "watchlist_news": False,
+                "news_max_concurrency": 4,
+                "news_max_pages": 5,
+                "intraday_interval": "",
+                "intraday_capacity": 2000,
+                "intraday_refresh_interval": 60,
+                "fetch_article_bodies": False,
+                "article_max_workers": 8,
+                "article_max_bytes": 2097152,
+                "news_dedup": True,
+                "news_dedup_threshold": 0.7,
+                "prefetch_enabled": True,
+                "prefetch_recent": 5,
+                "prefetch_cache_size": 16,
+                "array_store": True,
+                "panel_indicators": True,
+                "parallel_processing": True,
+                "parallel_workers": 0,
+                "parallel_min_bars": 500000
+            },
+            "network": {
+                "connect_timeout": 5,
+                "read_timeout": 15,
+                "max_retries": 3,
+                "backoff_base": 0.5,
+                "failure_threshold": 5,
+                "reset_timeout": 60,
+                "http_cache": True,
+                "archive_mode": "",
+                "replay_speed": 1.0
             },
             "model_parameters": {
                 "prediction_days": 30,
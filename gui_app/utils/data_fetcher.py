@@ -1,13 +1,36 @@
 import os
 import json
+import tempfile
 import datetime
 import numpy as np
 import pandas as pd
 import yfinance as yf
+import threading
 import requests
-from bs4 import BeautifulSoup
 import logging
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.history_store import HistoryStore, naive_index
+from utils.ohlcv_store import OHLCVArrayStore
+from utils.concurrency import HostRateLimiter, SingleFlight
+from utils.http_client import HttpClient, CircuitOpenError, create_session
+from utils.http_cache import HttpCache
+from utils.network_archive import NetworkArchive
+from utils.news_ingest import NewsIngestor
+from utils.article_fetcher import ArticleFetcher
+from utils.fundamentals_cache import FundamentalsCache
+from utils.providers import (ProviderRouter, YahooProvider, AlphaVantageProvider,
+                             QuandlProvider, LocalFileProvider)
+from utils.mock_data import generate_mock_ohlcv_batch, ohlcv_to_frame, generate_mock_news
+
+# 各数据源的主机名，用于按主机限流
+YAHOO_HOST = 'query2.finance.yahoo.com'
+NEWS_API_HOST = 'newsapi.org'
+YAHOO_QUOTE_HOST = 'finance.yahoo.com'
+
+# 默认的按主机限流设置（可用data_settings.rate_limits覆盖）：Alpha Vantage免费额度为每分钟5次
+DEFAULT_RATE_LIMITS = {'www.alphavantage.co': 5 / 60}
+NEWS_API_URL = f"https://{NEWS_API_HOST}/v2/everything"
 
 
 class DataFetcher:
@@ -25,14 +48,114 @@ class DataFetcher:
         # 设置日志
         self.logger = logging.getLogger(__name__)
 
+        # 本地行情存储（按股票和年份分区），只请求最后一根已存储K线之后的增量数据
+        data_settings = config.get('data_settings', {})
+        cache_dir = data_settings.get('cache_dir') or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'history')
+        self.cache_enabled = data_settings.get('cache_enabled', True)
+        self.history_store = HistoryStore(
+            cache_dir, max_age=data_settings.get('cache_max_age', 300))
+        # 旧版缓存（每只股票一个Parquet文件，默认位于cache/stocks）导入后删除
+        self.history_store.import_legacy_cache(data_settings.get('cache_dir') or os.path.join(
+            os.path.dirname(cache_dir), 'stocks'))
+        # 内存映射的OHLCV数组存储（由本地行情存储导出），以及由它计算出的预测模型特征存储，
+        # 两者共享日期索引和股票偏移表，DataProcessor和PredictionModel以零拷贝视图读取
+        array_store_dir = data_settings.get('array_store_dir') or os.path.join(
+            os.path.dirname(cache_dir), 'arrays')
+        self.array_store = OHLCVArrayStore(os.path.join(array_store_dir, 'ohlcv'))
+        self.feature_store = OHLCVArrayStore(os.path.join(array_store_dir, 'features'))
+
+        # 网络存档：录制真实的Yahoo Finance和NewsAPI响应，或不访问网络、从存档回放
+        network_settings = config.get('network', {})
+        self.network_archive = None
+        archive_mode = network_settings.get('archive_mode', '')
+        if archive_mode and not self.use_mock_data:
+            self.network_archive = NetworkArchive(
+                network_settings.get('archive_path') or os.path.join(
+                    os.path.dirname(cache_dir), 'network_archive.jsonl.gz'),
+                mode=archive_mode,
+                replay_speed=network_settings.get('replay_speed', 1.0))
+            self._isolate_yfinance_tz_cache()
+
+        # 并发获取设置：最大并发数和按主机的每秒请求数限制
+        self.max_workers = data_settings.get('max_workers', 8)
+        self.rate_limiter = HostRateLimiter(
+            default_rate=data_settings.get('requests_per_second', 5),
+            host_rates=dict(DEFAULT_RATE_LIMITS, **data_settings.get('rate_limits', {})))
+        if archive_mode == 'replay' and not network_settings.get('replay_speed', 1.0):
+            # 尽快回放时没有上游配额需要遵守
+            self.rate_limiter = HostRateLimiter(default_rate=0)
+
+        # 共享的HTTP客户端：连接池、超时、重试和熔断
+        # HTTP条件请求缓存：上游数据未变化时只需一次304响应（录制和回放时不使用，保证请求可复现）
+        self.http_cache = None
+        if network_settings.get('http_cache', True) and self.network_archive is None:
+            self.http_cache = HttpCache(network_settings.get('http_cache_dir') or os.path.join(
+                os.path.dirname(cache_dir), 'http'))
+        self.http = HttpClient(
+            timeout=(network_settings.get('connect_timeout', 5),
+                     network_settings.get('read_timeout', 15)),
+            max_retries=network_settings.get('max_retries', 3),
+            backoff_base=network_settings.get('backoff_base', 0.5),
+            failure_threshold=network_settings.get('failure_threshold', 5),
+            reset_timeout=network_settings.get('reset_timeout', 60),
+            pool_size=max(10, self.max_workers),
+            rate_limiter=self.rate_limiter,
+            cache=self.http_cache,
+            archive=self.network_archive)
+        # yfinance的Ticker请求（K线、盘中、基本面）也经过条件请求缓存和网络存档
+        self.yahoo_session = create_session(
+            max(10, self.max_workers), self.http_cache, self.network_archive)
+        # 最近一次成功获取的新闻，熔断或请求失败时返回
+        self._news_cache = {}
+
+        # 可选的新闻正文抓取器，正文与标题、摘要一起参与情感分析（模拟数据模式下不抓取）
+        self.article_fetcher = None
+        if data_settings.get('fetch_article_bodies', False) and not self.use_mock_data:
+            self.article_fetcher = ArticleFetcher(
+                self.http, os.path.join(os.path.dirname(cache_dir), 'articles'),
+                max_workers=data_settings.get('article_max_workers', 8),
+                max_bytes=data_settings.get('article_max_bytes', 2 * 1024 * 1024),
+                max_chars=data_settings.get('article_max_chars', 20000))
+
+        # 多数据源路由：按延迟选择数据源，慢请求对冲，出错自动切换
+        self.provider_router = ProviderRouter(
+            self._build_providers(data_settings),
+            hedge=data_settings.get('hedge_requests', True),
+            max_workers=self.max_workers)
+
+        # 合并同一股票同一时间范围的并发请求，只执行一次下载和解析
+        self._inflight = SingleFlight()
+
+        # 基本面数据缓存，按字段设置有效期并持久化，重启后仍然有效
+        self.fundamentals_cache = FundamentalsCache(
+            os.path.join(os.path.dirname(cache_dir), 'fundamentals.json'))
+
+        # 批量下载设置：每次请求的股票代码数量
+        self.bulk_chunk_size = data_settings.get('bulk_chunk_size', 100)
+        # yf.download使用模块级共享状态，同一时刻只能有一个批量下载
+        self._bulk_lock = threading.Lock()
+
+        # 可将Yahoo Finance和NewsAPI请求指向本地替身服务器（见run_stand_in_server.py），用于测试和压测
+        yahoo_base_url = data_settings.get('yahoo_base_url')
+        if yahoo_base_url:
+            yf.base._BASE_URL_ = yahoo_base_url.rstrip('/')
+        news_api_base_url = data_settings.get('news_api_base_url')
+        self.news_api_url = f"{news_api_base_url.rstrip('/')}/v2/everything" if news_api_base_url else NEWS_API_URL
+
     def fetch_stock_data(self, symbol, period=None):
-        """获取股票数据"""
+        """获取股票数据
+
+        同一(symbol, period)的并发调用会合并为一次获取，所有调用者得到同一个DataFrame，
+        调用方不应原地修改返回的数据。
+        """
         if period is None:
-            end_date = datetime.datetime.now()
-            start_date = end_date - \
-                datetime.timedelta(days=self.historical_data_years * 365)
-            period = f"{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}"
+            period = self._default_period()
 
+        return self._inflight.do(('stock', symbol, period), self._fetch_stock_data, symbol, period)
+
+    def _fetch_stock_data(self, symbol, period):
+        """获取股票数据（未合并的实际获取逻辑）"""
         try:
             if self.use_mock_data:
                 # 使用模拟数据
@@ -41,18 +164,88 @@ class DataFetcher:
             else:
                 # 使用真实API
                 self.logger.info(f"从Yahoo Finance获取股票 {symbol} 的数据")
-                stock = yf.Ticker(symbol)
-                data = stock.history(period=period)
-                return data
+                start_date, end_date = self._parse_period(period)
+                if self.cache_enabled and self.history_store.enabled:
+                    return self._fetch_cached_stock_data(symbol, start_date, end_date)
+                return self._download_stock_history(symbol, start_date, end_date)
         except Exception as e:
             self.logger.error(f"获取股票 {symbol} 数据时出错: {str(e)}")
             return self._generate_mock_stock_data(symbol, period)
 
-    def _generate_mock_stock_data(self, symbol, period):
-        """生成模拟股票数据"""
-        self.logger.info(f"为股票 {symbol} 生成模拟数据")
+    def _default_period(self):
+        """默认获取最近historical_data_years年的数据"""
+        end_date = datetime.datetime.now()
+        start_date = end_date - \
+            datetime.timedelta(days=self.historical_data_years * 365)
+        return f"{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}"
+
+    def _build_providers(self, data_settings):
+        """按配置顺序创建行情数据源，缺少API密钥的数据源会被跳过"""
+        providers = []
+        for name in data_settings.get('market_data_providers', ['yahoo', 'alpha_vantage', 'quandl']):
+            if name == 'yahoo':
+                providers.append(YahooProvider(self.rate_limiter, self.yahoo_session))
+            elif name == 'alpha_vantage' and self.api_keys.get('alpha_vantage'):
+                providers.append(AlphaVantageProvider(
+                    self.http, self.api_keys['alpha_vantage'],
+                    base_url=data_settings.get('alpha_vantage_base_url', 'https://www.alphavantage.co')))
+            elif name == 'quandl' and self.api_keys.get('quandl'):
+                providers.append(QuandlProvider(
+                    self.http, self.api_keys['quandl'],
+                    base_url=data_settings.get('quandl_base_url', 'https://data.nasdaq.com'),
+                    database=data_settings.get('quandl_database', 'EOD')))
+            elif name == 'local' and data_settings.get('local_data_dir'):
+                providers.append(LocalFileProvider(data_settings['local_data_dir']))
+        if not providers:
+            providers.append(YahooProvider(self.rate_limiter, self.yahoo_session))
+        return providers
+
+    def _download_stock_history(self, symbol, start_date, end_date):
+        """从行情数据源下载指定日期范围的K线，所有数据源都失败时返回空DataFrame"""
+        try:
+            return self.provider_router.fetch_history(symbol, start_date, end_date)
+        except Exception as e:
+            self.logger.error(str(e))
+            return pd.DataFrame()
 
-        # 解析period参数
+    def _fetch_cached_stock_data(self, symbol, start_date, end_date):
+        """优先读取本地行情存储，只下载最后一根已存储K线之后的增量数据并合并"""
+        meta = self.history_store.get_meta(symbol)
+        range_start = pd.Timestamp(start_date).normalize()
+
+        if meta is None or meta['covered_from'] > range_start:
+            # 存储中没有或不够早，下载完整区间并合并进存储
+            data = self._download_stock_history(symbol, start_date, end_date)
+            if not data.empty:
+                self.history_store.merge(symbol, data, covered_from=range_start)
+                return self._slice_period(data, start_date, end_date)
+            if meta is None:
+                return data
+        elif self.history_store.is_fresh(meta, end_date):
+            self.logger.info(f"股票 {symbol} 的本地数据已是最新")
+        else:
+            last_bar = meta['last_bar'].to_pydatetime()
+            try:
+                delta = self._download_stock_history(symbol, last_bar, end_date)
+            except Exception as e:
+                self.logger.warning(f"获取股票 {symbol} 的增量数据失败，使用本地数据: {str(e)}")
+                delta = None
+            self.logger.info(
+                f"股票 {symbol} 从 {last_bar.strftime('%Y-%m-%d')} 起增量获取 {0 if delta is None else len(delta)} 条数据")
+            self.history_store.merge(symbol, delta)
+
+        # 只读取所需日期范围涉及的年份分区
+        return self.history_store.read_range(symbol, start_date, end_date)
+
+    def _slice_period(self, data, start_date, end_date):
+        """截取指定日期范围内的K线"""
+        index = naive_index(data.index)
+        mask = (index >= pd.Timestamp(start_date).normalize()) & \
+            (index < pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+        return data[mask]
+
+    def _parse_period(self, period):
+        """将period参数解析为(开始日期, 结束日期)"""
         if '_' in period:
             start_date, end_date = period.split('_')
             start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d')
@@ -81,44 +274,62 @@ class DataFetcher:
             else:
                 start_date = end_date - datetime.timedelta(days=365)
 
-        # 生成日期范围
-        dates = pd.date_range(start=start_date, end=end_date, freq='B')  # 工作日
+        return start_date, end_date
+
+    def _generate_mock_stock_data(self, symbol, period):
+        """生成模拟股票数据"""
+        self.logger.info(f"为股票 {symbol} 生成模拟数据")
 
-        # 生成基础价格序列（随机游走）
-        np.random.seed(hash(symbol) % 10000)  # 使用符号作为种子，确保同一符号的数据一致
-        base_price = 100 + np.random.randn() * 50
-        returns = np.random.normal(0.001, 0.02, size=len(dates))
-        price_series = base_price * np.exp(np.cumsum(returns))
+        # 解析period参数
+        start_date, end_date = self._parse_period(period)
 
-        # 生成OHLCV数据
-        data = pd.DataFrame(index=dates)
-        data['Close'] = price_series
+        # 生成日期范围
+        dates = pd.date_range(start=start_date, end=end_date, freq='B', normalize=True)  # 工作日
 
-        # 生成开盘价（通常接近前一天的收盘价）
-        data['Open'] = data['Close'].shift(
-            1) * (1 + np.random.normal(0, 0.005, size=len(dates)))
-        data['Open'].iloc[0] = data['Close'].iloc[0] * \
-            (1 + np.random.normal(0, 0.005))
+        # 使用按股票代码稳定播种的批量生成器，保证跨进程可复现
+        ohlcv = generate_mock_ohlcv_batch([symbol], dates)
+        return ohlcv_to_frame(ohlcv, dates)
 
-        # 生成最高价和最低价
-        high_factor = 1 + np.abs(np.random.normal(0, 0.01, size=len(dates)))
-        low_factor = 1 - np.abs(np.random.normal(0, 0.01, size=len(dates)))
-        data['High'] = data[['Open', 'Close']].max(axis=1) * high_factor
-        data['Low'] = data[['Open', 'Close']].min(axis=1) * low_factor
+    def _generate_mock_stock_batch(self, symbols, period):
+        """一次向量化生成多只股票的模拟数据，用于大规模压测"""
+        self.logger.info(f"为 {len(symbols)} 只股票批量生成模拟数据")
+        start_date, end_date = self._parse_period(period)
+        dates = pd.date_range(start=start_date, end=end_date, freq='B', normalize=True)  # 工作日
+        ohlcv = generate_mock_ohlcv_batch(symbols, dates)
+        return {symbol: ohlcv_to_frame(ohlcv, dates, i) for i, symbol in enumerate(symbols)}
 
-        # 确保最高价不低于开盘价和收盘价，最低价不高于开盘价和收盘价
-        data['High'] = data[['High', 'Open', 'Close']].max(axis=1)
-        data['Low'] = data[['Low', 'Open', 'Close']].min(axis=1)
+    def fetch_intraday_bars(self, symbol, interval='1m', since=None):
+        """获取盘中K线：since为None时获取当天的全部K线，否则只获取since及之后的K线
 
-        # 生成成交量
-        data['Volume'] = np.random.lognormal(
-            15, 1, size=len(dates)).astype(int)
+        since所在的K线也会返回，因为它在上次获取时可能尚未收盘。
+        """
+        try:
+            if self.use_mock_data:
+                bars = self._generate_mock_intraday_bars(symbol, interval)
+            else:
+                self.rate_limiter.acquire(YAHOO_HOST)
+                stock = yf.Ticker(symbol, session=self.yahoo_session)
+                if since is None:
+                    bars = stock.history(period='1d', interval=interval)
+                else:
+                    # Yahoo Finance只提供最近7天的1分钟K线
+                    earliest = pd.Timestamp.now(tz=since.tz) - pd.Timedelta(days=6)
+                    bars = stock.history(start=max(since, earliest), interval=interval)
+        except Exception as e:
+            self.logger.error(f"获取股票 {symbol} 的盘中数据时出错: {str(e)}")
+            return pd.DataFrame()
 
-        # 添加股息和股票分割（通常为0）
-        data['Dividends'] = 0
-        data['Stock Splits'] = 0
+        if since is not None and not bars.empty:
+            bars = bars[bars.index >= since]
+        return bars
 
-        return data
+    def _generate_mock_intraday_bars(self, symbol, interval):
+        """生成当天从零点到当前时刻的模拟盘中K线，同一天内结果稳定"""
+        now = pd.Timestamp.now()
+        freq = interval.replace('m', 'min')
+        dates = pd.date_range(now.normalize(), now.floor(freq), freq=freq)
+        ohlcv = generate_mock_ohlcv_batch([symbol], dates, seed=now.toordinal())
+        return ohlcv_to_frame(ohlcv, dates)
 
     def fetch_news_data(self, query='artificial intelligence', max_articles=None):
         """获取新闻数据"""
@@ -139,142 +350,447 @@ class DataFetcher:
                     self.logger.warning("未找到News API密钥，使用模拟数据")
                     return self._generate_mock_news_data(query, max_articles)
 
-                url = f"https://newsapi.org/v2/everything?q={query}&sortBy=publishedAt&apiKey={news_api_key}"
-                response = requests.get(url)
+                params = {'q': query, 'sortBy': 'publishedAt', 'apiKey': news_api_key}
+                response = self.http.get(self.news_api_url, params=params)
+                if getattr(response, 'from_cache', False) and query in self._news_cache:
+                    # 上游数据未变化（仍在有效期内或返回304），直接复用已解析的结果
+                    self.logger.info(f"关于 '{query}' 的新闻未变化，使用缓存")
+                    return self._news_cache[query][:max_articles]
                 if response.status_code == 200:
                     news_data = response.json()
                     articles = news_data.get('articles', [])[:max_articles]
+                    self._news_cache[query] = articles
                     return articles
                 else:
                     self.logger.error(f"获取新闻数据失败，状态码: {response.status_code}")
-                    return self._generate_mock_news_data(query, max_articles)
+                    return self._cached_news_or_mock(query, max_articles)
+        except CircuitOpenError as e:
+            self.logger.warning(f"{str(e)}，使用缓存的新闻数据")
+            return self._cached_news_or_mock(query, max_articles)
         except Exception as e:
             self.logger.error(f"获取新闻数据时出错: {str(e)}")
-            return self._generate_mock_news_data(query, max_articles)
+            return self._cached_news_or_mock(query, max_articles)
+
+    def fetch_watchlist_news(self, symbols=None, query=None, max_articles=None, on_page=None):
+        """获取自选股和主题的新闻：每只股票一个查询加上主题查询，异步并发翻页并按URL去重
+
+        on_page在每页新闻返回后以该页新增的文章列表调用（在采集线程中），
+        返回值仍是全部页面收齐后按发布时间排序截断的结果。
+        """
+        if symbols is None:
+            symbols = self.stock_symbols
+        if query is None:
+            query = self.config.get('news_query', 'artificial intelligence')
+        if max_articles is None:
+            max_articles = self.config.get(
+                'data_settings', {}).get('max_news_articles', 100)
+        queries = list(dict.fromkeys(list(symbols) + [query]))
+
+        try:
+            news_api_key = self.api_keys.get('news_api')
+            if self.use_mock_data or not news_api_key:
+                self.logger.info(f"使用模拟数据获取 {len(queries)} 个查询的新闻")
+                per_query = max(1, max_articles // len(queries))
+                articles = []
+                for q in queries:
+                    articles.extend(self._generate_mock_news_data(q, per_query))
+                articles.sort(key=lambda x: x['publishedAt'], reverse=True)
+                return articles[:max_articles]
+
+            self.logger.info(f"从NewsAPI并发获取 {len(queries)} 个查询的新闻")
+            data_settings = self.config.get('data_settings', {})
+            ingestor = NewsIngestor(
+                self.http, self.news_api_url, news_api_key,
+                max_concurrency=data_settings.get('news_max_concurrency', 4),
+                max_pages=data_settings.get('news_max_pages', 5))
+            articles = ingestor.fetch_all(queries, max_articles, on_page=on_page)
+            if articles:
+                self._news_cache[tuple(queries)] = articles
+                return articles
+            return self._cached_news_or_mock(tuple(queries), max_articles, query)
+        except Exception as e:
+            self.logger.error(f"获取自选股新闻时出错: {str(e)}")
+            return self._cached_news_or_mock(tuple(queries), max_articles, query)
+
+    def _cached_news_or_mock(self, cache_key, max_articles, query=None):
+        """数据源不可用时优先返回上次成功获取的新闻，否则生成模拟数据"""
+        cached = self._news_cache.get(cache_key)
+        if cached:
+            return cached[:max_articles]
+        return self._generate_mock_news_data(query or cache_key, max_articles)
+
+    def get_coalescing_stats(self):
+        """返回请求合并的统计：实际执行次数和被合并的调用次数"""
+        return self._inflight.stats()
+
+    def get_network_stats(self):
+        """返回各数据源主机的请求延迟、失败次数和熔断器状态"""
+        return self.http.get_stats()
+
+    def get_network_archive_stats(self):
+        """返回网络存档的录制、回放和未命中次数，未启用时返回None"""
+        if self.network_archive is None:
+            return None
+        return self.network_archive.get_stats()
+
+    def _isolate_yfinance_tz_cache(self):
+        """让yfinance使用空的时区缓存，使时区查询请求在录制和回放时都会发出"""
+        try:
+            yf.set_tz_cache_location(tempfile.mkdtemp(prefix='yf_tz_'))
+        except AssertionError:
+            self.logger.warning("yfinance时区缓存已初始化，回放时可能缺少时区查询的响应")
+
+    def get_http_cache_stats(self):
+        """返回HTTP条件请求缓存的命中统计，未启用时返回None"""
+        if self.http_cache is None:
+            return None
+        return self.http_cache.get_stats()
+
+    def get_provider_stats(self):
+        """返回各行情数据源的延迟分位数、胜出次数，以及对冲和切换次数"""
+        return self.provider_router.get_stats()
 
     def _generate_mock_news_data(self, query, max_articles):
         """生成模拟新闻数据"""
         self.logger.info(f"为查询 '{query}' 生成模拟新闻数据")
 
-        # 模拟新闻标题模板
-        positive_templates = [
-            f"{query}技术取得重大突破",
-            f"专家看好{query}未来发展",
-            f"{query}行业获得大量投资",
-            f"{query}应用范围不断扩大",
-            f"{query}技术助力经济增长",
-            f"{query}企业发布创新产品",
-            f"{query}研究取得新进展",
-            f"{query}市场前景广阔"
-        ]
-
-        negative_templates = [
-            f"{query}技术面临挑战",
-            f"专家担忧{query}发展风险",
-            f"{query}行业投资降温",
-            f"{query}应用引发争议",
-            f"{query}技术可能带来失业问题",
-            f"{query}企业遭遇困境",
-            f"{query}研究遇到瓶颈",
-            f"{query}市场前景不明朗"
-        ]
-
-        neutral_templates = [
-            f"{query}技术发展现状分析",
-            f"专家讨论{query}未来趋势",
-            f"{query}行业投资情况报告",
-            f"{query}应用场景探讨",
-            f"{query}技术对社会的影响",
-            f"{query}企业最新动态",
-            f"{query}研究进展综述",
-            f"{query}市场分析报告"
-        ]
-
-        # 模拟新闻来源
-        sources = self.news_sources if self.news_sources else [
-            "TechCrunch", "Reuters", "Bloomberg", "WSJ", "CNBC",
-            "Forbes", "The Verge", "Wired", "TechRadar", "CNET"
-        ]
-
-        # 生成模拟新闻文章
-        articles = []
-        for i in range(max_articles):
-            # 随机选择情感倾向
-            sentiment = np.random.choice(
-                ['positive', 'negative', 'neutral'], p=[0.4, 0.2, 0.4])
-
-            # 根据情感倾向选择标题模板
-            if sentiment == 'positive':
-                title_template = np.random.choice(positive_templates)
-            elif sentiment == 'negative':
-                title_template = np.random.choice(negative_templates)
-            else:
-                title_template = np.random.choice(neutral_templates)
-
-            # 生成标题
-            title = title_template
+        return generate_mock_news(query, max_articles, sources=self.news_sources)
 
-            # 生成描述
-            description = f"这是一篇关于{query}的新闻文章。文章讨论了{query}的最新发展和未来前景。"
-
-            # 生成发布日期（最近30天内随机）
-            publish_date = datetime.datetime.now(
-            ) - datetime.timedelta(days=np.random.randint(0, 30))
+    def fetch_multiple_stocks(self, symbols=None, period=None):
+        """获取多只股票的数据"""
+        if symbols is None:
+            symbols = self.stock_symbols
 
-            # 随机选择来源
-            source = np.random.choice(sources)
+        if self.use_mock_data:
+            if period is None:
+                period = self._default_period()
+            return self._generate_mock_stock_batch(symbols, period)
 
-            # 生成URL
-            url = f"https://example.com/{source.lower().replace(' ', '')}/{query.replace(' ', '-')}-{i}"
+        stock_data = {}
 
-            # 生成文章
-            article = {
-                'title': title,
-                'description': description,
-                'publishedAt': publish_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                'source': {'name': source},
-                'url': url,
-                'sentiment': sentiment
-            }
+        with tqdm(total=len(symbols), desc="获取股票数据") as progress:
+            for symbol, data in self.iter_fetch_stocks(symbols, period):
+                if not data.empty:
+                    stock_data[symbol] = data
+                progress.update(1)
 
-            articles.append(article)
+        # 按输入顺序返回
+        return {symbol: stock_data[symbol] for symbol in symbols if symbol in stock_data}
 
-        # 按发布日期排序
-        articles.sort(key=lambda x: x['publishedAt'], reverse=True)
+    def iter_fetch_stocks(self, symbols=None, period=None, max_workers=None):
+        """并发获取多只股票的数据，按完成顺序逐个产出(symbol, data)"""
+        if symbols is None:
+            symbols = self.stock_symbols
+        if not symbols:
+            return
 
-        return articles
+        if max_workers is None:
+            max_workers = self.max_workers
+        max_workers = max(1, min(max_workers, len(symbols)))
 
-    def fetch_multiple_stocks(self, symbols=None, period=None):
-        """获取多只股票的数据"""
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(self.fetch_stock_data, symbol, period): symbol
+                   for symbol in symbols}
+        try:
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    self.logger.error(f"获取股票 {symbol} 数据时出错: {str(e)}")
+                    data = pd.DataFrame()
+                yield symbol, data
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的任务
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def fetch_stocks_bulk(self, symbols=None, period=None, chunk_size=None):
+        """批量获取多只股票的数据
+
+        每次请求包含多个股票代码，宽表按代码拆分为各自的DataFrame；
+        批量请求中失败的代码经provider_router逐个重试，仍失败时使用本地存储中已有的K线。
+        """
         if symbols is None:
             symbols = self.stock_symbols
+        if period is None:
+            period = self._default_period()
+        if chunk_size is None:
+            chunk_size = self.bulk_chunk_size
+
+        if self.use_mock_data:
+            return self.fetch_multiple_stocks(symbols, period)
+
+        start_date, end_date = self._parse_period(period)
+        covered_from = pd.Timestamp(start_date).normalize()
+        use_store = self.cache_enabled and self.history_store.enabled
+
+        # 按下载起始日期分组：存储已覆盖的股票只需下载增量，其余下载完整区间
+        # results中值为None的股票最后从本地存储按日期范围读取
+        results = {}
+        groups = {}
+        for symbol in symbols:
+            meta = self.history_store.get_meta(symbol) if use_store else None
+            if meta is None or meta['covered_from'] > covered_from:
+                groups.setdefault(start_date, []).append(symbol)
+            elif self.history_store.is_fresh(meta, end_date):
+                results[symbol] = None
+            else:
+                groups.setdefault(meta['last_bar'].to_pydatetime(), []).append(symbol)
+
+        failed = []
+        for group_start, group_symbols in groups.items():
+            for i in range(0, len(group_symbols), chunk_size):
+                chunk = group_symbols[i:i + chunk_size]
+                self.logger.info(
+                    f"从Yahoo Finance批量获取 {len(chunk)} 只股票自 {group_start.strftime('%Y-%m-%d')} 起的数据")
+                try:
+                    frames = self._download_bulk_history(chunk, group_start, end_date)
+                except Exception as e:
+                    self.logger.error(f"批量获取股票数据时出错: {str(e)}")
+                    frames = {}
+
+                for symbol in chunk:
+                    data = frames.get(symbol)
+                    if data is None:
+                        failed.append(symbol)
+                        # 所有数据源都失败时，存储中已有的K线仍可使用
+                        if use_store and self.history_store.get_meta(symbol) is not None:
+                            results[symbol] = None
+                        continue
+                    if use_store:
+                        self.history_store.merge(symbol, data, covered_from=covered_from)
+                    # 增量数据只包含最近的K线，完整区间需从存储读取
+                    results[symbol] = data if group_start == start_date else None
+
+        if failed:
+            self.logger.warning(f"{len(failed)} 只股票在所有数据源都获取失败: {', '.join(failed)}")
 
         stock_data = {}
-
-        for symbol in tqdm(symbols, desc="获取股票数据"):
-            data = self.fetch_stock_data(symbol, period)
+        for symbol in symbols:
+            if symbol not in results:
+                continue
+            data = results[symbol]
+            if data is None:
+                data = self.history_store.read_range(symbol, start_date, end_date)
+            else:
+                data = self._slice_period(data, start_date, end_date)
             if not data.empty:
                 stock_data[symbol] = data
-
         return stock_data
 
-    def fetch_stock_fundamentals(self, symbol):
-        """获取股票基本面数据"""
+    def _download_bulk_history(self, symbols, start_date, end_date):
+        """一次请求下载多只股票的K线，返回{symbol: DataFrame}
+
+        批量请求中没有返回数据的代码再经provider_router逐个获取（按各数据源的延迟选择和对冲），
+        结果中仍缺少的代码在所有数据源都失败。
+        """
+        if self.network_archive is not None:
+            frames = self._download_history_per_symbol(symbols, start_date, end_date)
+        else:
+            try:
+                with self._bulk_lock:
+                    self.rate_limiter.acquire(YAHOO_HOST)
+                    # 参数与Ticker.history保持一致，使批量和逐个获取的数据格式相同
+                    wide = yf.download(
+                        symbols,
+                        start=start_date.strftime('%Y-%m-%d'),
+                        end=(end_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
+                        group_by='ticker',
+                        actions=True,
+                        auto_adjust=True,
+                        ignore_tz=False,
+                        threads=max(1, min(self.max_workers, len(symbols))),
+                        progress=False,
+                        show_errors=False)
+                frames = self._split_bulk_frame(wide, symbols)
+            except Exception as e:
+                self.logger.error(f"批量获取股票数据时出错: {str(e)}")
+                frames = {}
+
+        missing = [symbol for symbol in symbols if symbol not in frames]
+        if missing:
+            self.logger.warning(f"批量请求中 {len(missing)} 只股票获取失败，经数据源路由逐个重试")
+            frames.update(self._download_history_with_router(missing, start_date, end_date))
+        return frames
+
+    def _download_history_with_router(self, symbols, start_date, end_date):
+        """经provider_router并发地逐只获取K线，返回{symbol: DataFrame}，失败的代码不在结果中"""
+        result = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(symbols)))) as executor:
+            futures = {executor.submit(self._download_stock_history, symbol, start_date, end_date): symbol
+                       for symbol in symbols}
+            for future in as_completed(futures):
+                data = future.result()
+                if not data.empty:
+                    result[futures[future]] = data
+        return result
+
+    def _download_history_per_symbol(self, symbols, start_date, end_date):
+        """并发地逐只下载K线，返回{symbol: DataFrame}
+
+        yf.download不接受session参数，无法经过网络存档；它本身也是每只股票一个请求，
+        因此录制和回放时改用共享会话上的Ticker.history，请求内容相同。
+        """
+        def download(symbol):
+            self.rate_limiter.acquire(YAHOO_HOST)
+            return yf.Ticker(symbol, session=self.yahoo_session).history(
+                start=start_date.strftime('%Y-%m-%d'),
+                end=(end_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
+                actions=True,
+                auto_adjust=True)
+
+        result = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(symbols)))) as executor:
+            futures = {executor.submit(download, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    self.logger.error(f"下载股票 {symbol} 的K线时出错: {str(e)}")
+                    continue
+                if data is not None and not data.empty:
+                    result[symbol] = data
+        return result
+
+    def _split_bulk_frame(self, wide, symbols):
+        """将按代码分组的宽表拆分为每只股票的DataFrame
+
+        每只股票的列在宽表中是连续的，按列位置切片得到的是视图，不会复制数据。
+        """
+        if wide is None or wide.empty:
+            return {}
+
+        if not isinstance(wide.columns, pd.MultiIndex):
+            # 只有一个代码时yf.download返回普通的DataFrame
+            frames = {symbols[0]: wide}
+        else:
+            frames = {}
+            tickers = set(wide.columns.get_level_values(0))
+            for symbol in symbols:
+                ticker = symbol.upper()
+                if ticker not in tickers:
+                    continue
+                frame = wide.iloc[:, wide.columns.get_loc(ticker)]
+                frame.columns = frame.columns.droplevel(0)
+                frames[symbol] = frame
+
+        # 去掉对齐宽表时补出的空行（其他股票有数据而该股票没有的日期）
+        result = {}
+        for symbol, frame in frames.items():
+            valid = frame['Close'].notna()
+            if not valid.any():
+                continue
+            if not valid.all():
+                frame = frame[valid]
+            result[symbol] = frame
+        return result
+
+    def build_array_store(self, symbols=None, period='max'):
+        """将本地行情存储中的K线导出为内存映射的OHLCV数组存储，返回写入的股票数
+
+        只读取本地存储，不发起网络请求；需要最新数据时先调用fetch_stocks_bulk。
+        """
+        if symbols is None:
+            symbols = self.stock_symbols
+        if not self.history_store.enabled:
+            self.logger.warning("本地行情存储不可用，无法生成数组存储")
+            return 0
+
+        start_date, end_date = self._parse_period(period)
+        try:
+            # 第一遍只读取收盘价列，得到所有股票的共享日期索引
+            dates = pd.DatetimeIndex([])
+            stored = []
+            for symbol in symbols:
+                closes = self.history_store.read_range(symbol, start_date, end_date, columns=['Close'])
+                if closes.empty:
+                    continue
+                stored.append(symbol)
+                dates = dates.union(naive_index(closes.index).normalize())
+
+            if not stored:
+                self.logger.warning("本地行情存储中没有可导出的股票数据")
+                return 0
+
+            # 第二遍逐只写入，内存中同时只保留一只股票的数据
+            self.array_store.create(stored, dates)
+            for symbol in stored:
+                self.array_store.write(symbol, self.history_store.read_range(symbol, start_date, end_date))
+            self.array_store.finish()
+            self.array_store.open()
+            return len(stored)
+        except Exception as e:
+            self.logger.error(f"生成OHLCV数组存储时出错: {str(e)}")
+            return 0
+
+    def fetch_stock_fundamentals(self, symbol, fields=None):
+        """获取股票基本面数据
+
+        真实数据按字段有效期缓存，只重新获取fields中（默认为全部已列出的字段）过期的字段：
+        只有每天变化的估值指标过期时，用最近一年的日K线和已缓存的季度数据推算，
+        不下载完整的info。同一股票的并发调用会合并为一次获取。
+        """
+        key = ('fundamentals', symbol, tuple(fields) if fields is not None else None)
+        return self._inflight.do(key, self._fetch_stock_fundamentals, symbol, fields)
+
+    def _fetch_stock_fundamentals(self, symbol, fields):
+        """获取股票基本面数据（未合并的实际获取逻辑）
+
+        所需字段都在各自的有效期内时直接返回缓存；有字段过期时从数据源获取info，
+        不在本地推算，保证估值指标与数据源一致。
+        """
         try:
             if self.use_mock_data:
                 # 使用模拟数据
                 self.logger.info(f"使用模拟数据获取股票 {symbol} 的基本面数据")
                 return self._generate_mock_fundamentals(symbol)
             else:
+                cached, stale = self.fundamentals_cache.lookup(symbol, fields)
+                if not stale:
+                    return cached
+
                 # 使用真实API
-                self.logger.info(f"从Yahoo Finance获取股票 {symbol} 的基本面数据")
-                stock = yf.Ticker(symbol)
+                stock = yf.Ticker(symbol, session=self.yahoo_session)
+                self.logger.info(f"从Yahoo Finance获取股票 {symbol} 的基本面数据（{len(stale)} 个字段已过期）")
+                self.rate_limiter.acquire(YAHOO_QUOTE_HOST)
                 info = stock.info
+                if info:
+                    self.fundamentals_cache.update(
+                        symbol, info, list(self.fundamentals_cache.field_ttls))
+                    return {**cached, **info}
                 return info
         except Exception as e:
             self.logger.error(f"获取股票 {symbol} 基本面数据时出错: {str(e)}")
+            stale = self.fundamentals_cache.get_stale(symbol)
+            if stale:
+                self.logger.warning(f"使用股票 {symbol} 已过期的基本面缓存")
+                return stale
             return self._generate_mock_fundamentals(symbol)
 
+    def warm_fundamentals(self, symbols=None, max_workers=None):
+        """在后台并发预热多只股票的基本面缓存，跳过缓存仍有效的股票，返回Future列表"""
+        if symbols is None:
+            symbols = self.stock_symbols
+        if self.use_mock_data:
+            return []
+
+        stale = [symbol for symbol in symbols
+                 if self.fundamentals_cache.lookup(symbol)[1]]
+        if not stale:
+            return []
+
+        self.logger.info(f"后台预热 {len(stale)} 只股票的基本面数据")
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers or self.max_workers, len(stale))))
+        futures = [executor.submit(self.fetch_stock_fundamentals, symbol)
+                   for symbol in stale]
+        # 不等待任务完成，线程池在任务结束后自动回收
+        executor.shutdown(wait=False)
+        return futures
+
     def _generate_mock_fundamentals(self, symbol):
         """生成模拟基本面数据"""
         self.logger.info(f"为股票 {symbol} 生成模拟基本面数据")
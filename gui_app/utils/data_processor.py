@@ -4,7 +4,33 @@ import logging
 from textblob import TextBlob
 import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import ta
+
+from utils.news_dedup import cluster_articles
+from utils.indicator_engine import IndicatorEngine, INDICATOR_COLUMNS
+from utils.indicator_kernel import compute_indicators
+from utils.parallel_indicators import IndicatorPool
+from utils.lazy_indicators import LazyIndicatorFrame
+
+# 预测模型的特征列（按此顺序），数据中没有的列跳过；收盘价在第3列
+PREDICTION_FEATURES = [
+    'Open', 'High', 'Low', 'Close', 'Volume',
+    'MA5', 'MA10', 'MA20', 'MA50',
+    'EMA12', 'EMA26',
+    'MACD', 'MACD_signal', 'MACD_hist',
+    'RSI',
+    'BB_upper', 'BB_middle', 'BB_lower',
+    'STOCH_K', 'STOCH_D',
+    'WILLIAMS_R', 'CCI', 'ADX', 'Momentum',
+    'Volatility', 'Volatility_Std',
+    'vader_compound', 'vader_positive', 'vader_negative',
+    'vader_neutral', 'textblob_polarity', 'textblob_subjectivity'
+]
+
+# 情感分析写入文章的字段，同一簇的重复新闻直接复用代表文章的结果
+SENTIMENT_FIELDS = [
+    'textblob_polarity', 'textblob_subjectivity', 'vader_compound',
+    'vader_positive', 'vader_negative', 'vader_neutral', 'sentiment'
+]
 
 
 class DataProcessor:
@@ -22,73 +48,36 @@ class DataProcessor:
             nltk.download('vader_lexicon')
         self.sia = SentimentIntensityAnalyzer()
 
+        # 增量技术指标引擎，按股票保存指标的运行状态
+        self.indicator_engine = IndicatorEngine()
+
+        # 面板模式：多只股票对齐到同一日期索引后一次计算指标
+        data_settings = config.get('data_settings', {})
+        self.panel_indicators = data_settings.get('panel_indicators', True)
+
+        # 多进程计算面板指标，K线总数较少时在当前进程中计算
+        parallel = data_settings.get('parallel_processing', True)
+        self.indicator_pool = IndicatorPool(
+            max_workers=data_settings.get('parallel_workers') if parallel else 1,
+            min_bars=data_settings.get('parallel_min_bars', 500000))
+
     def process_stock_data(self, data):
         """处理股票数据，添加技术指标"""
         if data.empty:
             return data
 
         try:
-            # 确保数据按日期排序
-            data = data.sort_index()
-
-            # 添加技术指标
-            # 移动平均线
-            data['MA5'] = ta.trend.sma_indicator(data['Close'], window=5)
-            data['MA10'] = ta.trend.sma_indicator(data['Close'], window=10)
-            data['MA20'] = ta.trend.sma_indicator(data['Close'], window=20)
-            data['MA50'] = ta.trend.sma_indicator(data['Close'], window=50)
-
-            # 指数移动平均线
-            data['EMA12'] = ta.trend.ema_indicator(data['Close'], window=12)
-            data['EMA26'] = ta.trend.ema_indicator(data['Close'], window=26)
-
-            # MACD
-            macd = ta.trend.MACD(data['Close'])
-            data['MACD'] = macd.macd()
-            data['MACD_signal'] = macd.macd_signal()
-            data['MACD_hist'] = macd.macd_diff()
-
-            # RSI
-            data['RSI'] = ta.momentum.rsi(data['Close'], window=14)
-
-            # 布林带
-            bollinger = ta.volatility.BollingerBands(data['Close'])
-            data['BB_upper'] = bollinger.bollinger_hband()
-            data['BB_middle'] = bollinger.bollinger_mavg()
-            data['BB_lower'] = bollinger.bollinger_lband()
-
-            # 随机指标
-            stoch = ta.momentum.StochasticOscillator(
-                data['High'], data['Low'], data['Close'])
-            data['STOCH_K'] = stoch.stoch()
-            data['STOCH_D'] = stoch.stoch_signal()
-
-            # 威廉指标
-            data['WILLIAMS_R'] = ta.momentum.williams_r(
-                data['High'], data['Low'], data['Close'])
-
-            # 商品通道指数
-            data['CCI'] = ta.trend.cci(
-                data['High'], data['Low'], data['Close'])
-
-            # 平均方向指数
-            adx = ta.trend.ADXIndicator(
-                data['High'], data['Low'], data['Close'])
-            data['ADX'] = adx.adx()
-
-            # 动量指标
-            data['Momentum'] = ta.momentum.roc(data['Close'], window=10)
-
-            # 波动率
-            data['Volatility'] = ta.volatility.average_true_range(
-                data['High'], data['Low'], data['Close'])
-
-            # 计算日收益率
-            data['Daily_Return'] = data['Close'].pct_change()
-
-            # 计算波动率（标准差）
-            data['Volatility_Std'] = data['Daily_Return'].rolling(
-                window=20).std()
+            # 确保数据按日期排序（已排序时不复制，数组存储的零拷贝视图保持不变）
+            if not data.index.is_monotonic_increasing:
+                data = data.sort_index()
+
+            # 添加技术指标：由向量化内核一次计算，各指标共用中间结果
+            indicators = compute_indicators(
+                data['High'].to_numpy(dtype=float),
+                data['Low'].to_numpy(dtype=float),
+                data['Close'].to_numpy(dtype=float))
+            data = self._attach_indicators(
+                data, np.column_stack([indicators[column] for column in INDICATOR_COLUMNS]))
 
             # 填充NaN值
             data = data.fillna(method='bfill').fillna(method='ffill')
@@ -98,53 +87,244 @@ class DataProcessor:
             self.logger.error(f"处理股票数据时出错: {str(e)}")
             return data
 
-    def process_news_data(self, news_data):
-        """处理新闻数据，添加情感分析"""
+    def process_stock_data_lazy(self, data):
+        """处理股票数据，技术指标在第一次访问时才计算，只用到部分指标的页面无需计算全部指标"""
+        if data.empty:
+            return data
+
+        try:
+            return LazyIndicatorFrame(data)
+        except Exception as e:
+            self.logger.error(f"创建按需计算的指标数据时出错: {str(e)}")
+            return self.process_stock_data(data)
+
+    def _attach_indicators(self, data, values):
+        """把按INDICATOR_COLUMNS排列的指标数组一次拼接到data后面，已有的同名列被替换"""
+        existing = [column for column in INDICATOR_COLUMNS if column in data.columns]
+        if existing:
+            data = data.drop(columns=existing)
+        indicators = pd.DataFrame(values, index=data.index, columns=INDICATOR_COLUMNS)
+        return pd.concat([data, indicators], axis=1)
+
+    def process_stock_panel(self, stock_data):
+        """一次处理多只股票，返回{股票代码: 处理后的DataFrame}，结果与逐只调用process_stock_data相同
+
+        所有股票对齐到合并后的日期索引，在(日期 × 股票)的二维数组上一次计算全部指标。
+        指标只依赖之前的K线，上市较晚或数据较早结束的股票直接对齐即可；
+        在合并索引中日期不连续的股票（缺少其他股票有的交易日）单独处理。
+        """
+        frames = {}
+        processed = {}
+        for symbol, data in stock_data.items():
+            if data is None or data.empty:
+                processed[symbol] = data
+            elif not data.index.is_unique:
+                processed[symbol] = self.process_stock_data(data)
+            else:
+                frames[symbol] = data.sort_index()
+
+        if self.panel_indicators and len(frames) > 1:
+            try:
+                index = frames[next(iter(frames))].index
+                for data in frames.values():
+                    if not data.index.equals(index):
+                        index = index.union(data.index)
+
+                panel = {}
+                for symbol, data in frames.items():
+                    positions = np.arange(len(data)) if data.index.equals(index) else index.get_indexer(data.index)
+                    if positions[0] >= 0 and positions[-1] - positions[0] == len(data) - 1:
+                        panel[symbol] = positions
+
+                if len(panel) > 1:
+                    shape = (len(index), len(panel))
+                    high, low, close = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+                    for column, (symbol, positions) in enumerate(panel.items()):
+                        data = frames[symbol]
+                        high[positions, column] = data['High'].to_numpy(dtype=float)
+                        low[positions, column] = data['Low'].to_numpy(dtype=float)
+                        close[positions, column] = data['Close'].to_numpy(dtype=float)
+                    # (日期, 指标, 股票)，数据量大时由多个进程并行计算，每只股票取出连续的一段行
+                    values = self.indicator_pool.compute(high, low, close)
+
+                    for column, (symbol, positions) in enumerate(panel.items()):
+                        data = self._attach_indicators(
+                            frames.pop(symbol), values[positions[0]:positions[-1] + 1, :, column])
+                        processed[symbol] = data.fillna(method='bfill').fillna(method='ffill')
+            except Exception as e:
+                self.logger.error(f"面板计算技术指标时出错: {str(e)}")
+
+        # 面板模式未处理的股票逐只处理
+        for symbol, data in frames.items():
+            processed[symbol] = self.process_stock_data(data)
+        return {symbol: processed[symbol] for symbol in stock_data}
+
+    def update_stock_data_incremental(self, key, processed_data, data, n_updated):
+        """用增量指标引擎为最新的n_updated根K线计算技术指标，每根K线的计算量与历史长度无关
+
+        key标识一组连续的K线（如股票代码），引擎为每个key保存指标的运行状态；
+        processed_data为上一次的处理结果，为空时用全部K线建立状态。结果与process_stock_data一致，
+        只是新K线中的NaN用前一根K线的值填充（之后的K线还不存在，无法向后填充）。
+        """
+        try:
+            if processed_data is None or processed_data.empty:
+                self.indicator_engine.reset(key)
+                indicators = self.indicator_engine.update(key, data, len(data))
+                result = pd.concat([data, indicators], axis=1)
+                return result.fillna(method='bfill').fillna(method='ffill')
+            if n_updated <= 0:
+                return processed_data
+
+            n_updated = min(n_updated, len(data))
+            indicators = self.indicator_engine.update(key, data, n_updated)
+            tail = pd.concat([data.iloc[-n_updated:], indicators], axis=1)
+            # 去掉已被更新的K线和已移出缓冲区的K线
+            kept = processed_data[(processed_data.index >= data.index[0]) &
+                                  (processed_data.index < tail.index[0])]
+            if kept.empty:
+                tail = tail.fillna(method='bfill').fillna(method='ffill')
+            else:
+                tail = pd.concat([kept.iloc[-1:], tail]).fillna(method='ffill').iloc[1:]
+            return pd.concat([kept, tail])
+        except Exception as e:
+            self.logger.error(f"增量计算技术指标时出错: {str(e)}")
+            self.indicator_engine.reset(key)
+            return self.process_stock_data(data)
+
+    def process_stored_stock(self, array_store, symbol, start_date=None, end_date=None):
+        """从内存映射的OHLCV数组存储读取股票K线并添加技术指标
+
+        读取K线时直接引用映射的页面（股票在共享日期索引中有空行时才复制），指标内核也直接读取这些页面；
+        返回的是拼接了指标列的新DataFrame，映射的数组不会被修改。
+        """
+        data = array_store.get_frame(symbol, start_date, end_date)
+        if data.empty:
+            self.logger.warning(f"数组存储中没有股票 {symbol} 的数据")
+            return data
+        return self.process_stock_data(data)
+
+    def build_feature_store(self, array_store, feature_store, symbols=None):
+        """由OHLCV数组存储计算预测模型的特征，写入共享同一日期索引的特征存储，返回写入的股票数
+
+        每只股票的特征与prepare_data_for_prediction从process_stock_data的结果中选取的列相同
+        （PREDICTION_FEATURES中的K线和技术指标列），PredictionModel.sequences_from_store直接读取。
+        """
+        if array_store.array is None and not array_store.open():
+            return 0
+        if symbols is None:
+            symbols = array_store.symbols
+        symbols = [symbol for symbol in symbols if symbol in array_store.offsets]
+        if not symbols:
+            return 0
+
+        columns = [column for column in PREDICTION_FEATURES
+                   if column in array_store.columns or column in INDICATOR_COLUMNS]
+        try:
+            feature_store.create(symbols, array_store.dates, columns)
+            for symbol in symbols:
+                processed = self.process_stored_stock(array_store, symbol)
+                if not processed.empty:
+                    feature_store.write(symbol, processed)
+            feature_store.finish()
+            feature_store.open()
+            return len(symbols)
+        except Exception as e:
+            self.logger.error(f"生成预测特征存储时出错: {str(e)}")
+            return 0
+
+    def process_news_data(self, news_data, article_fetcher=None, dedup=None):
+        """处理新闻数据，添加情感分析
+
+        dedup为True时（默认取data_settings.news_dedup）先把近似重复的新闻聚为簇，
+        只分析每个簇的代表文章，其余文章复用代表文章的结果，并标记cluster_size和is_duplicate。
+        提供article_fetcher时并发获取代表文章的正文，每篇正文到达后立即与标题、摘要一起分析；
+        正文获取失败的文章只分析标题和摘要。结果保持原来的新闻顺序。
+        """
         if not news_data:
             return []
 
+        data_settings = self.config.get('data_settings', {})
+        if dedup is None:
+            dedup = data_settings.get('news_dedup', True)
+
         try:
+            if dedup:
+                cluster_ids, representatives, sizes = cluster_articles(
+                    news_data, data_settings.get('news_dedup_threshold', 0.7))
+                unique_news = [news_data[i] for i in representatives]
+                self.logger.info(f"{len(news_data)} 篇新闻聚为 {len(unique_news)} 个独立事件")
+            else:
+                unique_news = news_data
+
+            if article_fetcher is None:
+                scored = [self.analyze_article(article) for article in unique_news]
+            else:
+                scored = [None] * len(unique_news)
+                for i, article, body in article_fetcher.iter_bodies(unique_news):
+                    scored[i] = self.analyze_article(article, body)
+
+            if not dedup:
+                return scored
+
+            # 代表文章的分析结果复制给同簇的其他文章
             processed_news = []
-            for article in news_data:
-                # 提取标题和描述
-                title = article.get('title', '')
-                description = article.get('description', '')
-                content = f"{title} {description}"
-
-                # 使用TextBlob进行情感分析
-                blob = TextBlob(content)
-                polarity = blob.sentiment.polarity  # 极性：-1到1，负值表示负面，正值表示正面
-                subjectivity = blob.sentiment.subjectivity  # 主观性：0到1，0表示非常客观，1表示非常主观
-
-                # 使用VADER进行情感分析
-                vader_scores = self.sia.polarity_scores(content)
-                vader_compound = vader_scores['compound']  # 综合得分：-1到1
-
-                # 确定情感类别
-                if vader_compound >= 0.05:
-                    sentiment = 'positive'
-                elif vader_compound <= -0.05:
-                    sentiment = 'negative'
+            for i, (article, cluster_id) in enumerate(zip(news_data, cluster_ids)):
+                representative = scored[cluster_id]
+                if representatives[cluster_id] == i:
+                    processed_article = representative
+                    processed_article['is_duplicate'] = False
                 else:
-                    sentiment = 'neutral'
-
-                # 添加情感分析结果
-                processed_article = article.copy()
-                processed_article['textblob_polarity'] = polarity
-                processed_article['textblob_subjectivity'] = subjectivity
-                processed_article['vader_compound'] = vader_compound
-                processed_article['vader_positive'] = vader_scores['pos']
-                processed_article['vader_negative'] = vader_scores['neg']
-                processed_article['vader_neutral'] = vader_scores['neu']
-                processed_article['sentiment'] = sentiment
-
+                    processed_article = article.copy()
+                    for field in SENTIMENT_FIELDS:
+                        processed_article[field] = representative[field]
+                    processed_article['is_duplicate'] = True
+                processed_article['cluster_id'] = cluster_id
+                processed_article['cluster_size'] = sizes[cluster_id]
                 processed_news.append(processed_article)
-
             return processed_news
         except Exception as e:
             self.logger.error(f"处理新闻数据时出错: {str(e)}")
             return news_data
 
+    def analyze_article(self, article, body=None):
+        """对一篇新闻做情感分析，返回添加了情感字段的副本"""
+        # 提取标题和描述
+        title = article.get('title', '')
+        description = article.get('description', '')
+        content = f"{title} {description}"
+        if body:
+            content = f"{content} {body}"
+
+        # 使用TextBlob进行情感分析
+        blob = TextBlob(content)
+        polarity = blob.sentiment.polarity  # 极性：-1到1，负值表示负面，正值表示正面
+        subjectivity = blob.sentiment.subjectivity  # 主观性：0到1，0表示非常客观，1表示非常主观
+
+        # 使用VADER进行情感分析
+        vader_scores = self.sia.polarity_scores(content)
+        vader_compound = vader_scores['compound']  # 综合得分：-1到1
+
+        # 确定情感类别
+        if vader_compound >= 0.05:
+            sentiment = 'positive'
+        elif vader_compound <= -0.05:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        # 添加情感分析结果
+        processed_article = article.copy()
+        processed_article['textblob_polarity'] = polarity
+        processed_article['textblob_subjectivity'] = subjectivity
+        processed_article['vader_compound'] = vader_compound
+        processed_article['vader_positive'] = vader_scores['pos']
+        processed_article['vader_negative'] = vader_scores['neg']
+        processed_article['vader_neutral'] = vader_scores['neu']
+        processed_article['sentiment'] = sentiment
+        if body:
+            processed_article['body_length'] = len(body)
+        return processed_article
+
     def merge_stock_news_data(self, stock_data, news_data):
         """合并股票和新闻数据"""
         if stock_data.empty or not news_data:
@@ -210,34 +390,19 @@ class DataProcessor:
     def prepare_data_for_prediction(self, data, prediction_days=None):
         """准备用于预测的数据"""
         if data.empty:
-            return None, None, None, None
+            return None, None, None, None, None
 
         if prediction_days is None:
             prediction_days = self.config.get(
                 'model_parameters', {}).get('prediction_days', 30)
 
         try:
-            # 选择特征列
-            feature_cols = [
-                'Open', 'High', 'Low', 'Close', 'Volume',
-                'MA5', 'MA10', 'MA20', 'MA50',
-                'EMA12', 'EMA26',
-                'MACD', 'MACD_signal', 'MACD_hist',
-                'RSI',
-                'BB_upper', 'BB_middle', 'BB_lower',
-                'STOCH_K', 'STOCH_D',
-                'WILLIAMS_R', 'CCI', 'ADX', 'Momentum',
-                'Volatility', 'Volatility_Std',
-                'vader_compound', 'vader_positive', 'vader_negative',
-                'vader_neutral', 'textblob_polarity', 'textblob_subjectivity'
-            ]
-
-            # 确保所有特征列都存在
+            # 选择特征列，确保所有特征列都存在
             available_cols = [
-                col for col in feature_cols if col in data.columns]
+                col for col in PREDICTION_FEATURES if col in data.columns]
             if not available_cols:
                 self.logger.error("没有可用的特征列")
-                return None, None, None, None
+                return None, None, None, None, None
 
             # 提取特征数据
             features = data[available_cols].values
@@ -269,7 +434,7 @@ class DataProcessor:
             return X_train, X_test, y_train, y_test, scaler
         except Exception as e:
             self.logger.error(f"准备预测数据时出错: {str(e)}")
-            return None, None, None, None
+            return None, None, None, None, None
 
     def process_fundamental_data(self, fundamental_data):
         """处理基本面数据"""
@@ -0,0 +1,165 @@
+import os
+import json
+import atexit
+import time
+import threading
+import logging
+import numpy as np
+
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+QUARTER = 91 * DAY
+
+# 估值类指标随股价每天变化，每天从数据源重新获取
+DAILY_FIELDS = [
+    'currentPrice', 'marketCap', 'enterpriseValue', 'trailingPE', 'forwardPE',
+    'priceToSalesTrailing12Months', 'priceToBook', 'enterpriseToRevenue', 'enterpriseToEbitda',
+    'dividendYield', 'trailingAnnualDividendYield', '52WeekChange'
+]
+
+# 市场类指标变化较慢，每周更新
+WEEKLY_FIELDS = ['pegRatio', 'trailingPegRatio', 'beta', 'SandP52WeekChange']
+
+# 利润率、增长率、财务数据和公司信息随财报按季度更新
+QUARTERLY_FIELDS = [
+    'grossMargins', 'operatingMargins', 'profitMargins', 'ebitdaMargins',
+    'earningsQuarterlyGrowth', 'revenueQuarterlyGrowth', 'earningsGrowth', 'revenueGrowth',
+    'forwardEps', 'trailingEps', 'payoutRatio', 'dividendRate', 'trailingAnnualDividendRate',
+    'fiveYearAvgDividendYield', 'lastDividendDate', 'exDividendDate',
+    'sharesOutstanding', 'bookValue', 'totalRevenue', 'totalDebt', 'totalCash', 'ebitda',
+    'mostRecentQuarter', 'lastFiscalYearEnd', 'nextFiscalYearEnd',
+    'symbol', 'shortName', 'longName', 'sector', 'industry', 'financialCurrency'
+]
+
+FIELD_TTLS = dict([(field, DAY) for field in DAILY_FIELDS] +
+                  [(field, WEEK) for field in WEEKLY_FIELDS] +
+                  [(field, QUARTER) for field in QUARTERLY_FIELDS])
+
+# 未列出的字段按每天更新处理
+DEFAULT_TTL = DAY
+
+
+class FundamentalsCache:
+    def __init__(self, cache_file, field_ttls=None, default_ttl=DEFAULT_TTL, save_delay=5.0):
+        """初始化基本面数据缓存：每个字段独立的有效期，持久化到JSON文件
+
+        写入磁盘是延迟合并的：更新后save_delay秒内的其他更新一起写入一次，
+        预热大量股票时不会每只股票都重写整个文件。程序退出时写入尚未保存的更新。
+        """
+        self.cache_file = cache_file
+        self.field_ttls = dict(FIELD_TTLS)
+        if field_ttls:
+            self.field_ttls.update(field_ttls)
+        self.default_ttl = default_ttl
+        self.save_delay = save_delay
+        self.lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+        # {symbol: {field: [value, fetched_at]}}，数据源不提供的字段值为None
+        self.entries = self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        """从磁盘读取缓存，文件不存在或损坏时返回空缓存"""
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取基本面缓存时出错: {str(e)}")
+            return {}
+
+    def _save(self):
+        """原子地将缓存写回磁盘（调用方需持有锁）"""
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, default=_to_json)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            self.logger.error(f"写入基本面缓存时出错: {str(e)}")
+
+    def _schedule_save(self):
+        """标记缓存已修改，save_delay秒后写入磁盘（调用方需持有锁）"""
+        self._dirty = True
+        if self.save_delay <= 0:
+            self._save()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的更新"""
+        with self.lock:
+            timer, self._save_timer = self._save_timer, None
+            if timer is not None:
+                timer.cancel()
+            if self._dirty:
+                self._save()
+
+    def ttl(self, field):
+        """获取字段的有效期（秒）"""
+        return self.field_ttls.get(field, self.default_ttl)
+
+    def lookup(self, symbol, fields=None):
+        """查询缓存，返回(已缓存的数据, 需要重新获取的字段列表)
+
+        fields默认为FIELD_TTLS中列出的全部字段。返回的数据包含该股票全部已缓存的字段
+        （包括已过期的），调用方只需重新获取过期或缺失的字段，再用新值覆盖。
+        """
+        if fields is None:
+            fields = list(self.field_ttls)
+        with self.lock:
+            entry = self.entries.get(symbol) or {}
+            now = time.time()
+            stale = [field for field in fields
+                     if field not in entry or now - entry[field][1] > self.ttl(field)]
+            values = {field: value for field, (value, _) in entry.items() if value is not None}
+            return values, stale
+
+    def get(self, symbol, fields=None):
+        """获取缓存的基本面数据
+
+        fields中的每个字段（默认为FIELD_TTLS中列出的全部字段）都在有效期内时返回字典，
+        否则返回None，表示需要重新获取。
+        """
+        values, stale = self.lookup(symbol, fields)
+        if stale or not values:
+            return None
+        return values
+
+    def get_stale(self, symbol):
+        """获取缓存的基本面数据（不检查有效期），数据源不可用时使用"""
+        values, _ = self.lookup(symbol, [])
+        return values or None
+
+    def update(self, symbol, info, fields=None):
+        """写入最新获取的基本面数据，稍后持久化
+
+        fields为本次获取覆盖的字段：其中info没有提供的字段记为None，
+        表示数据源没有该字段，在有效期内不会因为缺失而反复重新获取。
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.setdefault(symbol, {})
+            for field in fields or ():
+                if field not in info:
+                    entry[field] = [None, now]
+            for field, value in info.items():
+                entry[field] = [value, now]
+            self._schedule_save()
+
+
+def _to_json(value):
+    """将numpy标量等无法直接序列化的值转换为JSON兼容类型"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
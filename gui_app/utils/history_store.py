@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import threading
+import logging
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# 每只股票目录下记录覆盖范围和更新时间的元数据文件
+META_FILE = '_meta.json'
+
+# 旧版缓存（每只股票一个Parquet文件）在文件元数据中记录覆盖起始日期的键
+LEGACY_COVERED_FROM_KEY = b'covered_from'
+
+
+class HistoryStore:
+    def __init__(self, root_dir, max_age=300):
+        """初始化本地行情存储：按股票和年份分区的Parquet列式文件
+
+        目录结构为 root_dir/<股票代码>/<年份>.parquet，按日期范围读取时只打开涉及的年份分区，
+        增量合并时也只重写新数据所在的年份分区。
+        """
+        self.root_dir = root_dir
+        # 最近一次写入后的有效期（秒），超过后需要重新请求最新的K线
+        self.max_age = max_age
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+        self.enabled = PARQUET_AVAILABLE
+        if not self.enabled:
+            self.logger.warning("未安装pyarrow，本地行情存储已禁用")
+            return
+
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _symbol_dir(self, symbol):
+        """获取股票对应的分区目录"""
+        return os.path.join(self.root_dir, re.sub(r'[^A-Za-z0-9._-]', '_', symbol))
+
+    def _partition_path(self, symbol, year):
+        """获取股票某一年的分区文件路径"""
+        return os.path.join(self._symbol_dir(symbol), f"{year}.parquet")
+
+    def _lock(self, symbol):
+        """获取股票级别的写锁，避免并发合并互相覆盖"""
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def get_meta(self, symbol):
+        """读取股票的元数据：covered_from、last_bar、updated_at，不存在时返回None"""
+        if not self.enabled:
+            return None
+
+        path = os.path.join(self._symbol_dir(symbol), META_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取股票 {symbol} 的元数据时出错: {str(e)}")
+            return None
+
+        meta['covered_from'] = pd.Timestamp(meta['covered_from'])
+        meta['last_bar'] = pd.Timestamp(meta['last_bar'])
+        return meta
+
+    def _write_meta(self, symbol, covered_from, last_bar, timezone):
+        """原子地写入股票的元数据"""
+        path = os.path.join(self._symbol_dir(symbol), META_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'covered_from': pd.Timestamp(covered_from).strftime('%Y-%m-%d'),
+                'last_bar': pd.Timestamp(last_bar).strftime('%Y-%m-%d'),
+                'timezone': timezone,
+                'updated_at': time.time()
+            }, f)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, meta, end_date):
+        """判断存储是否已覆盖到end_date之前的最后一个交易日，且在有效期内"""
+        if meta is None:
+            return False
+
+        last_trading_day = pd.offsets.BDay().rollback(
+            pd.Timestamp(end_date).normalize())
+        if meta['last_bar'].normalize() < last_trading_day:
+            return False
+
+        # 最后一根K线可能是盘中数据，超过有效期后仍需刷新
+        return time.time() - meta['updated_at'] < self.max_age
+
+    def read_range(self, symbol, start_date=None, end_date=None, columns=None):
+        """读取[start_date, end_date]区间的K线，只打开涉及的年份分区，返回空DataFrame表示没有数据"""
+        if not self.enabled:
+            return pd.DataFrame()
+
+        symbol_dir = self._symbol_dir(symbol)
+        if not os.path.isdir(symbol_dir):
+            return pd.DataFrame()
+
+        years = sorted(int(name[:-len('.parquet')]) for name in os.listdir(symbol_dir)
+                       if name.endswith('.parquet') and name[:-len('.parquet')].isdigit())
+        if start_date is not None:
+            years = [year for year in years if year >= pd.Timestamp(start_date).year]
+        if end_date is not None:
+            years = [year for year in years if year <= pd.Timestamp(end_date).year]
+        if not years:
+            return pd.DataFrame()
+
+        tables = []
+        for year in years:
+            try:
+                # 指定列时只读取这些列（以及Date索引列）
+                table = pq.read_table(self._partition_path(symbol, year), columns=columns,
+                                      use_pandas_metadata=True)
+            except Exception as e:
+                self.logger.error(f"读取股票 {symbol} 的 {year} 年分区时出错: {str(e)}")
+                continue
+            tables.append(self._filter_rows(table, start_date, end_date))
+        if not tables:
+            return pd.DataFrame()
+
+        return pa.concat_tables(tables).to_pandas()
+
+    def _filter_rows(self, table, start_date, end_date):
+        """在Arrow表上按日期过滤行，避免把不需要的行转换为pandas对象"""
+        if start_date is None and end_date is None:
+            return table
+
+        dates = table.column('Date')
+        # 按当地日期比较：把时区时间戳转换为不带时区的本地时间
+        if getattr(dates.type, 'tz', None):
+            dates = pc.local_timestamp(dates)
+        mask = None
+        if start_date is not None:
+            start = pa.scalar(pd.Timestamp(start_date).normalize().to_pydatetime(), type=pa.timestamp('ns'))
+            mask = pc.greater_equal(dates, start)
+        if end_date is not None:
+            end = pa.scalar((pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).to_pydatetime(),
+                            type=pa.timestamp('ns'))
+            end_mask = pc.less(dates, end)
+            mask = end_mask if mask is None else pc.and_(mask, end_mask)
+        return table.filter(mask)
+
+    def merge(self, symbol, new_data, covered_from=None):
+        """将新获取的K线合并进存储，只重写新数据涉及的年份分区"""
+        if not self.enabled:
+            return
+
+        with self._lock(symbol):
+            meta = self.get_meta(symbol)
+            if meta is not None and (covered_from is None or meta['covered_from'] < pd.Timestamp(covered_from)):
+                covered_from = meta['covered_from']
+
+            if new_data is None or new_data.empty:
+                if meta is not None and covered_from != meta['covered_from']:
+                    self._write_meta(symbol, covered_from, meta['last_bar'], meta.get('timezone'))
+                return
+
+            new_data = new_data.copy()
+            new_data.index = pd.DatetimeIndex(new_data.index)
+            new_data.index.name = 'Date'
+            timezone = meta.get('timezone') if meta is not None else None
+            if meta is None:
+                timezone = str(new_data.index.tz) if new_data.index.tz is not None else None
+            # 不同数据源的时区可能不同，统一为存储中的时区
+            if timezone is not None:
+                if new_data.index.tz is None:
+                    new_data = new_data.tz_localize(timezone)
+                else:
+                    new_data = new_data.tz_convert(timezone)
+            elif new_data.index.tz is not None:
+                new_data = new_data.tz_localize(None)
+
+            os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+            local_years = naive_index(new_data.index).year
+            for year in sorted(set(local_years)):
+                part = new_data[local_years == year]
+                path = self._partition_path(symbol, year)
+                if os.path.exists(path):
+                    existing = pq.read_table(path).to_pandas()
+                    part = pd.concat([existing, part])
+                    # 重叠的K线以新数据为准（上一次存储的最后一根可能是盘中数据）
+                    part = part[~part.index.duplicated(keep='last')].sort_index()
+                self._write_partition(path, part)
+
+            last_bar = naive_index(new_data.index).max()
+            if meta is not None and meta['last_bar'] > last_bar:
+                last_bar = meta['last_bar']
+            if covered_from is None:
+                covered_from = naive_index(new_data.index).min()
+            self._write_meta(symbol, covered_from, last_bar, timezone)
+
+    def import_legacy_cache(self, legacy_dir):
+        """导入旧版缓存目录中每只股票一个的<股票代码>.parquet文件，导入成功后删除，返回导入的股票数
+
+        旧版缓存默认位于data/cache/stocks（配置了cache_dir时直接位于该目录下），
+        文件名与分区目录名使用相同的股票代码转换规则。目录导入完后为空时一并删除。
+        """
+        if not self.enabled or not os.path.isdir(legacy_dir):
+            return 0
+
+        imported = 0
+        for name in sorted(os.listdir(legacy_dir)):
+            path = os.path.join(legacy_dir, name)
+            if not name.endswith('.parquet') or not os.path.isfile(path):
+                continue
+            symbol = name[:-len('.parquet')]
+            try:
+                table = pq.read_table(path)
+                covered_from = (table.schema.metadata or {}).get(LEGACY_COVERED_FROM_KEY)
+                self.merge(symbol, table.to_pandas(),
+                           pd.Timestamp(covered_from.decode()) if covered_from else None)
+                os.remove(path)
+                imported += 1
+            except Exception as e:
+                self.logger.error(f"导入旧版缓存 {name} 时出错: {str(e)}")
+
+        if imported:
+            self.logger.info(f"已将 {imported} 只股票的旧版缓存导入本地行情存储")
+        if os.path.abspath(legacy_dir) != os.path.abspath(self.root_dir) and not os.listdir(legacy_dir):
+            os.rmdir(legacy_dir)
+        return imported
+
+    def _write_partition(self, path, data):
+        """原子地写入一个年份分区"""
+        tmp_path = f"{path}.tmp"
+        try:
+            pq.write_table(pa.Table.from_pandas(data), tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def naive_index(index):
+    """返回去掉时区信息的日期索引，便于与本地日期比较"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        return index.tz_localize(None)
+    return index
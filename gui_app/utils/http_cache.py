@@ -0,0 +1,252 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# 这些响应头描述的是传输过程，缓存的是解压后的响应体，因此不保存
+HOP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+# 密钥类参数不写入磁盘，也不参与缓存键和存档匹配
+SECRET_PARAMS = {'apikey', 'api_key', 'token', 'crumb'}
+
+
+def strip_secrets(url):
+    """去掉URL中的密钥类查询参数"""
+    parts = urlsplit(url)
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+              if k.lower() not in SECRET_PARAMS]
+    return parts._replace(query=urlencode(params)).geturl()
+
+
+def parse_cache_control(value):
+    """解析Cache-Control头，返回{指令: 参数}，没有参数的指令值为空字符串"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip().strip('"')
+    return directives
+
+
+def expires_at(headers, now=None):
+    """根据Cache-Control和Expires计算响应的过期时间，没有新鲜度信息时返回now（需要重新验证）"""
+    if now is None:
+        now = time.time()
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-cache' in directives:
+        return now
+    if directives.get('max-age', '').isdigit():
+        age = headers.get('Age', '0')
+        return now + int(directives['max-age']) - (int(age) if age.isdigit() else 0)
+    if headers.get('Expires'):
+        try:
+            return parsedate_to_datetime(headers['Expires']).timestamp()
+        except Exception:
+            return now
+    return now
+
+
+class HttpCache:
+    def __init__(self, cache_dir):
+        """初始化HTTP响应缓存：元数据保存为JSON，响应体gzip压缩后保存
+
+        缓存键和保存的URL都去掉了密钥类参数（如NewsAPI的apiKey），密钥不会写入磁盘。
+        """
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._purge_secrets()
+
+    def _purge_secrets(self):
+        """删除旧版本按完整URL（含密钥）保存的缓存项"""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    url = json.load(f).get('url', '')
+                if url == strip_secrets(url):
+                    continue
+                for path in (meta_path, f"{meta_path[:-len('.json')]}.gz"):
+                    if os.path.exists(path):
+                        os.remove(path)
+            except Exception as e:
+                self.logger.error(f"清理包含密钥的HTTP缓存时出错: {str(e)}")
+
+    def _paths(self, url):
+        """获取URL对应的元数据文件和响应体文件路径（去掉密钥参数后计算）"""
+        key = hashlib.sha1(strip_secrets(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.gz")
+
+    def load(self, url):
+        """读取URL的缓存元数据，不存在时返回None"""
+        meta_path, _ = self._paths(url)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取HTTP缓存元数据时出错: {str(e)}")
+            return None
+
+    def is_fresh(self, url):
+        """判断URL是否有未过期的缓存，可以不发出请求直接返回"""
+        meta = self.load(url)
+        return meta is not None and meta['expires_at'] > time.time()
+
+    def load_body(self, url):
+        """读取并解压缓存的响应体，不存在时返回None"""
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as f:
+                return gzip.decompress(f.read())
+        except Exception as e:
+            self.logger.error(f"读取HTTP缓存响应体时出错: {str(e)}")
+            return None
+
+    def store(self, url, response):
+        """保存响应，no-store或没有任何新鲜度/验证信息的响应不保存"""
+        headers = response.headers
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives:
+            return
+        if not (headers.get('ETag') or headers.get('Last-Modified') or
+                'max-age' in directives or headers.get('Expires')):
+            return
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': strip_secrets(url),
+            'status': response.status_code,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS},
+            'expires_at': expires_at(headers),
+            'stored_at': time.time()
+        }
+        try:
+            # 先写响应体再写元数据，元数据存在即表示缓存完整
+            with open(f"{body_path}.tmp", 'wb') as f:
+                f.write(gzip.compress(response.content))
+            os.replace(f"{body_path}.tmp", body_path)
+            self._write_meta(meta_path, meta)
+        except Exception as e:
+            self.logger.error(f"写入HTTP缓存时出错: {str(e)}")
+            return
+        with self.lock:
+            self.stored += 1
+
+    def refresh(self, url, meta, headers):
+        """304响应后用新的响应头更新缓存的验证信息和过期时间"""
+        for name in ('Cache-Control', 'Expires', 'ETag', 'Last-Modified', 'Date'):
+            if headers.get(name):
+                meta['headers'][name] = headers[name]
+        meta['expires_at'] = expires_at(CaseInsensitiveDict(meta['headers']))
+        meta_path, _ = self._paths(url)
+        try:
+            self._write_meta(meta_path, meta)
+        except Exception as e:
+            self.logger.error(f"更新HTTP缓存元数据时出错: {str(e)}")
+
+    def _write_meta(self, meta_path, meta):
+        """原子地写入元数据"""
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def record(self, outcome):
+        """记录一次缓存结果：hits、revalidated或misses"""
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get_stats(self):
+        """返回缓存命中、304重新验证、未命中和写入次数"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'stored': self.stored
+            }
+
+
+class CachingAdapter(HTTPAdapter):
+    def __init__(self, cache, **kwargs):
+        """支持条件请求的传输适配器
+
+        新鲜的缓存直接返回；过期的缓存带上If-None-Match/If-Modified-Since重新验证，
+        上游返回304时用缓存的响应体构造响应，无需重新下载；
+        缓存的响应体已丢失时去掉验证头重新请求完整响应。
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def send(self, request, stream=False, **kwargs):
+        """发送请求，GET请求经过缓存"""
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        url = request.url
+        meta = self.cache.load(url)
+        if meta is not None and meta['expires_at'] > time.time():
+            body = self.cache.load_body(url)
+            if body is not None:
+                self.cache.record('hits')
+                return self._cached_response(request, meta, body)
+
+        if meta is not None:
+            if meta['headers'].get('ETag'):
+                request.headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                request.headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = super().send(request, stream=stream, **kwargs)
+        if response.status_code == 304 and meta is not None:
+            body = self.cache.load_body(url)
+            response.close()
+            if body is not None:
+                self.cache.record('revalidated')
+                self.cache.refresh(url, meta, response.headers)
+                return self._cached_response(request, meta, body)
+            self.logger.warning(f"缓存的响应体已丢失，重新请求: {strip_secrets(url)}")
+            request.headers.pop('If-None-Match', None)
+            request.headers.pop('If-Modified-Since', None)
+            response = super().send(request, stream=stream, **kwargs)
+
+        self.cache.record('misses')
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def _cached_response(self, request, meta, body):
+        """用缓存的状态码、响应头和响应体构造响应，from_cache标记为True"""
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.from_cache = True
+        return response
@@ -0,0 +1,228 @@
+import time
+import random
+import threading
+import logging
+from collections import deque
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from utils.http_cache import CachingAdapter
+from utils.network_archive import ArchiveAdapter
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        """初始化熔断器：连续失败达到阈值后打开，reset_timeout秒后允许一次试探请求"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """判断当前是否允许发出请求"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # 进入半开状态，只放行一个试探请求
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功请求"""
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class RequestStats:
+    def __init__(self, window=500):
+        """初始化请求统计：请求数、失败数和最近window次请求的延迟"""
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency, success):
+        """记录一次请求的延迟和结果"""
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if not success:
+                self.failures += 1
+
+    def summary(self):
+        """返回统计摘要，延迟单位为毫秒"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            summary = {
+                'requests': self.requests,
+                'failures': self.failures,
+                'retries': self.retries,
+                'short_circuited': self.short_circuited,
+                'latency_p50_ms': 0.0,
+                'latency_p95_ms': 0.0,
+                'latency_max_ms': 0.0
+            }
+        if latencies:
+            summary['latency_p50_ms'] = latencies[int(0.5 * (len(latencies) - 1))] * 1000
+            summary['latency_p95_ms'] = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+            summary['latency_max_ms'] = latencies[-1] * 1000
+        return summary
+
+
+def create_session(pool_size=10, cache=None, archive=None):
+    """创建带连接池的HTTP会话，复用TCP/TLS连接
+
+    提供cache时GET请求支持条件请求缓存；提供archive时录制或回放所有响应（不使用cache）。
+    """
+    session = requests.Session()
+    if archive is not None:
+        adapter = ArchiveAdapter(archive, pool_connections=pool_size, pool_maxsize=pool_size)
+    elif cache is not None:
+        adapter = CachingAdapter(cache, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class HttpClient:
+    # 这些状态码视为临时故障，可以重试
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, timeout=(5, 15), max_retries=3, backoff_base=0.5, backoff_max=10,
+                 failure_threshold=5, reset_timeout=60, pool_size=10, rate_limiter=None, cache=None,
+                 archive=None):
+        """初始化共享HTTP客户端：连接池、超时、指数退避重试和按主机的熔断器"""
+        self.session = create_session(pool_size, cache, archive)
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rate_limiter = rate_limiter
+
+        self.breakers = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def _host_state(self, host):
+        """获取主机对应的熔断器和统计对象"""
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout)
+                self.stats[host] = RequestStats()
+            return self.breakers[host], self.stats[host]
+
+    def _backoff(self, attempt):
+        """指数退避加全抖动（full jitter）的等待时间"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, params=None, headers=None, timeout=None, stream=False):
+        """发出GET请求，返回响应；重试用尽或熔断时抛出异常
+
+        stream为True时不预先读取响应体，调用方负责读取并关闭响应。
+        """
+        host = urlparse(url).netloc
+        breaker, stats = self._host_state(host)
+        if timeout is None:
+            timeout = self.timeout
+
+        # 新鲜的缓存不发出网络请求：不占用限流配额，也不计入延迟统计和熔断器
+        if self.cache is not None and not stream:
+            full_url = requests.Request('GET', url, params=params).prepare().url
+            if self.cache.is_fresh(full_url):
+                try:
+                    response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+                    if getattr(response, 'from_cache', False):
+                        return response
+                    response.close()
+                except requests.RequestException:
+                    pass
+                # 检查后缓存恰好失效（如响应体已丢失），按正常请求重新发出并计入统计
+
+        if not breaker.allow_request():
+            with stats.lock:
+                stats.short_circuited += 1
+            raise CircuitOpenError(f"{host} 的熔断器已打开")
+
+        last_error = None
+        # 放行后的请求必须记录结果，否则半开状态的熔断器不会再放行任何请求；
+        # 请求过程中抛出非网络异常（如限流器或响应处理出错）时在finally中记为失败
+        recorded = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt > 0:
+                    with stats.lock:
+                        stats.retries += 1
+                    time.sleep(self._backoff(attempt - 1))
+
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(host)
+
+                start = time.monotonic()
+                try:
+                    response = self.session.get(
+                        url, params=params, headers=headers, timeout=timeout, stream=stream)
+                except requests.RequestException as e:
+                    stats.record(time.monotonic() - start, False)
+                    last_error = e
+                    self.logger.warning(f"请求 {host} 失败（第{attempt + 1}次）: {str(e)}")
+                    continue
+
+                success = response.status_code not in self.RETRY_STATUS
+                stats.record(time.monotonic() - start, success)
+                if success:
+                    breaker.record_success()
+                    recorded = True
+                    return response
+
+                last_error = requests.HTTPError(
+                    f"状态码: {response.status_code}", response=response)
+                self.logger.warning(
+                    f"请求 {host} 返回状态码 {response.status_code}（第{attempt + 1}次）")
+                # 重试前释放连接，stream=True时未读取的响应会一直占用连接池
+                response.close()
+
+            breaker.record_failure()
+            recorded = True
+            raise last_error
+        finally:
+            if not recorded:
+                breaker.record_failure()
+
+    def get_stats(self):
+        """返回各主机的请求统计和熔断器状态"""
+        with self.lock:
+            hosts = list(self.breakers.items())
+        result = {}
+        for host, breaker in hosts:
+            summary = self.stats[host].summary()
+            summary['circuit_state'] = breaker.state
+            result[host] = summary
+        return result
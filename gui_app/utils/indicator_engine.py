@@ -0,0 +1,270 @@
+import math
+import copy
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# 与DataProcessor.process_stock_data添加的指标列一致（顺序相同）
+INDICATOR_COLUMNS = [
+    'MA5', 'MA10', 'MA20', 'MA50', 'EMA12', 'EMA26', 'MACD', 'MACD_signal', 'MACD_hist',
+    'RSI', 'BB_upper', 'BB_middle', 'BB_lower', 'STOCH_K', 'STOCH_D', 'WILLIAMS_R', 'CCI',
+    'ADX', 'Momentum', 'Volatility', 'Daily_Return', 'Volatility_Std'
+]
+
+NAN = float('nan')
+
+
+def _div(a, b):
+    """与NumPy一致的浮点除法：除数为0时返回inf或nan，不抛出异常"""
+    if b != 0:
+        return a / b
+    if a == 0 or math.isnan(a):
+        return NAN
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class _Ema:
+    def __init__(self, alpha, min_periods):
+        """adjust=False的指数移动平均，从第一个有效值开始，有效值数量达到min_periods前输出NaN"""
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+
+    def update(self, x):
+        if math.isnan(x):
+            return self.value if self.count >= self.min_periods else NAN
+        self.value = x if self.count == 0 else self.alpha * x + (1 - self.alpha) * self.value
+        self.count += 1
+        return self.value if self.count >= self.min_periods else NAN
+
+
+def _window_mean(window, size):
+    """窗口已满时返回均值，否则返回NaN"""
+    return sum(window) / size if len(window) == size else NAN
+
+
+class IndicatorState:
+    def __init__(self):
+        """一只股票的指标运行状态：只保存最长窗口内的K线和各指标的递推值"""
+        self.n = 0
+        self.last_time = None
+        self.prev_close = NAN
+        self.prev_high = NAN
+        self.prev_low = NAN
+
+        self.closes = deque(maxlen=51)
+        self.highs = deque(maxlen=14)
+        self.lows = deque(maxlen=14)
+        self.typical = deque(maxlen=20)
+        self.stoch_k = deque(maxlen=3)
+        self.returns = deque(maxlen=20)
+
+        self.ema12 = _Ema(2 / 13, 12)
+        self.ema26 = _Ema(2 / 27, 26)
+        self.macd_signal = _Ema(2 / 10, 9)
+        self.rsi_up = _Ema(1 / 14, 14)
+        self.rsi_down = _Ema(1 / 14, 14)
+
+        # ATR：前14个真实波幅取平均作为初值，之后按Wilder方法平滑
+        self.atr = 0.0
+        self.tr_sum = 0.0
+
+        # ADX：方向变动和真实波幅的Wilder累计值、前14个DX和上一个ADX
+        self.trs = 0.0
+        self.dip = 0.0
+        self.din = 0.0
+        self.dx_initial = []
+        self.adx = 0.0
+
+    def update(self, high, low, close):
+        """加入一根K线，返回该K线的指标值列表（顺序见INDICATOR_COLUMNS），计算量与历史长度无关"""
+        t = self.n
+        prev_close, prev_high, prev_low = self.prev_close, self.prev_high, self.prev_low
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+
+        closes = list(self.closes)
+        ma5 = _window_mean(closes[-5:], 5)
+        ma10 = _window_mean(closes[-10:], 10)
+        ma20 = _window_mean(closes[-20:], 20)
+        ma50 = _window_mean(closes[-50:], 50)
+
+        ema12 = self.ema12.update(close)
+        ema26 = self.ema26.update(close)
+        macd = ema12 - ema26
+        macd_signal = self.macd_signal.update(macd)
+        macd_hist = macd - macd_signal
+
+        # RSI：第一根K线的涨跌幅按0计入
+        diff = close - prev_close if t > 0 else NAN
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        avg_up = self.rsi_up.update(up)
+        avg_down = self.rsi_down.update(down)
+        if math.isnan(avg_down):
+            rsi = NAN
+        elif avg_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + avg_up / avg_down)
+
+        # 布林带（总体标准差）
+        if len(closes) >= 20:
+            window = np.fromiter(closes[-20:], dtype=float, count=20)
+            bb_std = float(window.std())
+        else:
+            bb_std = NAN
+        bb_upper = ma20 + 2 * bb_std
+        bb_lower = ma20 - 2 * bb_std
+
+        # 随机指标和威廉指标
+        if len(self.highs) == 14:
+            highest, lowest = max(self.highs), min(self.lows)
+            stoch_k = 100 * _div(close - lowest, highest - lowest)
+            williams_r = -100 * _div(highest - close, highest - lowest)
+        else:
+            stoch_k = williams_r = NAN
+        self.stoch_k.append(stoch_k)
+        stoch_d = _window_mean(self.stoch_k, 3)
+
+        # 商品通道指数：窗口只有20根，平均绝对偏差直接计算
+        typical = (high + low + close) / 3.0
+        self.typical.append(typical)
+        if len(self.typical) == 20:
+            window = np.fromiter(self.typical, dtype=float, count=20)
+            mean = window.mean()
+            cci = _div(typical - mean, 0.015 * float(np.abs(window - mean).mean()))
+        else:
+            cci = NAN
+
+        momentum = (close - closes[-11]) / closes[-11] * 100 if len(closes) >= 11 else NAN
+
+        # 平均真实波幅：前13根为0
+        if t == 0:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if t < 13:
+            self.tr_sum += true_range
+            atr = 0.0
+        elif t == 13:
+            self.atr = (self.tr_sum + true_range) / 14
+            atr = self.atr
+        else:
+            self.atr = (self.atr * 13 + true_range) / 14
+            atr = self.atr
+
+        adx = self._update_adx(t, high, low, prev_close, prev_high, prev_low)
+
+        daily_return = close / prev_close - 1 if t > 0 else NAN
+        self.returns.append(daily_return)
+        if len(self.returns) == 20:
+            volatility_std = float(np.fromiter(self.returns, dtype=float, count=20).std(ddof=1))
+        else:
+            volatility_std = NAN
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.n += 1
+        return [ma5, ma10, ma20, ma50, ema12, ema26, macd, macd_signal, macd_hist, rsi,
+                bb_upper, ma20, bb_lower, stoch_k, stoch_d, williams_r, cci, adx, momentum,
+                atr, daily_return, volatility_std]
+
+    def _update_adx(self, t, high, low, prev_close, prev_high, prev_low):
+        """递推ADX，与ta.trend.ADXIndicator(window=14)的结果一致：前27根为0"""
+        if t == 0:
+            return 0.0
+
+        movement = max(high, prev_close) - min(low, prev_close)
+        diff_up = high - prev_high
+        diff_down = prev_low - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+        if t <= 14:
+            # 第1到第14根的累计值作为初值
+            self.trs += movement
+            self.dip += pos
+            self.din += neg
+            if t < 14:
+                return 0.0
+        else:
+            self.trs = self.trs - self.trs / 14 + movement
+            self.dip = self.dip - self.dip / 14 + pos
+            self.din = self.din - self.din / 14 + neg
+
+        dip = 100 * _div(self.dip, self.trs)
+        din = 100 * _div(self.din, self.trs)
+        dx = 100 * abs(_div(dip - din, dip + din))
+
+        if t < 27:
+            self.dx_initial.append(dx)
+            return 0.0
+        if t == 27:
+            self.dx_initial.append(dx)
+            self.adx = sum(self.dx_initial) / 14
+            self.dx_initial = []
+        else:
+            self.adx = (self.adx * 13 + dx) / 14
+        return self.adx
+
+
+class IndicatorEngine:
+    def __init__(self):
+        """增量技术指标引擎：每只股票保存一份指标运行状态，新K线只需O(1)的计算
+
+        第一次遇到某只股票（或K线与状态对不上）时用全部K线建立状态，之后每次只输入新增的K线；
+        与最后一根K线时间相同的K线视为盘中更新，先回退到该K线之前的状态再重新计算。
+        """
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def reset(self, key=None):
+        """丢弃一只股票（默认全部股票）的状态"""
+        with self.lock:
+            if key is None:
+                self.states.clear()
+            else:
+                self.states.pop(key, None)
+
+    def update(self, key, data, n_updated):
+        """输入data的最后n_updated根K线，返回这些K线的指标DataFrame（未填充NaN）"""
+        n_updated = min(n_updated, len(data))
+        if n_updated <= 0:
+            return pd.DataFrame(columns=INDICATOR_COLUMNS, index=data.index[:0])
+
+        with self.lock:
+            entry = self.states.get(key)
+        start = len(data) - n_updated
+        state = None
+        if entry is not None:
+            saved, before_last = entry
+            # 新K线的前一根（或被更新的那根）必须与状态中的最后一根K线一致
+            if data.index[-n_updated] == saved.last_time:
+                # 最后一根K线仍在形成中：回退到它之前的状态
+                if before_last is not None:
+                    state = copy.deepcopy(before_last)
+            elif start > 0 and data.index[start - 1] == saved.last_time:
+                state = saved
+
+        if state is None:
+            # 没有可用的状态：用全部K线建立状态
+            state = IndicatorState()
+            start = 0
+
+        highs = data['High'].to_numpy(dtype=float)
+        lows = data['Low'].to_numpy(dtype=float)
+        closes = data['Close'].to_numpy(dtype=float)
+        rows = []
+        before_last = None
+        for i in range(start, len(data)):
+            if i == len(data) - 1:
+                before_last = copy.deepcopy(state)
+            rows.append(state.update(highs[i], lows[i], closes[i]))
+        state.last_time = data.index[-1]
+
+        with self.lock:
+            self.states[key] = (state, before_last)
+        return pd.DataFrame(rows[-n_updated:], index=data.index[-n_updated:], columns=INDICATOR_COLUMNS)
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.indicator_engine import INDICATOR_COLUMNS
+
+# 指标参数，与DataProcessor原先调用ta时使用的默认参数一致
+MA_WINDOWS = (5, 10, 20, 50)
+RSI_WINDOW = 14
+BB_WINDOW = 20
+STOCH_WINDOW = 14
+STOCH_SMOOTH = 3
+CCI_WINDOW = 20
+CCI_CONSTANT = 0.015
+ADX_WINDOW = 14
+ATR_WINDOW = 14
+ROC_WINDOW = 10
+VOLATILITY_WINDOW = 20
+
+
+def _as_2d(values):
+    """转换为(T, N)的浮点数组，一维输入视为一只股票"""
+    array = np.asarray(values, dtype=float)
+    return array.reshape(len(array), -1)
+
+
+def _shift(x, periods=1):
+    """沿时间轴后移periods行，空出的行为NaN"""
+    out = np.full_like(x, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:-periods]
+    return out
+
+
+def _ffill(x):
+    """沿时间轴用前一个非NaN值填充NaN（与fillna(method='pad')一致），开头的NaN保持不变"""
+    positions = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(positions, axis=0, out=positions)
+    return np.take_along_axis(x, positions, axis=0)
+
+
+def _cumsum(x):
+    """前面补一行0的累计和及有效值计数，用于O(1)地求任意窗口的和"""
+    zeros = np.zeros((1, x.shape[1]))
+    valid = np.isfinite(x)
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    return sums, counts
+
+
+def _window_mean(sums, counts, window):
+    """由累计和求滚动均值，窗口内有缺失值时为NaN"""
+    out = np.full((len(sums) - 1, sums.shape[1]), np.nan)
+    if window < len(sums):
+        total = sums[window:] - sums[:-window]
+        full = (counts[window:] - counts[:-window]) == window
+        out[window - 1:] = np.where(full, total / window, np.nan)
+    return out
+
+
+def _range_sum(sums, first, last):
+    """每列第first行到第last行（含）的和，last超出范围的列为NaN"""
+    columns = np.arange(sums.shape[1])
+    inside = last < len(sums) - 1
+    last = np.minimum(last, len(sums) - 2)
+    first = np.minimum(first, last)
+    total = sums[last + 1, columns] - sums[first, columns]
+    return np.where(inside, total, np.nan)
+
+
+def _rolling(x, window, func, **kwargs):
+    """在滑动窗口视图上计算func（不复制数据），窗口内有NaN时结果为NaN"""
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        out[window - 1:] = func(sliding_window_view(x, window, axis=0), axis=-1, **kwargs)
+    return out
+
+
+def _ewm(x, alpha, min_periods=0):
+    """adjust=False的指数移动平均，每列从第一个有效值开始（递推部分交给pandas的编译实现）"""
+    return pd.DataFrame(x).ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean().to_numpy()
+
+
+def _seeded_ewm(x, alpha, seed_rows, seeds):
+    """从每列seed_rows行的初值开始按 y = (1 - alpha) * y + alpha * x 递推，之前的行为NaN"""
+    rows = np.arange(len(x))[:, None]
+    series = np.where(rows > seed_rows, x, np.nan)
+    columns = np.nonzero(seed_rows < len(x))[0]
+    series[seed_rows[columns], columns] = seeds[columns]
+    return _ewm(series, alpha)
+
+
+def _moving_average(window):
+    """window日均线的依赖图节点"""
+    return ('_close_sums',), lambda sums: _window_mean(*sums, window)
+
+
+def _rsi_averages(diff, started):
+    """RSI的平均涨幅和平均跌幅：第一根K线的涨跌按0计入"""
+    up = np.where(started, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(started, np.where(diff < 0, -diff, 0.0), np.nan)
+    return _ewm(up, 1 / RSI_WINDOW, RSI_WINDOW), _ewm(down, 1 / RSI_WINDOW, RSI_WINDOW)
+
+
+def _rsi(averages):
+    """由平均涨跌幅计算RSI，平均跌幅为0时为100"""
+    avg_up, avg_down = averages
+    return np.where(avg_down == 0, 100.0, 100 - 100 / (1 + avg_up / avg_down))
+
+
+def _cci(high, low, close):
+    """商品通道指数：均值和平均绝对偏差在同一个滑动窗口上计算"""
+    typical = (high + low + close) / 3.0
+    tp_mean = np.full_like(typical, np.nan)
+    tp_mad = np.full_like(typical, np.nan)
+    if CCI_WINDOW <= len(typical):
+        windows = sliding_window_view(typical, CCI_WINDOW, axis=0)
+        means = windows.mean(axis=-1)
+        tp_mean[CCI_WINDOW - 1:] = means
+        tp_mad[CCI_WINDOW - 1:] = np.abs(windows - means[..., None]).mean(axis=-1)
+    return (typical - tp_mean) / (CCI_CONSTANT * tp_mad)
+
+
+def _directional_movement(high, low):
+    """ADX的正向和负向变动"""
+    diff_up = high - _shift(high)
+    diff_down = _shift(low) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+    return pos, neg
+
+
+def _wilder_sum(x, sums, start):
+    """ADX的Wilder累计值：前14根K线（不含第一根）的和作为初值，之后 s = s - s / 14 + x"""
+    seed_rows = start + ADX_WINDOW
+    return _seeded_ewm(ADX_WINDOW * x, 1 / ADX_WINDOW, seed_rows, _range_sum(sums, start + 1, seed_rows))
+
+
+def _dx(trs, dip, din):
+    """方向指数DX"""
+    di_pos = 100 * dip / trs
+    di_neg = 100 * din / trs
+    return 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg))
+
+
+def _adx(dx, start, rows, started):
+    """ADX：前27根为0，第28根为前14个DX的均值，之后按Wilder方法平滑"""
+    seed_rows = start + ADX_WINDOW
+    adx_rows = seed_rows + ADX_WINDOW - 1
+    adx = _seeded_ewm(dx, 1 / ADX_WINDOW, adx_rows, _range_sum(_cumsum(dx)[0], seed_rows, adx_rows) / ADX_WINDOW)
+    return np.where(started & (rows < adx_rows), 0.0, adx)
+
+
+def _atr(true_range, tr_sums, start, rows, started):
+    """平均真实波幅：前13根为0，第14根为前14个真实波幅的均值"""
+    atr_rows = start + ATR_WINDOW - 1
+    atr = _seeded_ewm(true_range, 1 / ATR_WINDOW, atr_rows, _range_sum(tr_sums, start, atr_rows) / ATR_WINDOW)
+    return np.where(started & (rows < atr_rows), 0.0, atr)
+
+
+def _roc(close):
+    """10日变动率"""
+    shifted = _shift(close, ROC_WINDOW)
+    return (close - shifted) / shifted * 100
+
+
+# 指标依赖图：{名称: (依赖项, 计算函数)}，计算函数的参数依次为各依赖项的值。
+# 以下划线开头的是共用的中间结果，其余与INDICATOR_COLUMNS一一对应；
+# 输入节点High、Low、Close、_rows、_start、_started由prepare_inputs提供。
+INDICATOR_GRAPH = {
+    # 均线和布林带中轨共用一次累计和
+    '_close_sums': (('Close',), _cumsum),
+    **{f'MA{window}': _moving_average(window) for window in MA_WINDOWS},
+
+    'EMA12': (('Close',), lambda close: _ewm(close, 2 / 13, 12)),
+    'EMA26': (('Close',), lambda close: _ewm(close, 2 / 27, 26)),
+    'MACD': (('EMA12', 'EMA26'), lambda ema12, ema26: ema12 - ema26),
+    'MACD_signal': (('MACD',), lambda macd: _ewm(macd, 2 / 10, 9)),
+    'MACD_hist': (('MACD', 'MACD_signal'), lambda macd, signal: macd - signal),
+
+    '_prev_close': (('Close',), _shift),
+    '_close_diff': (('Close', '_prev_close'), lambda close, prev_close: close - prev_close),
+    '_rsi_averages': (('_close_diff', '_started'), _rsi_averages),
+    'RSI': (('_rsi_averages',), _rsi),
+
+    '_bb_std': (('Close',), lambda close: _rolling(close, BB_WINDOW, np.std)),
+    'BB_middle': (('MA20',), lambda ma20: ma20),
+    'BB_upper': (('BB_middle', '_bb_std'), lambda middle, std: middle + 2 * std),
+    'BB_lower': (('BB_middle', '_bb_std'), lambda middle, std: middle - 2 * std),
+
+    # 随机指标和威廉指标共用14日最高最低价
+    '_highest': (('High',), lambda high: _rolling(high, STOCH_WINDOW, np.max)),
+    '_lowest': (('Low',), lambda low: _rolling(low, STOCH_WINDOW, np.min)),
+    'STOCH_K': (('Close', '_highest', '_lowest'),
+                lambda close, highest, lowest: 100 * (close - lowest) / (highest - lowest)),
+    'STOCH_D': (('STOCH_K',), lambda stoch_k: _rolling(stoch_k, STOCH_SMOOTH, np.mean)),
+    'WILLIAMS_R': (('Close', '_highest', '_lowest'),
+                   lambda close, highest, lowest: -100 * (highest - close) / (highest - lowest)),
+
+    'CCI': (('High', 'Low', 'Close'), _cci),
+
+    # 真实波幅：ATR和ADX共用，第一根K线为最高价减最低价
+    '_true_range': (('High', 'Low', '_prev_close'),
+                    lambda high, low, prev_close: np.fmax(high, prev_close) - np.fmin(low, prev_close)),
+    '_tr_sums': (('_true_range',), lambda true_range: _cumsum(true_range)[0]),
+    '_directional_movement': (('High', 'Low'), _directional_movement),
+    '_trs': (('_true_range', '_tr_sums', '_start'), _wilder_sum),
+    '_dip': (('_directional_movement', '_start'), lambda dm, start: _wilder_sum(dm[0], _cumsum(dm[0])[0], start)),
+    '_din': (('_directional_movement', '_start'), lambda dm, start: _wilder_sum(dm[1], _cumsum(dm[1])[0], start)),
+    '_dx': (('_trs', '_dip', '_din'), _dx),
+    'ADX': (('_dx', '_start', '_rows', '_started'), _adx),
+
+    'Momentum': (('Close',), _roc),
+    'Volatility': (('_true_range', '_tr_sums', '_start', '_rows', '_started'), _atr),
+    # 与pct_change的默认fill_method='pad'一致：中间缺失的收盘价先用前值填充，缺失当天收益率为0
+    '_padded_close': (('Close',), _ffill),
+    '_prev_padded_close': (('_padded_close',), _shift),
+    'Daily_Return': (('_padded_close', '_prev_padded_close'), lambda close, prev_close: close / prev_close - 1),
+    'Volatility_Std': (('Daily_Return',),
+                       lambda returns: _rolling(returns, VOLATILITY_WINDOW, np.std, ddof=1)),
+}
+
+
+def prepare_inputs(high, low, close):
+    """把高低收价转换为依赖图的输入节点
+
+    high、low、close为形状(T,)或(T, N)的连续数组，N只股票按列排列。每列从第一个有效收盘价开始计算，
+    对齐到同一日期索引、上市时间不同的股票也适用；中间的缺失值需要调用方事先填充。
+    """
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    n_rows = len(close)
+    rows = np.arange(n_rows)[:, None]
+    valid = np.isfinite(close)
+    start = np.where(valid.any(axis=0), valid.argmax(axis=0), n_rows)
+    return {'High': high, 'Low': low, 'Close': close,
+            '_rows': rows, '_start': start, '_started': rows >= start}
+
+
+def evaluate(name, values):
+    """计算依赖图中的一个节点，先递归计算其依赖项；结果缓存在values中，已计算的节点直接返回"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _evaluate(name, values)
+
+
+def _evaluate(name, values):
+    """递归计算节点（调用方已屏蔽除零警告）"""
+    if name in values:
+        return values[name]
+    dependencies, func = INDICATOR_GRAPH[name]
+    values[name] = func(*[_evaluate(dependency, values) for dependency in dependencies])
+    return values[name]
+
+
+def compute_indicators(high, low, close):
+    """一次计算process_stock_data添加的全部技术指标，返回{列名: 数组}
+
+    high、low、close为形状(T,)或(T, N)的连续数组，返回的数组形状相同（输入要求见prepare_inputs）。
+    各指标按INDICATOR_GRAPH共用中间结果：均线和布林带中轨共用一次累计和，ATR与ADX共用真实波幅，
+    随机指标与威廉指标共用14日最高最低价。结果与ta逐个计算的指标一致。
+    """
+    shape = np.shape(close)
+    values = prepare_inputs(high, low, close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {column: _evaluate(column, values).reshape(shape) for column in INDICATOR_COLUMNS}
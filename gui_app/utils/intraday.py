@@ -0,0 +1,149 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.mock_data import OHLCV_COLUMNS
+
+# 支持的盘中K线周期
+INTRADAY_INTERVALS = ['1m', '2m', '5m', '15m', '30m', '60m']
+
+
+class BarRingBuffer:
+    def __init__(self, capacity=2000):
+        """初始化固定容量的K线环形缓冲区，写满后新K线覆盖最旧的K线"""
+        self.capacity = capacity
+        # 时间戳以UTC纳秒保存，timezone用于还原索引
+        self.times = np.zeros(capacity, dtype='int64')
+        self.values = np.full((capacity, len(OHLCV_COLUMNS)), np.nan)
+        self.start = 0
+        self.size = 0
+        self.timezone = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_time(self):
+        """最后一根K线的时间，缓冲区为空时返回None"""
+        if self.size == 0:
+            return None
+        last = pd.Timestamp(self.times[(self.start + self.size - 1) % self.capacity], tz='UTC')
+        return last.tz_convert(self.timezone) if self.timezone else last.tz_localize(None)
+
+    def append(self, bars):
+        """写入新获取的K线，返回实际新增或更新的K线（增量）
+
+        早于最后一根K线的数据被忽略；与最后一根K线时间相同的数据视为盘中更新，原地覆盖。
+        """
+        if bars is None or bars.empty:
+            return bars.iloc[:0] if bars is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        index = pd.DatetimeIndex(bars.index)
+        if self.timezone is None and self.size == 0 and index.tz is not None:
+            self.timezone = str(index.tz)
+        # 不带时区的时间按UTC保存
+        times = index.asi8 if index.tz is not None or self.timezone is None else \
+            index.tz_localize(self.timezone).asi8
+
+        if self.size:
+            last = self.times[(self.start + self.size - 1) % self.capacity]
+            keep = times >= last
+            bars, times = bars[keep], times[keep]
+            if len(times) and times[0] == last:
+                # 最后一根K线仍在形成中，用最新的值覆盖
+                self.values[(self.start + self.size - 1) % self.capacity] = \
+                    bars.iloc[:1].reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=float)
+                new_values = bars.iloc[1:].reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=float)
+                new_times = times[1:]
+            else:
+                new_values = bars.reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=float)
+                new_times = times
+        else:
+            new_values = bars.reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=float)
+            new_times = times
+
+        # 超过容量时只保留最新的capacity根
+        if len(new_times) > self.capacity:
+            new_times = new_times[-self.capacity:]
+            new_values = new_values[-self.capacity:]
+        positions = (self.start + self.size + np.arange(len(new_times))) % self.capacity
+        self.times[positions] = new_times
+        self.values[positions] = new_values
+        overflow = max(0, self.size + len(new_times) - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + len(new_times))
+
+        delta = bars.reindex(columns=OHLCV_COLUMNS)
+        if len(delta) > self.capacity:
+            delta = delta.iloc[-self.capacity:]
+        return delta
+
+    def to_frame(self, n=None):
+        """按时间顺序返回缓冲区中最近n根（默认全部）K线的DataFrame"""
+        n = self.size if n is None else min(n, self.size)
+        positions = (self.start + self.size - n + np.arange(n)) % self.capacity
+        index = pd.DatetimeIndex(pd.to_datetime(self.times[positions], utc=True))
+        index = index.tz_convert(self.timezone) if self.timezone else index.tz_localize(None)
+        index.name = 'Date'
+        return pd.DataFrame(self.values[positions], index=index, columns=OHLCV_COLUMNS)
+
+
+class IntradayFeed:
+    def __init__(self, data_fetcher, interval='1m', capacity=2000, max_workers=None):
+        """初始化盘中行情：每只股票一个环形缓冲区，每次刷新只获取最后一根K线之后的数据"""
+        if interval not in INTRADAY_INTERVALS:
+            raise ValueError(f"不支持的盘中K线周期: {interval}")
+        self.data_fetcher = data_fetcher
+        self.interval = interval
+        self.capacity = capacity
+        self.max_workers = max_workers or data_fetcher.max_workers
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def _buffer(self, symbol):
+        """获取股票的环形缓冲区，不存在时创建"""
+        with self.lock:
+            buffer = self.buffers.get(symbol)
+            if buffer is None:
+                buffer = self.buffers[symbol] = BarRingBuffer(self.capacity)
+            return buffer
+
+    def _poll_symbol(self, symbol):
+        """获取一只股票的新K线并写入缓冲区，返回增量"""
+        buffer = self._buffer(symbol)
+        with self.lock:
+            since = buffer.last_time
+        bars = self.data_fetcher.fetch_intraday_bars(symbol, self.interval, since=since)
+        with self.lock:
+            return buffer.append(bars)
+
+    def poll(self, symbols):
+        """并发刷新多只股票，返回{股票代码: 增量K线}，没有新数据的股票不包含在结果中"""
+        deltas = {}
+        if not symbols:
+            return deltas
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+            futures = {symbol: executor.submit(self._poll_symbol, symbol) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    delta = future.result()
+                except Exception as e:
+                    self.logger.error(f"获取股票 {symbol} 的盘中数据时出错: {str(e)}")
+                    continue
+                if delta is not None and not delta.empty:
+                    deltas[symbol] = delta
+        return deltas
+
+    def frame(self, symbol, n=None):
+        """返回股票缓冲区中的K线，没有数据时返回空DataFrame"""
+        with self.lock:
+            buffer = self.buffers.get(symbol)
+            if buffer is None:
+                return pd.DataFrame(columns=OHLCV_COLUMNS)
+            return buffer.to_frame(n)
@@ -0,0 +1,91 @@
+import threading
+import pandas as pd
+
+from utils.indicator_engine import INDICATOR_COLUMNS
+from utils.indicator_kernel import prepare_inputs, evaluate
+
+
+class LazyIndicatorFrame:
+    def __init__(self, data):
+        """按需计算技术指标的股票数据：指标列在第一次访问时按依赖图计算并缓存
+
+        例如访问MACD_hist时只计算EMA12、EMA26、MACD和MACD_signal，之后再访问MACD直接返回缓存。
+        只读取开高低收和成交量时不计算任何指标。列名、取列、index和empty与process_stock_data
+        返回的DataFrame一致；其他DataFrame操作（loc、iloc、copy等）会先计算全部指标再转交给完整的DataFrame。
+        """
+        data = data.sort_index()
+        existing = [column for column in INDICATOR_COLUMNS if column in data.columns]
+        if existing:
+            data = data.drop(columns=existing)
+        # 指标用填充前的价格计算，原始列与process_stock_data一样填充NaN
+        self._inputs = prepare_inputs(
+            data['High'].to_numpy(dtype=float),
+            data['Low'].to_numpy(dtype=float),
+            data['Close'].to_numpy(dtype=float))
+        self.data = data.fillna(method='bfill').fillna(method='ffill')
+        self._indicators = {}
+        self._frame = None
+        self._lock = threading.Lock()
+
+    @property
+    def columns(self):
+        """全部列名（包括尚未计算的指标列）"""
+        return self.data.columns.append(pd.Index(INDICATOR_COLUMNS))
+
+    @property
+    def index(self):
+        return self.data.index
+
+    @property
+    def empty(self):
+        return self.data.empty
+
+    @property
+    def shape(self):
+        return len(self.data), len(self.data.columns) + len(INDICATOR_COLUMNS)
+
+    @property
+    def computed(self):
+        """已经计算的指标列"""
+        with self._lock:
+            return [column for column in INDICATOR_COLUMNS if column in self._indicators]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, column):
+        return column in self.data.columns or column in INDICATOR_COLUMNS
+
+    def __getitem__(self, key):
+        """取一列或多列，只计算用到的指标；其他索引方式（如布尔掩码）作用于完整的DataFrame"""
+        if isinstance(key, str):
+            if key in INDICATOR_COLUMNS:
+                return self._indicator(key)
+            return self.data[key]
+        if isinstance(key, (list, tuple, pd.Index)) and all(isinstance(column, str) for column in key):
+            return pd.DataFrame({column: self[column] for column in key}, index=self.data.index)
+        return self.to_frame()[key]
+
+    def _indicator(self, column):
+        """计算（或从缓存中取出）一个指标列，NaN与process_stock_data一样先向后再向前填充"""
+        with self._lock:
+            series = self._indicators.get(column)
+            if series is None:
+                values = evaluate(column, self._inputs)[:, 0]
+                series = pd.Series(values, index=self.data.index, name=column)
+                series = series.fillna(method='bfill').fillna(method='ffill')
+                self._indicators[column] = series
+            return series
+
+    def to_frame(self):
+        """计算全部指标，返回与process_stock_data相同的DataFrame"""
+        if self._frame is None:
+            indicators = pd.DataFrame({column: self._indicator(column) for column in INDICATOR_COLUMNS})
+            self._frame = pd.concat([self.data, indicators], axis=1)
+        return self._frame
+
+    def __getattr__(self, name):
+        # 未实现的DataFrame属性和方法转交给完整的DataFrame
+        if name.startswith('_') or name == 'data':
+            raise AttributeError(name)
+        return getattr(self.to_frame(), name)
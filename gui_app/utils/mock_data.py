@@ -0,0 +1,182 @@
+import zlib
+import datetime
+import numpy as np
+import pandas as pd
+
+# 批量生成的行情数组在最后一维上的字段顺序
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# 模拟新闻的情感类别及其出现概率
+NEWS_SENTIMENTS = ['positive', 'negative', 'neutral']
+NEWS_SENTIMENT_PROBS = [0.4, 0.2, 0.4]
+
+# 模拟新闻标题模板，行顺序与NEWS_SENTIMENTS一致
+NEWS_TEMPLATES = [
+    [
+        "{query}技术取得重大突破",
+        "专家看好{query}未来发展",
+        "{query}行业获得大量投资",
+        "{query}应用范围不断扩大",
+        "{query}技术助力经济增长",
+        "{query}企业发布创新产品",
+        "{query}研究取得新进展",
+        "{query}市场前景广阔"
+    ],
+    [
+        "{query}技术面临挑战",
+        "专家担忧{query}发展风险",
+        "{query}行业投资降温",
+        "{query}应用引发争议",
+        "{query}技术可能带来失业问题",
+        "{query}企业遭遇困境",
+        "{query}研究遇到瓶颈",
+        "{query}市场前景不明朗"
+    ],
+    [
+        "{query}技术发展现状分析",
+        "专家讨论{query}未来趋势",
+        "{query}行业投资情况报告",
+        "{query}应用场景探讨",
+        "{query}技术对社会的影响",
+        "{query}企业最新动态",
+        "{query}研究进展综述",
+        "{query}市场分析报告"
+    ]
+]
+
+DEFAULT_NEWS_SOURCES = [
+    "TechCrunch", "Reuters", "Bloomberg", "WSJ", "CNBC",
+    "Forbes", "The Verge", "Wired", "TechRadar", "CNET"
+]
+
+# 模拟新闻的发布日期范围（最近N天）
+NEWS_DAYS_BACK = 30
+
+
+def stable_seed(symbol, seed=0):
+    """根据股票代码生成跨进程稳定的随机数种子
+
+    Python内置的hash()在每个进程中随机化，不能用于可复现的模拟数据。
+    """
+    return [zlib.crc32(symbol.encode('utf-8')), seed]
+
+
+def generate_mock_ohlcv_batch(symbols, dates, seed=0):
+    """一次生成多只股票的模拟OHLCV数据
+
+    每只股票使用独立的随机数生成器，结果只取决于股票代码、日期数量和seed，
+    与同批次中的其他股票无关。返回形状为(股票数, 日期数, 5)的数组，
+    最后一维的顺序见OHLCV_COLUMNS。
+    """
+    n_symbols, n_dates = len(symbols), len(dates)
+    base_price = np.empty(n_symbols)
+    returns = np.empty((n_symbols, n_dates))
+    open_noise = np.empty((n_symbols, n_dates))
+    high_noise = np.empty((n_symbols, n_dates))
+    low_noise = np.empty((n_symbols, n_dates))
+    volume = np.empty((n_symbols, n_dates))
+
+    # 每只股票按固定顺序抽样，保证结果与批次组成无关
+    for i, symbol in enumerate(symbols):
+        rng = np.random.default_rng(stable_seed(symbol, seed))
+        base_price[i] = 100 + rng.standard_normal() * 50
+        returns[i] = rng.normal(0.001, 0.02, size=n_dates)
+        open_noise[i] = rng.normal(0, 0.005, size=n_dates)
+        high_noise[i] = rng.normal(0, 0.01, size=n_dates)
+        low_noise[i] = rng.normal(0, 0.01, size=n_dates)
+        volume[i] = rng.lognormal(15, 1, size=n_dates)
+
+    # 以下全部为整批的向量化计算
+    ohlcv = np.empty((n_symbols, n_dates, len(OHLCV_COLUMNS)))
+    # 基础价格不低于1，避免随机游走出现负价格
+    close = ohlcv[:, :, 3]
+    np.multiply(np.maximum(base_price, 1)[:, None],
+                np.exp(np.cumsum(returns, axis=1)), out=close)
+
+    # 开盘价接近前一天的收盘价，第一天以当天收盘价为基准
+    open_ = ohlcv[:, :, 0]
+    open_[:, 1:] = close[:, :-1]
+    open_[:, :1] = close[:, :1]
+    open_ *= 1 + open_noise
+
+    # 最高价不低于开盘价和收盘价，最低价不高于开盘价和收盘价
+    np.multiply(np.maximum(open_, close), 1 + np.abs(high_noise), out=ohlcv[:, :, 1])
+    np.multiply(np.minimum(open_, close), 1 - np.abs(low_noise), out=ohlcv[:, :, 2])
+
+    np.floor(volume, out=ohlcv[:, :, 4])
+    return ohlcv
+
+
+def ohlcv_to_frame(ohlcv, dates, index=0):
+    """将批量数组中的一只股票转换为与Yahoo Finance格式一致的DataFrame"""
+    data = pd.DataFrame(ohlcv[index], index=dates, columns=OHLCV_COLUMNS)
+    data['Volume'] = data['Volume'].astype(np.int64)
+
+    # 添加股息和股票分割（通常为0）
+    data['Dividends'] = 0
+    data['Stock Splits'] = 0
+    return data
+
+
+def generate_mock_news(query, n_articles, sources=None, as_frame=False, seed=None, now=None):
+    """批量生成模拟新闻
+
+    情感、标题模板、来源和发布日期都一次性抽样，发布日期只对NEWS_DAYS_BACK个
+    不同的日期做格式化。as_frame为True时返回列式DataFrame（source列为来源名称），
+    否则返回与NewsAPI格式一致的字典列表。结果按发布日期从新到旧排序。
+    """
+    rng = np.random.default_rng(seed)
+    sources = list(sources) if sources else DEFAULT_NEWS_SOURCES
+    if now is None:
+        now = datetime.datetime.now()
+
+    # 一次性抽取所有文章的随机属性
+    sentiment_idx = rng.choice(len(NEWS_SENTIMENTS), size=n_articles, p=NEWS_SENTIMENT_PROBS)
+    template_idx = rng.integers(0, len(NEWS_TEMPLATES[0]), size=n_articles)
+    days_back = rng.integers(0, NEWS_DAYS_BACK, size=n_articles)
+    source_idx = rng.integers(0, len(sources), size=n_articles)
+
+    # 按发布日期从新到旧排序（稳定排序，保持同一天内的生成顺序）
+    order = np.argsort(days_back, kind='stable')
+    sentiment_idx = sentiment_idx[order]
+    template_idx = template_idx[order]
+    days_back = days_back[order]
+    source_idx = source_idx[order]
+
+    # 取值有限的字段先格式化查找表，再按索引取值
+    titles = np.array([[template.format(query=query) for template in row]
+                       for row in NEWS_TEMPLATES], dtype=object)
+    dates = np.array([(now - datetime.timedelta(days=int(day))).strftime('%Y-%m-%dT%H:%M:%SZ')
+                      for day in range(NEWS_DAYS_BACK)], dtype=object)
+    source_names = np.array(sources, dtype=object)
+    url_prefixes = np.array(
+        [f"https://example.com/{source.lower().replace(' ', '')}/{query.replace(' ', '-')}-"
+         for source in sources], dtype=object)
+    sentiments = np.array(NEWS_SENTIMENTS, dtype=object)
+
+    columns = {
+        'title': titles[sentiment_idx, template_idx],
+        'description': np.full(
+            n_articles, f"这是一篇关于{query}的新闻文章。文章讨论了{query}的最新发展和未来前景。", dtype=object),
+        'publishedAt': dates[days_back],
+        'source': source_names[source_idx],
+        'url': url_prefixes[source_idx] + order.astype(str).astype(object),
+        'sentiment': sentiments[sentiment_idx]
+    }
+
+    if as_frame:
+        return pd.DataFrame(columns)
+
+    return [
+        {
+            'title': title,
+            'description': description,
+            'publishedAt': published_at,
+            'source': {'name': source},
+            'url': url,
+            'sentiment': sentiment
+        }
+        for title, description, published_at, source, url, sentiment in zip(
+            columns['title'], columns['description'], columns['publishedAt'],
+            columns['source'], columns['url'], columns['sentiment'])
+    ]
@@ -0,0 +1,203 @@
+import os
+import gzip
+import json
+import time
+import base64
+import atexit
+import threading
+import logging
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from utils.http_cache import HOP_HEADERS, SECRET_PARAMS, strip_secrets
+
+# 录制模式和回放模式
+ARCHIVE_MODES = ('record', 'replay')
+
+# 随当前时间变化的参数，精确匹配失败时忽略这些参数再匹配一次
+VOLATILE_PARAMS = {'period1', 'period2', 'from', 'to', '_'}
+
+ARCHIVE_VERSION = 1
+
+
+def request_keys(method, url):
+    """返回请求的(精确匹配键, 宽松匹配键)
+
+    两个键都去掉了密钥参数并对查询参数排序；宽松匹配键还去掉了随时间变化的参数和主机名
+    （例如录制时指向端口不同的本地替身服务器）。
+    """
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                    if k.lower() not in SECRET_PARAMS)
+    loose = [(k, v) for k, v in params if k not in VOLATILE_PARAMS]
+    return (f"{method} {parts.netloc}{parts.path}?{urlencode(params)}",
+            f"{method} {parts.path}?{urlencode(loose)}")
+
+
+class NetworkArchive:
+    def __init__(self, path, mode='record', replay_speed=1.0):
+        """初始化网络存档：录制真实的HTTP响应，或从存档中回放
+
+        存档是一个gzip压缩的JSON Lines文件，第一行为文件头，之后每行一个响应：
+        请求方法、去掉密钥后的URL、状态码、响应头、响应体和原始耗时。
+        replay_speed为回放速度倍数，1表示按原始耗时回放，0表示不等待、尽快回放。
+        """
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"不支持的存档模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.replay_speed = replay_speed
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+        self._file = None
+        self._started = time.time()
+        # 回放时同一个键的多次请求按录制顺序依次返回，用完后重复最后一个
+        self._exact = {}
+        self._loose = {}
+        self._cursors = {}
+
+        if mode == 'record':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+            self._write({'version': ARCHIVE_VERSION, 'created': self._started})
+            atexit.register(self.close)
+        else:
+            self._load()
+
+    def _write(self, record):
+        """写入一行记录"""
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+
+    def _load(self):
+        """读取存档并按匹配键建立索引"""
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"不支持的存档版本: {header.get('version')}")
+            count = 0
+            for line in f:
+                entry = json.loads(line)
+                exact, loose = request_keys(entry['method'], entry['url'])
+                self._exact.setdefault(exact, []).append(entry)
+                self._loose.setdefault(loose, []).append(entry)
+                count += 1
+        self.logger.info(f"从 {self.path} 加载了 {count} 个录制的响应")
+
+    def record(self, request, response, started, elapsed):
+        """保存一个响应（响应体已读取）"""
+        body = response.content or b''
+        try:
+            text, encoding = body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+
+        entry = {
+            'method': request.method,
+            'url': strip_secrets(request.url),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS},
+            'body': text,
+            'encoding': encoding,
+            'offset': round(started - self._started, 4),
+            'elapsed': round(elapsed, 4)
+        }
+        with self.lock:
+            if self._file is None:
+                return
+            try:
+                self._write(entry)
+                self.recorded += 1
+            except Exception as e:
+                self.logger.error(f"写入网络存档时出错: {str(e)}")
+
+    def lookup(self, method, url):
+        """查找请求对应的录制响应，没有时返回None"""
+        exact, loose = request_keys(method, url)
+        with self.lock:
+            for kind, index, key in (('exact', self._exact, exact), ('loose', self._loose, loose)):
+                entries = index.get(key)
+                if entries:
+                    cursor = self._cursors.get((kind, key), 0)
+                    self._cursors[(kind, key)] = min(cursor + 1, len(entries) - 1)
+                    self.replayed += 1
+                    return entries[cursor]
+            self.misses += 1
+        return None
+
+    def close(self):
+        """结束录制，写完并关闭存档文件"""
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self.logger.info(f"网络存档已保存: {self.path}（{self.recorded} 个响应）")
+
+    def get_stats(self):
+        """返回录制、回放和未命中的响应数"""
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'recorded': self.recorded,
+                'replayed': self.replayed,
+                'misses': self.misses
+            }
+
+
+class ArchiveAdapter(HTTPAdapter):
+    def __init__(self, archive, **kwargs):
+        """录制或回放HTTP响应的传输适配器
+
+        录制模式下请求照常发出，读取完整响应体后写入存档；回放模式下不访问网络，
+        按存档中的原始耗时（除以回放速度）等待后返回录制的响应，存档中没有的请求返回404。
+        """
+        super().__init__(**kwargs)
+        self.archive = archive
+        self.logger = logging.getLogger(__name__)
+
+    def send(self, request, stream=False, **kwargs):
+        """发送或回放请求"""
+        if self.archive.mode == 'record':
+            started = time.time()
+            response = super().send(request, stream=stream, **kwargs)
+            # 读取完整响应体后再录制；流式读取的调用方之后从内存中读取
+            response.content
+            self.archive.record(request, response, started, time.time() - started)
+            return response
+
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            self.logger.warning(f"网络存档中没有请求: {request.method} {request.url}")
+            return self._build_response(request, 404, 'Not Found', {}, b'')
+
+        if self.archive.replay_speed:
+            time.sleep(entry['elapsed'] / self.archive.replay_speed)
+        if entry['encoding'] == 'base64':
+            body = base64.b64decode(entry['body'])
+        else:
+            body = entry['body'].encode('utf-8')
+        return self._build_response(request, entry['status'], entry['reason'], entry['headers'], body)
+
+    def _build_response(self, request, status, reason, headers, body):
+        """用录制的状态码、响应头和响应体构造响应，from_archive标记为True"""
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.from_archive = True
+        return response
@@ -0,0 +1,113 @@
+import re
+import zlib
+import numpy as np
+
+# 英文单词和数字按词切分，中文按单字切分
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[一-鿿]')
+
+# 大于2^32的素数，用于MinHash的全域哈希 (a * x + b) mod p
+MINHASH_PRIME = np.uint64(4294967311)
+
+
+def shingles(text):
+    """将文本切分为特征集合：词（字）的一元组和相邻二元组"""
+    tokens = TOKEN_PATTERN.findall((text or '').lower())
+    features = set(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return features
+
+
+def jaccard(a, b):
+    """两个特征集合的Jaccard相似度"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold=0.7, bands=20, rows=3, seed=0):
+        """初始化近似重复新闻索引（MinHash + LSH分段）
+
+        每篇新闻计算bands * rows个MinHash值，分成bands段，任一段完全相同的新闻成为候选，
+        只需查找对应的桶，无需与所有已有新闻比较；候选再用精确的Jaccard相似度确认。
+        只有每个簇的代表文章进入索引，完全相同的文本直接查表。
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+
+        rng = np.random.default_rng(seed)
+        num_perm = bands * rows
+        # a < 2^31、x < 2^32，乘积不会溢出uint64
+        self.a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+
+        self.buckets = [{} for _ in range(bands)]
+        self.exact = {}
+        self.features = []
+        self.signatures = []
+        self.sizes = []
+
+    def signature(self, features):
+        """计算特征集合的MinHash签名"""
+        if not features:
+            return np.full(len(self.a), MINHASH_PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features),
+                             dtype=np.uint64, count=len(features))
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % MINHASH_PRIME).min(axis=1)
+
+    def add(self, text):
+        """加入一篇新闻的文本，返回(簇编号, 是否为新簇)"""
+        features = shingles(text)
+        key = ' '.join(sorted(features))
+        cluster_id = self.exact.get(key)
+        if cluster_id is not None:
+            self.sizes[cluster_id] += 1
+            return cluster_id, False
+
+        signature = self.signature(features)
+        band_keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = set()
+        for buckets, band_key in zip(self.buckets, band_keys):
+            candidates.update(buckets.get(band_key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in sorted(candidates):
+            similarity = jaccard(features, self.features[candidate])
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            self.exact[key] = best
+            self.sizes[best] += 1
+            return best, False
+
+        cluster_id = len(self.signatures)
+        self.features.append(features)
+        self.signatures.append(signature)
+        self.sizes.append(1)
+        self.exact[key] = cluster_id
+        for buckets, band_key in zip(self.buckets, band_keys):
+            buckets.setdefault(band_key, []).append(cluster_id)
+        return cluster_id, True
+
+    def __len__(self):
+        """簇的数量"""
+        return len(self.signatures)
+
+
+def cluster_articles(articles, threshold=0.7):
+    """将新闻按标题聚为近似重复的簇（没有标题时使用摘要）
+
+    摘要常是通用的模板文字（模拟数据中所有文章相同），会掩盖标题的差异，因此不参与比较。
+    返回(每篇文章的簇编号列表, 每个簇代表文章的序号列表, 每个簇的大小列表)，
+    代表文章是簇中最先出现的一篇。
+    """
+    index = NearDuplicateIndex(threshold)
+    cluster_ids = []
+    representatives = []
+    for i, article in enumerate(articles):
+        cluster_id, is_new = index.add(article.get('title') or article.get('description') or '')
+        cluster_ids.append(cluster_id)
+        if is_new:
+            representatives.append(i)
+    return cluster_ids, representatives, index.sizes
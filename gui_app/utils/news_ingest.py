@@ -0,0 +1,119 @@
+import math
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class NewsIngestor:
+    def __init__(self, http_client, api_url, api_key, max_concurrency=4, page_size=100, max_pages=5):
+        """初始化异步新闻采集器：多查询并发、自动翻页、按URL去重"""
+        self.http = http_client
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        # NewsAPI每页最多100条
+        self.page_size = min(page_size, 100)
+        self.max_pages = max_pages
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def _get_page(self, query, page):
+        """同步请求一页新闻，返回(文章列表, 总条数)"""
+        params = {
+            'q': query,
+            'sortBy': 'publishedAt',
+            'pageSize': self.page_size,
+            'page': page,
+            'apiKey': self.api_key
+        }
+        response = self.http.get(self.api_url, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"状态码: {response.status_code}")
+        news_data = response.json()
+        return news_data.get('articles', []), news_data.get('totalResults', 0)
+
+    async def stream_pages(self, queries):
+        """异步产出多个查询的新闻，每页返回后立即产出该页中未出现过的文章列表（按URL去重）"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue = asyncio.Queue()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        async def fetch_page(query, page):
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(executor, self._get_page, query, page)
+                except Exception as e:
+                    self.logger.error(f"获取关于 '{query}' 的新闻第{page}页时出错: {str(e)}")
+                    return [], 0
+
+        async def fetch_query(query):
+            # 第一页返回总条数后，其余页面同时请求
+            articles, total = await fetch_page(query, 1)
+            await queue.put(articles)
+            pages = min(self.max_pages, math.ceil(total / self.page_size))
+
+            async def fetch_rest(page):
+                rest, _ = await fetch_page(query, page)
+                await queue.put(rest)
+
+            await asyncio.gather(*(fetch_rest(page) for page in range(2, pages + 1)))
+
+        async def fetch_all():
+            try:
+                await asyncio.gather(*(fetch_query(query) for query in queries))
+            finally:
+                # 用None通知消费者所有页面都已完成
+                await queue.put(None)
+
+        producer = asyncio.ensure_future(fetch_all())
+        seen_urls = set()
+        try:
+            while True:
+                articles = await queue.get()
+                if articles is None:
+                    break
+                fresh = []
+                for article in articles:
+                    url = article.get('url')
+                    if url:
+                        if url in seen_urls:
+                            continue
+                        seen_urls.add(url)
+                    fresh.append(article)
+                if fresh:
+                    yield fresh
+        finally:
+            producer.cancel()
+            executor.shutdown(wait=False)
+
+    async def stream(self, queries):
+        """异步逐篇产出多个查询的新闻文章，每页返回后立即产出，已出现过的URL会被跳过"""
+        async for articles in self.stream_pages(queries):
+            for article in articles:
+                yield article
+
+    def fetch_all(self, queries, max_articles=None, on_page=None):
+        """同步采集多个查询的新闻，返回按发布时间从新到旧排序的去重结果
+
+        先收齐所有查询的全部页面（页数由max_pages限制）再排序截断，
+        结果是最新的max_articles篇，不受各查询响应先后的影响。
+        提供on_page时每页返回后立即以该页新增的文章列表调用，调用方可以边采集边显示。
+        """
+        async def collect():
+            articles = []
+            async for page in self.stream_pages(queries):
+                articles.extend(page)
+                if on_page is not None:
+                    try:
+                        on_page(page)
+                    except Exception as e:
+                        self.logger.error(f"处理新到的新闻页面时出错: {str(e)}")
+            return articles
+
+        articles = asyncio.run(collect())
+        articles.sort(key=lambda x: x.get('publishedAt') or '', reverse=True)
+        if max_articles is not None:
+            articles = articles[:max_articles]
+        return articles
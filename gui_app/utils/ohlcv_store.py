@@ -0,0 +1,161 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+from utils.mock_data import OHLCV_COLUMNS
+
+# 数组文件、共享日期索引和股票偏移表的文件名
+DATA_FILE = 'ohlcv.dat'
+DATES_FILE = 'dates.npy'
+INDEX_FILE = 'index.json'
+
+
+class OHLCVArrayStore:
+    def __init__(self, root_dir, dtype='float64', columns=None):
+        """初始化内存映射的OHLCV数组存储
+
+        所有股票共享一个日期索引，数据保存为形状(股票数, 日期数, 列数)的连续数组，
+        每只股票占据一段连续的(日期数, 列数)区域，偏移表记录股票在第一维的位置。
+        读取时通过np.memmap以只读方式映射，返回的都是零拷贝视图，
+        多个进程打开同一个文件时共享操作系统的页缓存。
+        columns默认为开高低收和成交量；也可以保存其他数值列（如预测模型的特征），
+        列名随偏移表一起写入，打开时以文件中的列名为准。
+        """
+        self.root_dir = root_dir
+        self.dtype = np.dtype(dtype)
+        self.columns = list(columns or OHLCV_COLUMNS)
+
+        self.symbols = []
+        self.offsets = {}
+        self.dates = pd.DatetimeIndex([])
+        self.array = None
+        self._writer = None
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def _path(self, name):
+        """获取存储目录下的文件路径"""
+        return os.path.join(self.root_dir, name)
+
+    def exists(self):
+        """判断存储是否已经写入完成"""
+        return os.path.exists(self._path(INDEX_FILE))
+
+    def create(self, symbols, dates, columns=None):
+        """创建新的数组文件，缺失的K线以NaN填充，随后用write逐只写入、finish完成"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        self.symbols = list(symbols)
+        self.offsets = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.dates = pd.DatetimeIndex(dates).normalize()
+        if columns is not None:
+            self.columns = list(columns)
+
+        # 先写临时文件，finish时再替换，已打开旧文件的读取方不受影响
+        shape = (len(self.symbols), len(self.dates), len(self.columns))
+        self._writer = np.memmap(self._path(f"{DATA_FILE}.tmp"), dtype=self.dtype, mode='w+', shape=shape)
+        self._writer[:] = np.nan
+
+    def write(self, symbol, data):
+        """将一只股票的K线按共享日期索引对齐后写入数组，data中没有的列以NaN填充"""
+        if self._writer is None:
+            raise RuntimeError("请先调用create创建数组存储")
+
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        data = data.set_axis(index.normalize())
+        data = data[~data.index.duplicated(keep='last')]
+        self._writer[self.offsets[symbol]] = data.reindex(
+            index=self.dates, columns=self.columns).to_numpy(dtype=self.dtype)
+
+    def finish(self):
+        """刷新数组并写入日期索引和偏移表，完成后替换旧文件"""
+        if self._writer is None:
+            return
+
+        self._writer.flush()
+        shape = self._writer.shape
+        del self._writer
+        self._writer = None
+        os.replace(self._path(f"{DATA_FILE}.tmp"), self._path(DATA_FILE))
+
+        with open(self._path(f"{DATES_FILE}.tmp"), 'wb') as f:
+            np.save(f, self.dates.values.astype('datetime64[ns]').view('int64'))
+        os.replace(self._path(f"{DATES_FILE}.tmp"), self._path(DATES_FILE))
+
+        # 偏移表最后写入，读取方以它的存在判断存储是否完整
+        tmp_path = self._path(f"{INDEX_FILE}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'symbols': self.symbols,
+                'columns': self.columns,
+                'dtype': self.dtype.str,
+                'shape': list(shape)
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(INDEX_FILE))
+        self.logger.info(f"数组存储已写入 {shape[0]} 只股票、{shape[1]} 个交易日")
+
+    def open(self):
+        """以只读方式映射数组文件，成功返回True"""
+        try:
+            with open(self._path(INDEX_FILE), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.dates = pd.DatetimeIndex(np.load(self._path(DATES_FILE)).view('datetime64[ns]'))
+            self.dtype = np.dtype(index['dtype'])
+            self.array = np.memmap(self._path(DATA_FILE), dtype=self.dtype, mode='r',
+                                   shape=tuple(index['shape']))
+        except Exception as e:
+            self.logger.error(f"打开OHLCV数组存储时出错: {str(e)}")
+            self.array = None
+            return False
+
+        self.symbols = index['symbols']
+        self.columns = index.get('columns', OHLCV_COLUMNS)
+        self.offsets = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return True
+
+    def _date_slice(self, start_date=None, end_date=None):
+        """将日期范围转换为共享日期索引上的切片"""
+        lo = 0 if start_date is None else \
+            self.dates.searchsorted(pd.Timestamp(start_date).normalize(), side='left')
+        hi = len(self.dates) if end_date is None else \
+            self.dates.searchsorted(pd.Timestamp(end_date).normalize(), side='right')
+        return slice(lo, hi)
+
+    def get(self, symbol, start_date=None, end_date=None):
+        """返回股票在日期范围内的(日期数, 列数)零拷贝视图，股票不存在时返回None"""
+        if self.array is None and not self.open():
+            return None
+        if symbol not in self.offsets:
+            return None
+        return self.array[self.offsets[symbol], self._date_slice(start_date, end_date)]
+
+    def get_frame(self, symbol, start_date=None, end_date=None, dropna=True):
+        """以DataFrame形式返回股票的K线，数据直接引用映射的数组
+
+        dropna为True时去掉股票尚未上市或停牌日期的空行（此时会复制数据）。
+        """
+        view = self.get(symbol, start_date, end_date)
+        if view is None:
+            return pd.DataFrame(columns=self.columns)
+
+        window = self._date_slice(start_date, end_date)
+        data = pd.DataFrame(view, index=self.dates[window], columns=self.columns, copy=False)
+        data.index.name = 'Date'
+        if dropna:
+            valid = ~np.isnan(view).all(axis=1)
+            if not valid.all():
+                data = data[valid]
+        return data
+
+    def panel(self, start_date=None, end_date=None, column=None):
+        """返回全部股票在日期范围内的(股票数, 日期数, 列数)零拷贝视图；指定column时返回(股票数, 日期数)"""
+        if self.array is None and not self.open():
+            return None
+        view = self.array[:, self._date_slice(start_date, end_date)]
+        if column is not None:
+            view = view[:, :, self.columns.index(column)]
+        return view
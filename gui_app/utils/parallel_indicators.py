@@ -0,0 +1,114 @@
+import os
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from utils.indicator_engine import INDICATOR_COLUMNS
+from utils.indicator_kernel import compute_indicators
+
+
+def _compute_columns(input_name, output_name, n_rows, n_columns, first, last):
+    """工作进程：从共享内存读取第first到last列股票的高低收价，把指标写回共享内存，返回处理的股票数"""
+    inputs = shared_memory.SharedMemory(name=input_name)
+    outputs = shared_memory.SharedMemory(name=output_name)
+    prices = values = None
+    try:
+        prices = np.ndarray((3, n_rows, n_columns), dtype=float, buffer=inputs.buf)
+        values = np.ndarray((n_rows, len(INDICATOR_COLUMNS), n_columns), dtype=float, buffer=outputs.buf)
+        indicators = compute_indicators(*(np.ascontiguousarray(prices[i, :, first:last]) for i in range(3)))
+        for i, column in enumerate(INDICATOR_COLUMNS):
+            values[:, i, first:last] = indicators[column]
+    finally:
+        # 关闭共享内存前必须释放对其缓冲区的引用，否则close()抛出的BufferError会掩盖原来的异常
+        del prices, values
+        inputs.close()
+        outputs.close()
+    return last - first
+
+
+class IndicatorPool:
+    def __init__(self, max_workers=None, min_bars=500000):
+        """初始化多进程指标计算池：多只股票按列分给进程池并行计算
+
+        输入的高低收价和输出的指标都放在共享内存中，进程间只传递共享内存名称和列范围，
+        不序列化任何DataFrame或数组。K线总数（日期数 × 股票数）小于min_bars、只有一只股票
+        或只有一个工作进程时直接在当前进程中计算，避免进程间通信的开销。
+        进程池在第一次并行计算时创建并复用，使用spawn方式启动，与界面线程互不影响。
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_bars = min_bars
+        self.executor = None
+        self.lock = threading.Lock()
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def compute(self, high, low, close):
+        """计算(T, N)高低收价的全部指标，返回形状为(T, 指标数, N)的数组（指标顺序见INDICATOR_COLUMNS）"""
+        n_rows, n_columns = np.shape(close)
+        if self.max_workers > 1 and n_columns > 1 and n_rows * n_columns >= self.min_bars:
+            try:
+                return self._compute_parallel(high, low, close)
+            except Exception as e:
+                self.logger.error(f"并行计算技术指标时出错，改为在当前进程中计算: {str(e)}")
+                self.shutdown()
+
+        indicators = compute_indicators(high, low, close)
+        return np.stack([indicators[column] for column in INDICATOR_COLUMNS], axis=1)
+
+    def _compute_parallel(self, high, low, close):
+        """把价格复制到共享内存，按列分块交给进程池计算"""
+        n_rows, n_columns = np.shape(close)
+        input_size = 3 * n_rows * n_columns * 8
+        output_size = n_rows * len(INDICATOR_COLUMNS) * n_columns * 8
+        inputs = shared_memory.SharedMemory(create=True, size=input_size)
+        try:
+            outputs = shared_memory.SharedMemory(create=True, size=output_size)
+        except Exception:
+            inputs.close()
+            inputs.unlink()
+            raise
+
+        try:
+            prices = np.ndarray((3, n_rows, n_columns), dtype=float, buffer=inputs.buf)
+            prices[0], prices[1], prices[2] = high, low, close
+            del prices
+
+            # 每个进程分到多个块，股票数据长短不一时负载更均衡
+            n_chunks = min(n_columns, self.max_workers * 4)
+            bounds = np.linspace(0, n_columns, n_chunks + 1).astype(int)
+            executor = self._get_executor()
+            futures = [executor.submit(_compute_columns, inputs.name, outputs.name,
+                                       n_rows, n_columns, int(first), int(last))
+                       for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+            for future in futures:
+                future.result()
+
+            # 复制出结果后才能释放共享内存
+            values = np.ndarray((n_rows, len(INDICATOR_COLUMNS), n_columns), dtype=float, buffer=outputs.buf)
+            result = values.copy()
+            del values
+            return result
+        finally:
+            for block in (inputs, outputs):
+                block.close()
+                block.unlink()
+
+    def _get_executor(self):
+        """返回进程池，第一次使用时创建"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+                self.logger.info(f"已启动 {self.max_workers} 个指标计算进程")
+            return self.executor
+
+    def shutdown(self):
+        """关闭进程池，之后需要时重新创建"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,6 @@
 import os
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import LSTM, Dense, Dropout
@@ -119,6 +120,42 @@ class PredictionModel:
             self.logger.error(f"训练模型时出错: {str(e)}")
             return None
 
+    def sequences_from_store(self, feature_store, symbol, start_date=None, end_date=None):
+        """从特征存储（DataProcessor.build_feature_store生成）读取股票的特征，生成训练和测试序列
+
+        返回值与DataProcessor.prepare_data_for_prediction相同：X_train, X_test, y_train, y_test, scaler。
+        特征列与prepare_data_for_prediction使用的列相同，scaler在全部特征列上拟合，
+        输入窗口取标准化后的第一个特征列，y为收盘价（第3列）。特征直接读取映射的数组，
+        只有标准化时复制一次；输入窗口是标准化结果上的sliding_window_view视图。
+        """
+        view = feature_store.get(symbol, start_date, end_date)
+        if view is None:
+            self.logger.error(f"特征存储中没有股票 {symbol} 的数据")
+            return None, None, None, None, None
+
+        # 去掉股票在共享日期索引中没有K线的日期（上市前、停牌），没有空行时不复制
+        valid = ~np.isnan(view).all(axis=1)
+        if not valid.all():
+            view = view[valid]
+        if len(view) <= self.prediction_days:
+            self.logger.error(f"股票 {symbol} 的数据不足以生成长度为 {self.prediction_days} 的序列")
+            return None, None, None, None, None
+
+        try:
+            from sklearn.preprocessing import MinMaxScaler
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaled = scaler.fit_transform(view)
+
+            X = sliding_window_view(scaled[:, 0], self.prediction_days)[:-1, :, np.newaxis]
+            y = scaled[self.prediction_days:, 3]
+
+            split_index = int(len(X) * self.config.get(
+                'model_parameters', {}).get('train_test_split', 0.8))
+            return X[:split_index], X[split_index:], y[:split_index], y[split_index:], scaler
+        except Exception as e:
+            self.logger.error(f"从特征存储生成序列时出错: {str(e)}")
+            return None, None, None, None, None
+
     def load_model(self):
         """加载已保存的模型"""
         try:
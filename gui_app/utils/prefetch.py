@@ -0,0 +1,150 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+
+class Prefetcher:
+    def __init__(self, loader, capacity=16, max_age=300, pause_between=0.05):
+        """初始化后台预取器：单个低优先级线程按顺序调用loader(key)，结果保存在有界LRU缓存中
+
+        前台正在加载时后台线程暂停，两次预取之间让出pause_between秒，尽量不与界面争抢CPU。
+        缓存超过max_age秒的结果视为过期。
+        """
+        self.loader = loader
+        self.capacity = capacity
+        self.max_age = max_age
+        self.pause_between = pause_between
+
+        self.cache = OrderedDict()
+        self.pending = []
+        self.loading = None
+        # 每次失效加一，失效前开始的预取结果不再写入缓存
+        self.generation = 0
+        self.lock = threading.Lock()
+        # 前台加载的嵌套计数，大于0时后台线程等待
+        self._foreground = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopped = False
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, key):
+        """返回缓存中未过期的结果，没有时返回None"""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.max_age:
+                self.misses += 1
+                return None
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """写入结果，超过容量时淘汰最久未使用的结果"""
+        with self.lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        """写入结果（调用方持有锁）"""
+        self.cache[key] = (time.monotonic(), value)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """使一个结果（默认全部结果）失效"""
+        with self.lock:
+            self.generation += 1
+            if key is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(key, None)
+
+    def _is_fresh(self, key):
+        """结果是否在缓存中且未过期（调用方持有锁）"""
+        entry = self.cache.get(key)
+        return entry is not None and time.monotonic() - entry[0] <= self.max_age
+
+    def schedule(self, keys):
+        """用新的预取列表替换尚未开始的预取，靠前的先预取；已缓存且未过期的跳过"""
+        with self.lock:
+            if self._stopped:
+                return
+            self.pending = [key for key in dict.fromkeys(keys)
+                            if key != self.loading and not self._is_fresh(key)]
+            if self.pending and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='prefetcher', daemon=True)
+                self._thread.start()
+
+    def foreground(self):
+        """前台加载期间暂停预取，用法: with prefetcher.foreground(): ..."""
+        return _Foreground(self)
+
+    def _run(self):
+        """预取线程：没有待预取的结果时退出，下次schedule时重新启动"""
+        while True:
+            # 前台加载时等待，避免与之争抢CPU和连接
+            self._idle.wait()
+            with self.lock:
+                if self._stopped or not self.pending:
+                    self._thread = None
+                    return
+                key = self.pending.pop(0)
+                if self._is_fresh(key):
+                    continue
+                self.loading = key
+                generation = self.generation
+
+            try:
+                value = self.loader(key)
+            except Exception as e:
+                self.logger.warning(f"预取 {key} 时出错: {str(e)}")
+                value = None
+            with self.lock:
+                self.loading = None
+                if value is not None and generation == self.generation:
+                    self._store(key, value)
+                    self.prefetched += 1
+            time.sleep(self.pause_between)
+
+    def stop(self):
+        """停止预取，丢弃尚未开始的预取"""
+        with self.lock:
+            self._stopped = True
+            self.pending = []
+
+    def get_stats(self):
+        """返回命中、未命中和后台完成的预取次数"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'prefetched': self.prefetched,
+                'cached': len(self.cache),
+                'pending': len(self.pending)
+            }
+
+
+class _Foreground:
+    def __init__(self, prefetcher):
+        self.prefetcher = prefetcher
+
+    def __enter__(self):
+        with self.prefetcher.lock:
+            self.prefetcher._foreground += 1
+            self.prefetcher._idle.clear()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self.prefetcher.lock:
+            self.prefetcher._foreground -= 1
+            if self.prefetcher._foreground == 0:
+                self.prefetcher._idle.set()
+        return False
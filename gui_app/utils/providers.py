@@ -0,0 +1,314 @@
+import os
+import re
+import time
+import datetime
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+import yfinance as yf
+
+# 各数据源统一输出的列，缺少的列补0
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# 没有时区信息的数据源按美股交易所时区处理，便于与Yahoo Finance的数据合并
+DEFAULT_TIMEZONE = 'America/New_York'
+
+
+def normalize_history(data, timezone=DEFAULT_TIMEZONE):
+    """将各数据源的K线统一为Yahoo Finance的格式：固定列、按日期升序、带时区的Date索引"""
+    if data is None or data.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    data = data.sort_index()
+    for column in HISTORY_COLUMNS:
+        if column not in data.columns:
+            data[column] = 0
+    data = data[HISTORY_COLUMNS]
+
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is None and timezone:
+        index = index.tz_localize(timezone)
+    data.index = index
+    data.index.name = 'Date'
+    return data
+
+
+def adjust_prices(data, adjusted_close):
+    """按复权收盘价调整开高低收，与yfinance的auto_adjust=True一致（成交量不调整）
+
+    YahooProvider返回复权价，其他数据源也必须返回复权价，否则切换数据源后增量K线与已存储的K线无法衔接。
+    """
+    ratio = adjusted_close / data['Close']
+    data = data.copy()
+    for column in ('Open', 'High', 'Low'):
+        data[column] = data[column] * ratio
+    data['Close'] = adjusted_close
+    return data
+
+
+class MarketDataProvider(ABC):
+    # 数据源名称，用于日志和统计
+    name = 'base'
+
+    @abstractmethod
+    def fetch_history(self, symbol, start_date, end_date):
+        """获取[start_date, end_date]区间的日K线，失败时抛出异常"""
+
+
+class YahooProvider(MarketDataProvider):
+    name = 'yahoo'
+    host = 'query2.finance.yahoo.com'
+
+    def __init__(self, rate_limiter=None, session=None):
+        """初始化Yahoo Finance数据源"""
+        self.rate_limiter = rate_limiter
+        self.session = session
+
+    def fetch_history(self, symbol, start_date, end_date):
+        """通过yfinance获取日K线"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.host)
+        stock = yf.Ticker(symbol, session=self.session)
+        # Yahoo Finance的end参数不包含当天，因此向后多取一天
+        return stock.history(
+            start=start_date.strftime('%Y-%m-%d'),
+            end=(end_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'))
+
+
+class AlphaVantageProvider(MarketDataProvider):
+    name = 'alpha_vantage'
+
+    def __init__(self, http_client, api_key, base_url='https://www.alphavantage.co'):
+        """初始化Alpha Vantage数据源"""
+        self.http = http_client
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+
+    def fetch_history(self, symbol, start_date, end_date):
+        """通过TIME_SERIES_DAILY_ADJUSTED接口获取日K线，按复权收盘价调整开高低收"""
+        params = {
+            'function': 'TIME_SERIES_DAILY_ADJUSTED',
+            'symbol': symbol,
+            'outputsize': 'full',
+            'apikey': self.api_key
+        }
+        response = self.http.get(f"{self.base_url}/query", params=params)
+        response.raise_for_status()
+        payload = response.json()
+        series = payload.get('Time Series (Daily)')
+        if not series:
+            raise RuntimeError(payload.get('Error Message') or payload.get('Note') or 'Alpha Vantage未返回数据')
+
+        data = pd.DataFrame.from_dict(series, orient='index', dtype=float)
+        # 列名形如"1. open"，去掉序号
+        data.columns = [column.split('. ', 1)[-1].title() for column in data.columns]
+        data.index = pd.to_datetime(data.index)
+        data = data.sort_index().loc[pd.Timestamp(start_date).normalize():pd.Timestamp(end_date)]
+        data = adjust_prices(data, data.pop('Adjusted Close'))
+        data['Dividends'] = data.pop('Dividend Amount')
+        # Alpha Vantage用1表示没有拆股，Yahoo用0
+        data['Stock Splits'] = data.pop('Split Coefficient').where(lambda ratio: ratio != 1, 0)
+        return normalize_history(data)
+
+
+class QuandlProvider(MarketDataProvider):
+    name = 'quandl'
+
+    def __init__(self, http_client, api_key, base_url='https://data.nasdaq.com', database='EOD'):
+        """初始化Quandl风格（Nasdaq Data Link）数据源
+
+        默认使用EOD数据库（WIKI数据库已于2018年停止更新）。数据集中有复权价列
+        （EOD的Adj_Close、WIKI的Adj. Close）时使用复权价，与YahooProvider一致。
+        """
+        self.http = http_client
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.database = database
+
+    def fetch_history(self, symbol, start_date, end_date):
+        """通过datasets接口获取日K线"""
+        params = {
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'order': 'asc',
+            'api_key': self.api_key
+        }
+        url = f"{self.base_url}/api/v3/datasets/{self.database}/{symbol}/data.json"
+        response = self.http.get(url, params=params)
+        response.raise_for_status()
+        dataset = response.json().get('dataset_data', {})
+        rows = dataset.get('data')
+        if not rows:
+            raise RuntimeError('Quandl未返回数据')
+
+        data = pd.DataFrame(rows, columns=[column.title() for column in dataset['column_names']])
+        data = data.set_index(pd.to_datetime(data.pop('Date')))
+        for prefix in ('Adj_', 'Adj. '):
+            if f"{prefix}Close" in data.columns:
+                data = adjust_prices(data, data[f"{prefix}Close"])
+        for name in ('Ex-Dividend', 'Dividend'):
+            if name in data.columns:
+                data['Dividends'] = data.pop(name)
+        for name in ('Split Ratio', 'Split'):
+            if name in data.columns:
+                # Quandl用1表示没有拆股，Yahoo用0
+                data['Stock Splits'] = data.pop(name).where(lambda ratio: ratio != 1, 0)
+        return normalize_history(data)
+
+
+class LocalFileProvider(MarketDataProvider):
+    name = 'local'
+
+    def __init__(self, data_dir):
+        """初始化本地文件数据源：data_dir下的{symbol}.parquet或{symbol}.csv（应为复权价）"""
+        self.data_dir = data_dir
+
+    def fetch_history(self, symbol, start_date, end_date):
+        """从本地文件读取日K线"""
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        parquet_path = os.path.join(self.data_dir, f"{safe_name}.parquet")
+        csv_path = os.path.join(self.data_dir, f"{safe_name}.csv")
+        if os.path.exists(parquet_path):
+            data = pd.read_parquet(parquet_path)
+        elif os.path.exists(csv_path):
+            data = pd.read_csv(csv_path, index_col=0)
+            data.index = pd.to_datetime(data.index, utc=True).tz_convert(DEFAULT_TIMEZONE)
+        else:
+            raise FileNotFoundError(f"本地没有股票 {symbol} 的数据文件")
+
+        data = normalize_history(data)
+        index = data.index.tz_localize(None)
+        mask = (index >= pd.Timestamp(start_date).normalize()) & \
+            (index < pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+        return data[mask]
+
+
+class ProviderRouter:
+    def __init__(self, providers, hedge=True, min_samples=20, min_hedge_delay=0.05,
+                 latency_window=200, max_workers=8):
+        """初始化多数据源路由器
+
+        按各数据源的历史延迟排序选择主数据源；主请求超过其p95延迟仍未返回时，
+        向下一个数据源发出对冲请求，先成功的结果胜出；出错时自动切换到下一个数据源。
+        max_workers为同时调用fetch_history的线程数。每次调用最多同时有主请求和对冲请求两个任务，
+        对冲时线程池按两倍大小创建，对冲请求不会排在其他调用的主请求之后。
+        """
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_workers * 2 if hedge else max_workers)
+        self.lock = threading.Lock()
+
+        self.latencies = {p.name: deque(maxlen=latency_window) for p in self.providers}
+        self.stats = {p.name: {'requests': 0, 'successes': 0, 'failures': 0, 'wins': 0}
+                      for p in self.providers}
+        self.hedged = 0
+        self.failovers = 0
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    def _percentile(self, name, q):
+        """返回数据源最近成功请求延迟的分位数，样本不足时返回None"""
+        with self.lock:
+            latencies = sorted(self.latencies[name])
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[int(q * (len(latencies) - 1))]
+
+    def _ranked(self):
+        """按失败率和中位延迟排序数据源，延迟未知的排在后面并保持配置顺序"""
+        def score(item):
+            position, provider = item
+            stats = self.stats[provider.name]
+            failure_rate = stats['failures'] / stats['requests'] if stats['requests'] else 0
+            p50 = self._percentile(provider.name, 0.5)
+            return (failure_rate > 0.5, p50 if p50 is not None else float('inf'), position)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=score)]
+
+    def _timed_fetch(self, provider, symbol, start_date, end_date):
+        """调用数据源并记录延迟和结果"""
+        with self.lock:
+            self.stats[provider.name]['requests'] += 1
+        start = time.monotonic()
+        try:
+            data = provider.fetch_history(symbol, start_date, end_date)
+            if data is None or data.empty:
+                raise RuntimeError(f"{provider.name} 未返回股票 {symbol} 的数据")
+        except Exception:
+            with self.lock:
+                self.stats[provider.name]['failures'] += 1
+            raise
+        with self.lock:
+            self.stats[provider.name]['successes'] += 1
+            self.latencies[provider.name].append(time.monotonic() - start)
+        return data
+
+    def fetch_history(self, symbol, start_date, end_date):
+        """从最合适的数据源获取日K线，必要时对冲或切换数据源"""
+        remaining = self._ranked()
+        pending = {}
+        errors = []
+        hedged = False
+
+        def launch():
+            provider = remaining.pop(0)
+            future = self.executor.submit(self._timed_fetch, provider, symbol, start_date, end_date)
+            pending[future] = provider
+
+        launch()
+        while pending:
+            timeout = None
+            if self.hedge and not hedged and remaining and len(pending) == 1:
+                primary = next(iter(pending.values()))
+                p95 = self._percentile(primary.name, 0.95)
+                if p95 is not None:
+                    timeout = max(p95, self.min_hedge_delay)
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 主请求超过p95延迟，向下一个数据源发出对冲请求
+                hedged = True
+                with self.lock:
+                    self.hedged += 1
+                self.logger.info(f"{primary.name} 获取 {symbol} 超过p95延迟，对冲请求 {remaining[0].name}")
+                launch()
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {str(e)}")
+                    self.logger.warning(f"数据源 {provider.name} 获取 {symbol} 失败: {str(e)}")
+                    if remaining and not pending:
+                        with self.lock:
+                            self.failovers += 1
+                        launch()
+                    continue
+
+                # 其余仍在进行的请求结果直接丢弃
+                with self.lock:
+                    self.stats[provider.name]['wins'] += 1
+                return data
+
+        raise RuntimeError(f"所有数据源获取 {symbol} 均失败: {'; '.join(errors)}")
+
+    def get_stats(self):
+        """返回各数据源的请求次数、失败次数、胜出次数和延迟分位数"""
+        result = {'hedged': self.hedged, 'failovers': self.failovers, 'providers': {}}
+        for provider in self.providers:
+            with self.lock:
+                stats = dict(self.stats[provider.name])
+            p50 = self._percentile(provider.name, 0.5)
+            p95 = self._percentile(provider.name, 0.95)
+            stats['latency_p50_ms'] = p50 * 1000 if p50 is not None else None
+            stats['latency_p95_ms'] = p95 * 1000 if p95 is not None else None
+            result['providers'][provider.name] = stats
+        return result
+
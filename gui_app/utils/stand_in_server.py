@@ -0,0 +1,268 @@
+import gzip
+import json
+import time
+import zlib
+import random
+import datetime
+import threading
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+
+from utils.concurrency import RateLimiter
+from utils.mock_data import generate_mock_ohlcv_batch, generate_mock_news
+
+# 日K线从这一天开始生成，请求任意区间都从同一条序列中截取，保证增量请求与全量请求一致
+HISTORY_START = '2000-01-03'
+
+# 美股常规交易时段（UTC，不考虑夏令时）
+SESSION_OPEN_UTC = datetime.time(14, 30)
+SESSION_MINUTES = 390
+
+# range参数对应的天数
+RANGE_DAYS = {'1d': 1, '5d': 5, '1mo': 30, '3mo': 90, '6mo': 180, '1y': 365,
+              '2y': 730, '5y': 1825, '10y': 3650, 'ytd': None, 'max': None}
+
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+
+
+class StandInServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 rate_limit=None, news_total=500, article_bytes=0, seed=0):
+        """初始化本地替身服务器，模拟Yahoo Finance的K线接口和NewsAPI的/v2/everything接口
+
+        latency和latency_jitter控制每个请求的延迟（秒），error_rate为返回500的概率，
+        rate_limit为每秒允许的请求数（超出时返回429），news_total和article_bytes控制新闻接口的
+        结果总数和每篇文章content字段的大小。
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.news_total = news_total
+        self.article_bytes = article_bytes
+        self.random = random.Random(seed)
+
+        self._history = {}
+        self._news = {}
+        self._data_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'not_found': 0, 'bytes_sent': 0}
+        self._stats_lock = threading.Lock()
+
+        self.httpd = None
+        self.thread = None
+
+        # 设置日志
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def base_url(self):
+        """服务器的根URL，可用作yahoo_base_url和news_api_base_url"""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """在后台线程中启动服务器，返回根URL"""
+        handler = type('StandInHandler', (_Handler,), {'stand_in': self})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info(f"替身服务器已启动: {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        """停止服务器"""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def count(self, name, value=1):
+        """累加统计项"""
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def get_stats(self):
+        """返回请求数、注入的错误数、限流次数和发送的字节数"""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _daily_history(self, symbol):
+        """获取股票从HISTORY_START到今天的完整日K线（按股票缓存）"""
+        with self._data_lock:
+            cached = self._history.get(symbol)
+            today = pd.Timestamp.utcnow().normalize().tz_localize(None)
+            if cached is None or cached[0].index[-1] < pd.offsets.BDay().rollback(today):
+                dates = pd.bdate_range(HISTORY_START, today)
+                cached = (pd.DataFrame(generate_mock_ohlcv_batch([symbol], dates)[0], index=dates,
+                                       columns=['open', 'high', 'low', 'close', 'volume']),)
+                self._history[symbol] = cached
+            return cached[0]
+
+    def chart(self, symbol, params):
+        """生成v8/finance/chart接口的响应"""
+        interval = params.get('interval', '1d')
+        now = int(time.time())
+        if 'period1' in params:
+            period1 = int(params['period1'])
+            period2 = int(params.get('period2', now))
+        else:
+            days = RANGE_DAYS.get(params.get('range', '1mo'), 30)
+            period2 = now
+            if days is None:
+                period1 = int(pd.Timestamp(HISTORY_START).timestamp())
+            else:
+                period1 = now - days * 86400
+
+        start = pd.Timestamp(period1, unit='s').normalize()
+        end = pd.Timestamp(period2, unit='s')
+        if interval in INTERVAL_MINUTES:
+            timestamps, bars = self._intraday_bars(symbol, start, end, INTERVAL_MINUTES[interval])
+        else:
+            bars = self._daily_history(symbol).loc[start:end]
+            # 日K线的时间戳为当天开盘时间
+            open_offset = SESSION_OPEN_UTC.hour * 3600 + SESSION_OPEN_UTC.minute * 60
+            timestamps = [int(ts.timestamp()) + open_offset for ts in bars.index]
+
+        quote = {column: [round(float(v), 4) for v in bars[column]] for column in ['open', 'high', 'low', 'close']}
+        quote['volume'] = [int(v) for v in bars['volume']]
+        return {
+            'chart': {
+                'result': [{
+                    'meta': {
+                        'currency': 'USD',
+                        'symbol': symbol,
+                        'exchangeName': 'NMS',
+                        'instrumentType': 'EQUITY',
+                        'firstTradeDate': int(pd.Timestamp(HISTORY_START).timestamp()),
+                        'regularMarketTime': period2,
+                        'gmtoffset': -14400,
+                        'timezone': 'EDT',
+                        'exchangeTimezoneName': 'America/New_York',
+                        'dataGranularity': interval,
+                        'range': params.get('range', ''),
+                        'validRanges': list(RANGE_DAYS)
+                    },
+                    'timestamp': timestamps,
+                    'indicators': {
+                        'quote': [quote],
+                        'adjclose': [{'adjclose': quote['close']}]
+                    }
+                }],
+                'error': None
+            }
+        }
+
+    def _intraday_bars(self, symbol, start, end, minutes):
+        """生成[start, end]内各交易日常规时段的盘中K线，同一天的结果稳定"""
+        timestamps, frames = [], []
+        for day in pd.bdate_range(start, end.normalize()):
+            session_open = day + pd.Timedelta(hours=SESSION_OPEN_UTC.hour, minutes=SESSION_OPEN_UTC.minute)
+            times = pd.date_range(session_open, periods=SESSION_MINUTES // minutes, freq=f"{minutes}min")
+            times = times[times <= end]
+            if len(times) == 0:
+                continue
+            ohlcv = generate_mock_ohlcv_batch([symbol], times, seed=day.toordinal() * 100 + minutes)[0]
+            frames.append(pd.DataFrame(ohlcv, columns=['open', 'high', 'low', 'close', 'volume']))
+            timestamps.extend(int(ts.timestamp()) for ts in times)
+        if not frames:
+            return [], pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+        return timestamps, pd.concat(frames, ignore_index=True)
+
+    def everything(self, params):
+        """生成NewsAPI /v2/everything接口的响应，同一查询的分页结果一致"""
+        query = params.get('q', '')
+        page = max(1, int(params.get('page', 1)))
+        page_size = min(100, max(1, int(params.get('pageSize', 100))))
+
+        with self._data_lock:
+            articles = self._news.get(query)
+            if articles is None:
+                articles = generate_mock_news(query, self.news_total, seed=zlib.crc32(query.encode('utf-8')))
+                for article in articles:
+                    # 转换为NewsAPI的字段格式
+                    article.pop('sentiment', None)
+                    article['source'] = {'id': None, 'name': article['source']['name']}
+                    article['author'] = article['source']['name']
+                    article['urlToImage'] = None
+                    content = article['description']
+                    if self.article_bytes:
+                        content = (content * (self.article_bytes // max(1, len(content.encode('utf-8'))) + 1))
+                        content = content.encode('utf-8')[:self.article_bytes].decode('utf-8', 'ignore')
+                    article['content'] = content
+                self._news[query] = articles
+
+        return {
+            'status': 'ok',
+            'totalResults': len(articles),
+            'articles': articles[(page - 1) * page_size:page * page_size]
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # 由StandInServer.start注入
+    stand_in = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """不输出每个请求的访问日志"""
+
+    def do_GET(self):
+        """按路径分发请求，依次模拟延迟、限流和随机错误"""
+        server = self.stand_in
+        server.count('requests')
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        delay = server.latency + (server.random.uniform(0, server.latency_jitter) if server.latency_jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.rate_limiter is not None and not server.rate_limiter.try_acquire():
+            server.count('rate_limited')
+            return self._send_json(429, {'status': 'error', 'code': 'rateLimited',
+                                         'message': 'Too many requests'}, {'Retry-After': '1'})
+        if server.error_rate and server.random.random() < server.error_rate:
+            server.count('errors')
+            return self._send_json(500, {'status': 'error', 'code': 'unexpectedError',
+                                         'message': 'Injected error'})
+
+        if url.path.startswith('/v8/finance/chart/'):
+            symbol = url.path.rsplit('/', 1)[-1]
+            if symbol.upper().startswith('INVALID'):
+                server.count('not_found')
+                return self._send_json(404, {'chart': {'result': None, 'error': {
+                    'code': 'Not Found', 'description': 'No data found, symbol may be delisted'}}})
+            return self._send_json(200, server.chart(symbol, params))
+
+        if url.path == '/v2/everything':
+            if not params.get('apiKey') and not self.headers.get('X-Api-Key'):
+                return self._send_json(401, {'status': 'error', 'code': 'apiKeyMissing',
+                                             'message': 'Your API key is missing.'})
+            return self._send_json(200, server.everything(params))
+
+        server.count('not_found')
+        self._send_json(404, {'status': 'error', 'code': 'notFound', 'message': self.path})
+
+    def _send_json(self, status, payload, headers=None):
+        """发送JSON响应，客户端支持时使用gzip压缩"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        encoding = None
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            encoding = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.stand_in.count('bytes_sent', len(body))
@@ -108,9 +108,10 @@ class Visualizer:
         up_color = 'red'
         down_color = 'green'
 
-        # 计算上涨和下跌
-        up = data[data['Close'] >= data['Open']]
-        down = data[data['Close'] < data['Open']]
+        # 计算上涨和下跌（只取用到的列）
+        prices = data[['Open', 'High', 'Low', 'Close']]
+        up = prices[prices['Close'] >= prices['Open']]
+        down = prices[prices['Close'] < prices['Open']]
 
         # 绘制上涨K线
         ax.bar(up.index, up['Close'] - up['Open'],
@@ -142,9 +143,10 @@ class Visualizer:
         up_color = 'red'
         down_color = 'green'
 
-        # 计算上涨和下跌
-        up = data[data['Close'] >= data['Open']]
-        down = data[data['Close'] < data['Open']]
+        # 计算上涨和下跌（只取用到的列）
+        prices = data[['Open', 'Close', 'Volume']]
+        up = prices[prices['Close'] >= prices['Open']]
+        down = prices[prices['Close'] < prices['Open']]
 
         # 绘制成交量
         ax.bar(up.index, up['Volume'], color=up_color, alpha=0.5)
@@ -172,7 +172,8 @@ class NewsView(ttk.Frame):
     def update_news(self, news_data):
         """更新新闻数据"""
         self.news_data = news_data
-        self.filtered_news = news_data.copy()
+        # 近似重复的新闻只显示簇的代表文章
+        self.filtered_news = [article for article in news_data if not article.get('is_duplicate')]
 
         # 更新新闻列表
         self.update_news_list()
@@ -194,8 +195,10 @@ class NewsView(ttk.Frame):
             # 获取来源
             source = article.get('source', {}).get('name', '未知来源')
 
-            # 获取标题
+            # 获取标题，近似重复的报道只显示一行并注明条数
             title = article.get('title', '无标题')
+            if article.get('cluster_size', 1) > 1:
+                title = f"{title}（另有{article['cluster_size'] - 1}篇相似报道）"
 
             # 获取情感
             sentiment = article.get('sentiment', 'neutral')
@@ -226,7 +229,8 @@ class NewsView(ttk.Frame):
         for article in self.filtered_news:
             sentiment = article.get('sentiment', 'neutral')
             if sentiment in sentiment_counts:
-                sentiment_counts[sentiment] += 1
+                # 按簇的大小计数，与未去重时的分布一致
+                sentiment_counts[sentiment] += article.get('cluster_size', 1)
 
         # 绘制饼图
         labels = ['正面', '负面', '中性']
@@ -264,6 +268,9 @@ class NewsView(ttk.Frame):
         # 筛选新闻
         self.filtered_news = []
         for article in self.news_data:
+            if article.get('is_duplicate'):
+                continue
+
             # 检查关键词
             if keyword:
                 title = article.get('title', '').lower()
@@ -493,7 +500,7 @@ class NewsView(ttk.Frame):
 
             # 处理新闻数据
             processed_news = self.app.data_processor.process_news_data(
-                news_data)
+                news_data, article_fetcher=self.app.data_fetcher.article_fetcher)
 
             self.app.update_progress(90)
 
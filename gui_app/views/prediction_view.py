@@ -257,6 +257,15 @@ class PredictionView(ttk.Frame):
             self.current_symbol = symbol
             self.update_prediction_data()
 
+    def _prepare_data(self, processed_data):
+        """准备预测数据：特征存储中有当前股票时直接读取映射的特征，否则由处理后的数据生成"""
+        feature_store = self.app.data_fetcher.feature_store
+        if self.current_symbol in feature_store.offsets:
+            prepared = self.app.prediction_model.sequences_from_store(feature_store, self.current_symbol)
+            if prepared[0] is not None:
+                return prepared
+        return self.app.data_processor.prepare_data_for_prediction(processed_data)
+
     def train_model(self):
         """训练模型"""
         if not self.current_symbol:
@@ -277,8 +286,7 @@ class PredictionView(ttk.Frame):
             self.app.update_progress(30)
 
             # 准备训练数据
-            X_train, X_test, y_train, y_test, scaler = self.app.data_processor.prepare_data_for_prediction(
-                processed_data)
+            X_train, X_test, y_train, y_test, scaler = self._prepare_data(processed_data)
 
             if X_train is None:
                 self.app.show_error("错误", "准备训练数据失败")
@@ -347,8 +355,7 @@ class PredictionView(ttk.Frame):
             self.app.update_progress(30)
 
             # 准备数据
-            X_train, X_test, y_train, y_test, scaler = self.app.data_processor.prepare_data_for_prediction(
-                processed_data)
+            X_train, X_test, y_train, y_test, scaler = self._prepare_data(processed_data)
 
             if X_train is None:
                 self.app.show_error("错误", "准备预测数据失败")
@@ -419,8 +426,7 @@ class PredictionView(ttk.Frame):
             self.app.update_progress(30)
 
             # 准备数据
-            X_train, X_test, y_train, y_test, scaler = self.app.data_processor.prepare_data_for_prediction(
-                processed_data)
+            X_train, X_test, y_train, y_test, scaler = self._prepare_data(processed_data)
 
             if X_train is None:
                 self.app.show_error("错误", "准备预测数据失败")
@@ -2,12 +2,28 @@
 import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from collections import deque
 import os
 
+from utils.prefetch import Prefetcher
+
+# 图表中指标线的图例标签与数据列的对应关系，盘中增量刷新时据此更新已有的线
+CHART_LINE_COLUMNS = {
+    'MA20': 'MA20',
+    'MA50': 'MA50',
+    '布林带上轨': 'BB_upper',
+    '布林带中轨': 'BB_middle',
+    '布林带下轨': 'BB_lower',
+    'RSI': 'RSI',
+    'MACD': 'MACD',
+    'MACD信号': 'MACD_signal',
+}
+
 
 class StockView(ttk.Frame):
     def __init__(self, parent, app):
@@ -19,6 +35,17 @@ class StockView(ttk.Frame):
         self.processed_data = {}
         self.fundamental_data = {}
         self.technical_signals = {}
+        # 当前图表对应的股票、最后一根K线的时间和布林带填充，盘中增量刷新据此在原图上追加
+        self.chart_state = None
+
+        # 后台预取下拉列表中相邻的股票和最近查看过的股票，切换时直接从内存显示
+        data_settings = app.config.get('data_settings', {})
+        self.prefetch_enabled = data_settings.get('prefetch_enabled', True)
+        self.recent_symbols = deque(maxlen=data_settings.get('prefetch_recent', 5))
+        self.prefetcher = Prefetcher(
+            self._load_stock_data,
+            capacity=data_settings.get('prefetch_cache_size', 16),
+            max_age=data_settings.get('cache_max_age', 300))
 
         # 创建UI组件
         self.create_widgets()
@@ -72,10 +99,14 @@ class StockView(ttk.Frame):
         ttk.Label(search_frame, text="时间范围:").pack(side=tk.LEFT, padx=(0, 5))
 
         self.period_var = tk.StringVar(value="1y")
+        periods = ["1mo", "3mo", "6mo", "1y", "2y", "5y"]
+        # 开启盘中模式时可以查看当天的盘中K线
+        if getattr(self.app, 'intraday_feed', None) is not None:
+            periods.append("intraday")
         period_dropdown = ttk.Combobox(
             search_frame,
             textvariable=self.period_var,
-            values=["1mo", "3mo", "6mo", "1y", "2y", "5y"],
+            values=periods,
             width=5,
             state="readonly"
         )
@@ -259,51 +290,96 @@ class StockView(ttk.Frame):
             self.select_stock(symbol)
 
     def refresh_data(self):
-        """刷新数据"""
+        """刷新数据（不使用预取的结果）"""
         if self.current_symbol:
+            self.prefetcher.invalidate((self.current_symbol, self.period_var.get()))
             self.update_stock_data(self.current_symbol)
 
-    def update_stock_data(self, symbol):
-        """更新股票数据"""
-        try:
-            self.app.update_status(f"正在获取 {symbol} 的数据...")
-            self.app.update_progress(10)
+    def clear_prefetched(self):
+        """丢弃所有预取的结果，数据刷新后调用"""
+        self.prefetcher.invalidate()
 
-            # 获取股票数据
-            period = self.period_var.get()
-            stock_data = self.app.data_fetcher.fetch_stock_data(symbol, period)
+    def _load_stock_data(self, key, progress=None):
+        """获取并处理一只股票的数据，返回(K线, 处理后的数据, 基本面)，没有数据时返回None
 
-            if stock_data.empty:
-                self.app.show_error("数据错误", f"无法获取 {symbol} 的数据")
-                return
+        前台切换股票和后台预取共用此方法，progress为前台的进度回调。
+        """
+        symbol, period = key
+        if period == 'intraday':
+            stock_data = self._get_intraday_data(symbol)
+        else:
+            stock_data = self.app.data_fetcher.fetch_stock_data(symbol, period)
+        if stock_data.empty:
+            return None
 
-            self.app.update_progress(30)
+        if progress:
+            progress(30)
 
-            # 处理股票数据
+        # 处理股票数据：日线的指标在图表或技术信号用到时才计算；
+        # 盘中K线之后要增量计算，需要完整的指标列
+        if period == 'intraday':
             processed_data = self.app.data_processor.process_stock_data(
                 stock_data)
+        else:
+            processed_data = self.app.data_processor.process_stock_data_lazy(
+                stock_data)
 
-            self.app.update_progress(50)
+        if progress:
+            progress(50)
 
-            # 获取基本面数据
-            fundamental_data = self.app.data_fetcher.fetch_stock_fundamentals(
-                symbol)
-            processed_fundamental = self.app.data_processor.process_fundamental_data(
-                fundamental_data)
+        # 获取基本面数据
+        fundamental_data = self.app.data_fetcher.fetch_stock_fundamentals(
+            symbol)
+        processed_fundamental = self.app.data_processor.process_fundamental_data(
+            fundamental_data)
 
-            self.app.update_progress(70)
+        # 技术信号在显示时才计算（见update_signals_table），预取而未查看的股票不计算信号用到的指标
+        return stock_data, processed_data, processed_fundamental
+
+    def _schedule_prefetch(self, symbol, period):
+        """预取下拉列表中当前股票的下一只和上一只，以及最近查看过的股票"""
+        if not self.prefetch_enabled or period == 'intraday':
+            return
+        symbols = list(self.stock_dropdown['values'])
+        candidates = []
+        if symbol in symbols:
+            i = symbols.index(symbol)
+            candidates += [symbols[(i + 1) % len(symbols)], symbols[i - 1]]
+        candidates += reversed(self.recent_symbols)
+        self.prefetcher.schedule([(s, period) for s in candidates if s != symbol])
 
-            # 计算技术信号
-            technical_signals = self.app.data_processor.calculate_technical_signals(
-                processed_data)
+    def update_stock_data(self, symbol):
+        """更新股票数据，已预取的股票直接从内存显示"""
+        try:
+            period = self.period_var.get()
+            key = (symbol, period)
+            loaded = self.prefetcher.get(key) if period != 'intraday' else None
+            if loaded is None:
+                self.app.update_status(f"正在获取 {symbol} 的数据...")
+                self.app.update_progress(10)
+
+                # 前台加载期间暂停后台预取
+                with self.prefetcher.foreground():
+                    loaded = self._load_stock_data(key, self.app.update_progress)
+                if loaded is None:
+                    self.app.show_error("数据错误", f"无法获取 {symbol} 的数据")
+                    return
+                if period != 'intraday':
+                    self.prefetcher.put(key, loaded)
+            stock_data, processed_data, processed_fundamental = loaded
 
             self.app.update_progress(90)
 
+            # 盘中K线的处理结果交给应用，之后的刷新只计算增量；刷新线程同时读写，需要加锁
+            if period == 'intraday':
+                with self.app.intraday_lock:
+                    self.app.intraday_data[symbol] = processed_data
+
             # 保存数据
             self.stock_data[symbol] = stock_data
             self.processed_data[symbol] = processed_data
             self.fundamental_data[symbol] = processed_fundamental
-            self.technical_signals[symbol] = technical_signals
+            self.technical_signals.pop(symbol, None)
 
             # 更新UI
             self.update_chart()
@@ -314,11 +390,94 @@ class StockView(ttk.Frame):
             self.app.update_progress(100)
             self.app.update_status(f"{symbol} 数据已更新")
 
+            if symbol in self.recent_symbols:
+                self.recent_symbols.remove(symbol)
+            self.recent_symbols.append(symbol)
+            self._schedule_prefetch(symbol, period)
+
         except Exception as e:
             self.app.update_progress(0)
             self.app.update_status("数据更新失败")
             self.app.show_error("更新错误", f"更新 {symbol} 数据时出错: {str(e)}")
 
+    def _get_intraday_data(self, symbol):
+        """获取股票的盘中K线，缓冲区为空时先获取一次"""
+        feed = self.app.intraday_feed
+        if feed is None:
+            return pd.DataFrame()
+        stock_data = feed.frame(symbol)
+        if stock_data.empty:
+            feed.poll([symbol])
+            stock_data = feed.frame(symbol)
+        return stock_data
+
+    def apply_intraday_delta(self, symbol, bars, processed_data, delta):
+        """盘中增量刷新：只有当前显示的股票处于盘中模式时才更新界面"""
+        if symbol != self.current_symbol or self.period_var.get() != 'intraday':
+            return
+
+        self.stock_data[symbol] = bars
+        self.processed_data[symbol] = processed_data
+        self.technical_signals.pop(symbol, None)
+
+        self.append_chart_bars(delta)
+        self.update_signals_table()
+        self.append_data_rows(delta)
+
+    def append_chart_bars(self, delta):
+        """盘中增量刷新图表：在已有的图形上替换被修订的K线、追加新K线并延长指标线，不清空重绘
+
+        图表不是当前股票的或增量早于已绘制的最后一根K线时退回完整重绘。
+        """
+        state = self.chart_state
+        if state is None or state['symbol'] != self.current_symbol or delta.index[0] < state['last_time']:
+            self.update_chart()
+            return
+
+        try:
+            data = self.processed_data[self.current_symbol]
+            new_rows = data.loc[delta.index]
+
+            # 与已绘制的最后一根K线时间相同的是修订，先删除它在各子图中的柱形
+            if delta.index[0] == state['last_time']:
+                x = mdates.date2num(delta.index[0])
+                for ax in self.axes:
+                    for patch in list(ax.patches):
+                        if np.isclose(patch.get_x() + patch.get_width() / 2, x, rtol=0, atol=1e-9):
+                            patch.remove()
+
+            self.app.visualizer._plot_candlestick(self.axes[0], new_rows)
+            if self.show_volume.get():
+                self.app.visualizer._plot_volume(self.axes[1], new_rows)
+            if self.show_indicators.get() and 'MACD_hist' in data.columns:
+                colors = ['green' if val >= 0 else 'red' for val in new_rows['MACD_hist']]
+                self.axes[3].bar(new_rows.index, new_rows['MACD_hist'],
+                                 color=colors, alpha=0.5, width=0.8)
+
+            # 指标线沿用已有的线，只更新数据
+            for ax in self.axes:
+                for line in ax.get_lines():
+                    column = CHART_LINE_COLUMNS.get(line.get_label())
+                    if column in data.columns:
+                        line.set_data(data.index, data[column])
+
+            if state['bb_fill'] is not None:
+                state['bb_fill'].remove()
+                state['bb_fill'] = self.axes[0].fill_between(
+                    data.index, data['BB_upper'], data['BB_lower'], color='gray', alpha=0.1)
+
+            for ax in self.axes:
+                ax.relim()
+                ax.autoscale_view()
+            state['last_time'] = data.index[-1]
+
+            # 空闲时重绘画布
+            self.canvas.draw_idle()
+
+        except Exception as e:
+            self.chart_state = None
+            self.app.show_error("图表错误", f"更新图表时出错: {str(e)}")
+
     def update_chart(self):
         """更新图表"""
         if self.current_symbol not in self.processed_data:
@@ -329,8 +488,10 @@ class StockView(ttk.Frame):
             data = self.processed_data[self.current_symbol]
 
             # 清空图表
+            self.chart_state = None
             for ax in self.axes:
                 ax.clear()
+            bb_fill = None
 
             # 绘制K线图
             self.app.visualizer._plot_candlestick(self.axes[0], data)
@@ -352,7 +513,7 @@ class StockView(ttk.Frame):
                                   label='布林带中轨', color='gray', alpha=0.5)
                 self.axes[0].plot(data.index, data['BB_lower'],
                                   label='布林带下轨', color='gray', alpha=0.5, linestyle='--')
-                self.axes[0].fill_between(
+                bb_fill = self.axes[0].fill_between(
                     data.index, data['BB_upper'], data['BB_lower'], color='gray', alpha=0.1)
 
             # 设置标题和图例
@@ -376,6 +537,11 @@ class StockView(ttk.Frame):
 
             # 更新画布
             self.canvas.draw()
+            self.chart_state = {
+                'symbol': self.current_symbol,
+                'last_time': data.index[-1],
+                'bb_fill': bb_fill,
+            }
 
         except Exception as e:
             self.app.show_error("图表错误", f"更新图表时出错: {str(e)}")
@@ -412,8 +578,8 @@ class StockView(ttk.Frame):
             self.fundamental_table.insert('', 'end', values=item)
 
     def update_signals_table(self):
-        """更新技术信号表格"""
-        if self.current_symbol not in self.technical_signals:
+        """更新技术信号表格，当前股票的技术信号在第一次显示时计算并缓存"""
+        if self.current_symbol not in self.processed_data:
             return
 
         # 清空表格
@@ -421,7 +587,11 @@ class StockView(ttk.Frame):
             self.signals_table.delete(item)
 
         # 获取技术信号
-        signals = self.technical_signals[self.current_symbol]
+        signals = self.technical_signals.get(self.current_symbol)
+        if signals is None:
+            signals = self.app.data_processor.calculate_technical_signals(
+                self.processed_data[self.current_symbol])
+            self.technical_signals[self.current_symbol] = signals
 
         # 添加数据到表格
         for indicator, signal in signals.items():
@@ -440,15 +610,34 @@ class StockView(ttk.Frame):
         data = self.stock_data[self.current_symbol]
 
         # 添加最近20条数据到表格
-        recent_data = data.tail(20).reset_index()
-        for _, row in recent_data.iterrows():
-            date_str = row['Date'].strftime(
-                '%Y-%m-%d') if hasattr(row['Date'], 'strftime') else str(row['Date'])
-            self.data_table.insert('', 'end', values=(
-                date_str,
-                f"{row['Open']:.2f}",
-                f"{row['High']:.2f}",
-                f"{row['Low']:.2f}",
-                f"{row['Close']:.2f}",
-                f"{row['Volume']:,}"
-            ))
+        for date, row in data.tail(20).iterrows():
+            self.data_table.insert('', 'end', values=self._data_row_values(date, row))
+
+    def append_data_rows(self, delta):
+        """将增量K线追加到数据表格，与最后一行时间相同的K线替换该行"""
+        for date, row in delta.iterrows():
+            values = self._data_row_values(date, row)
+            items = self.data_table.get_children()
+            if items and self.data_table.item(items[-1], 'values')[0] == values[0]:
+                self.data_table.delete(items[-1])
+            self.data_table.insert('', 'end', values=values)
+
+        # 只保留最近20条
+        items = self.data_table.get_children()
+        for item in items[:max(0, len(items) - 20)]:
+            self.data_table.delete(item)
+
+    def _data_row_values(self, date, row):
+        """格式化数据表格的一行，盘中K线显示到分钟"""
+        if hasattr(date, 'strftime'):
+            date_str = date.strftime('%Y-%m-%d %H:%M' if (date.hour or date.minute) else '%Y-%m-%d')
+        else:
+            date_str = str(date)
+        return (
+            date_str,
+            f"{row['Open']:.2f}",
+            f"{row['High']:.2f}",
+            f"{row['Low']:.2f}",
+            f"{row['Close']:.2f}",
+            f"{int(row['Volume']):,}"
+        )